@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Benchmark of the stages of gen_pickle.py and of the analysis on synthetic progen data (see
+synthetic_progen.py). For each number of galaxies it times every stage separately and reports its
+throughput (galaxies per second) and the peak memory allocated during the stage (measured with
+tracemalloc, which includes the NumPy arrays).
+
+Stages: progen load (from a progen store), catalog build, merger_finder (galaxy by galaxy, with the
+padded merger_kernel and on the ragged tracks), the two passes of quenchingFinder, the fused quenching_stage
+(galaxy by galaxy and on the ragged tracks), ssfr_interpolation (the time spent inside the first pass) and the analysis binning (medians of the merger and quench
+properties in bins of stellar mass, and mergers per redshift bin).
+
+Usage:
+    python benchmark_stages.py [--ngal 1000 10000 100000] [--nsnap 151] [--executor serial] [--json FILE]
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from scipy import stats
+from synthetic_progen import synthetic_progen, save_synthetic_progen
+from progen_store import load_progen_store
+from galaxy_catalog import GalaxyCatalog
+from cosmo_table import snapshot_cosmo_table, snapshot_thresholds
+from event_tables import event_values
+from executors import get_executor, add_executor_arguments
+import mergerFinder
+import quenchingFinder
+
+BENCHMARK_SIZES = [1000, 10000, 100000]
+
+###########################################################################################
+"""
+FUNCTIONS TO TIME THE STAGES
+"""
+
+def time_stage(results, name, ngal, function, *args, **kwargs):
+    """Run function(*args, **kwargs), keeping its time, throughput and peak memory in results[name]."""
+    tracemalloc.start()
+    start = time.time()
+    output = function(*args, **kwargs)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results[name] = {'time': elapsed, 'throughput': ngal/elapsed if elapsed > 0 else np.inf, 'peak_memory': peak}
+    return output
+
+class Timed(object):
+    """Wrapper of a function that adds up the time spent inside it."""
+    def __init__(self, function):
+        self.function = function
+        self.time = 0.0
+        self.calls = 0
+    def __call__(self, *args, **kwargs):
+        start = time.time()
+        try:
+            return self.function(*args, **kwargs)
+        finally:
+            self.time += time.time() - start
+            self.calls += 1
+
+def analysis_binning(catalog, redshifts, bins=8):
+    """Binning done by the analysis scripts over the results."""
+    mergers = catalog.events['mergers']
+    quenches = catalog.events['quenches']
+    m_mergers = np.log10(event_values(catalog, mergers, 'm'))
+    m_quenches = np.log10(event_values(catalog, quenches, 'm'))
+    z_mergers = event_values(catalog, mergers, 'z')
+    output = {}
+    if len(mergers) > 0:
+        output['merger_ratio'] = stats.binned_statistic(m_mergers, mergers['merger_ratio'], bins=bins, statistic='median')[0]
+        output['fgas_boost'] = stats.binned_statistic(m_mergers, mergers['fgas_boost'], bins=bins, statistic='median')[0]
+    if len(quenches) > 0:
+        output['quench_time'] = stats.binned_statistic(m_quenches, quenches['quench_time'], bins=bins, statistic='median')[0]
+    output['mergers_per_z'] = np.histogram(z_mergers, bins=np.unique(np.sort(redshifts)))[0]
+    return output
+
+def benchmark(ngal, nsnap, p_workers, seed=0):
+    """Times of all the stages for ngal synthetic galaxies."""
+    results = {}
+    d = synthetic_progen(ngal, seed=seed, nsnap=nsnap)
+    store_dir = tempfile.mkdtemp(prefix='benchmark_progen_')
+    try:
+        save_synthetic_progen(d, os.path.join(store_dir, 'progen'))
+        del d
+        d = time_stage(results, 'progen_load', ngal, load_progen_store, os.path.join(store_dir, 'progen'), mmap=False)
+    finally:
+        shutil.rmtree(store_dir)
+
+    def build_catalog():
+        catalog = GalaxyCatalog.from_progen(d)
+        cosmo = snapshot_cosmo_table(d['redshifts'], d['t_hubble'])
+        catalog.lssfr = snapshot_thresholds(cosmo, catalog.tracks['z'])
+        return catalog
+    catalog = time_stage(results, 'catalog', ngal, build_catalog)
+    time_stage(results, 'merger_finder', ngal, mergerFinder.merger_finder, catalog, 0.2, 10**9.5, 2.5, p_workers)
+    time_stage(results, 'merger_kernel', ngal, mergerFinder.merger_finder, catalog, 0.2, 10**9.5, 2.5, p_workers, vectorized=True)
+    time_stage(results, 'merger_ragged', ngal, mergerFinder.merger_finder, catalog, 0.2, 10**9.5, 2.5, p_workers, vectorized='ragged')
+
+    # The time of ssfr_interpolation can only be kept when the workers are in this process
+    interpolation = Timed(quenchingFinder.ssfr_interpolation)
+    quenchingFinder.ssfr_interpolation = interpolation
+    try:
+        time_stage(results, 'quenching_pass_1', ngal, quenchingFinder.quenchingFinder, catalog, 1, 9.5, p_workers)
+    finally:
+        quenchingFinder.ssfr_interpolation = interpolation.function
+    if p_workers.kind != 'process':
+        results['ssfr_interpolation'] = {'time': interpolation.time, 'throughput': interpolation.calls/interpolation.time
+                                         if interpolation.time > 0 else np.inf, 'peak_memory': np.nan}
+    time_stage(results, 'quenching_pass_2', ngal, quenchingFinder.quenchingFinder, catalog, 1, 9.5, p_workers, interpolation=True)
+    time_stage(results, 'quenching_stage', ngal, quenchingFinder.quenching_stage, catalog, 1, 9.5, p_workers)
+    time_stage(results, 'quenching_ragged', ngal, quenchingFinder.quenching_stage, catalog, 1, 9.5, p_workers, vectorized=True)
+    time_stage(results, 'analysis_binning', ngal, analysis_binning, catalog, np.asarray(d['redshifts']))
+    return results
+
+def print_results(ngal, results):
+    print('')
+    print('ngal = '+str(ngal))
+    print('%-20s %12s %16s %14s' % ('stage', 'time [s]', 'galaxies/s', 'peak [MB]'))
+    for name in results:
+        r = results[name]
+        print('%-20s %12.3f %16.1f %14.1f' % (name, r['time'], r['throughput'], r['peak_memory']/2.**20))
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the stages of gen_pickle.py on synthetic galaxies.')
+    parser.add_argument('--ngal', type=int, nargs='+', default=BENCHMARK_SIZES, help='numbers of galaxies')
+    parser.add_argument('--nsnap', type=int, default=151, help='number of snapshots')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic galaxies')
+    parser.add_argument('--json', default=None, help='file where the results are saved')
+    add_executor_arguments(parser)
+    parser.set_defaults(executor='serial')
+    args = parser.parse_args()
+    all_results = {}
+    with get_executor(args.executor, nproc=args.nproc, chunksize=args.chunksize) as p_workers:
+        for ngal in args.ngal:
+            all_results[ngal] = benchmark(ngal, args.nsnap, p_workers, seed=args.seed)
+            print_results(ngal, all_results[ngal])
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(dict([(str(ngal), all_results[ngal]) for ngal in all_results]), f, indent=1)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Bootstrap errors and confidence intervals of binned statistics (means, medians, fractions and rates), for
+plotmedian2 and the analysis scripts.
+
+The resamples are drawn in blocks: the indexes of a whole block of resamples are drawn at once as a
+(resamples x objects) matrix and the statistic of every (resample, bin) pair comes from one bincount over
+the combined (resample, bin) index, as in subvolume_stats (medians from the number of times each value is
+drawn, over the values sorted once). A block holds at most BOOTSTRAP_BLOCK_ELEMENTS indexes, and the blocks are
+sent to the executor a few rounds at a time, writing their results into the (nboot x nbins) array of
+realizations, so the memory used does not grow with nboot. Each block has its own seed spawned from the
+seed given, so the results do not depend on the executor or on the number of workers.
+
+Fractions and rates given only as counts (k flagged objects out of n in each bin, e.g. from the
+star-forming census table) are resampled with binomial draws, which is the same as resampling the n objects.
+Counts of events that are not a subset of the n objects (e.g. quenchings per star-forming galaxy, where a
+bin can have more events than galaxies) are resampled as Poisson draws of k, with n fixed.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import warnings
+from executors import SerialExecutor, CHUNKS_PER_WORKER
+from subvolume_stats import bin_index, grouped_moments, moments_statistic, sorted_medians
+
+BOOTSTRAP_STATISTICS = ['count', 'sum', 'mean', 'std', 'median', 'fraction', 'rate']
+BOOTSTRAP_COUNT_MODELS = ['binomial', 'poisson']
+# Maximum number of resampled indexes held by a block
+BOOTSTRAP_BLOCK_ELEMENTS = 2**22
+
+###########################################################################################
+"""
+FUNCTIONS TO COMPUTE THE STATISTICS OF MANY RESAMPLES AT ONCE
+"""
+
+def stacked_statistic(b, y, nbins, statistic, nrep):
+    """(nrep x nbins) statistic of nrep samples of the same size stacked in b and y (flattened rows), with b
+    the bin of each value (-1 outside the bins). Fractions are the mean of the 0/1 flags in y."""
+    n = len(b)//nrep if nrep > 0 else 0
+    group = (np.repeat(np.arange(nrep)*nbins, n) + b)[b >= 0]
+    y = y[b >= 0]
+    if statistic == 'median':
+        order = np.lexsort((y, group))
+        counts = np.bincount(group, minlength=nrep*nbins)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return sorted_medians(y[order], starts, counts).reshape(nrep, nbins)
+    if statistic in ['fraction', 'rate']:
+        statistic = 'mean'
+    count, total, squares = grouped_moments(group, y, nrep*nbins)
+    return moments_statistic(count, total, squares, statistic).reshape(nrep, nbins)
+
+def resampled_medians(indx, b_sorted, y_sorted, nbins):
+    """(size x nbins) medians of the resamples indx (size x n) of the values sorted by (bin, y). Each
+    resample is turned into the number of times each sorted value is drawn, and the ranks of the medians are
+    found with a cumulative count and a bisection, so the resampled values are never sorted."""
+    size, n = indx.shape
+    drawn = np.bincount((np.arange(size)[:,None]*n + indx).ravel(), minlength=size*n)
+    cumulative = np.cumsum(drawn)
+    starts = np.searchsorted(b_sorted, np.arange(nbins))
+    ends = np.searchsorted(b_sorted, np.arange(nbins), side='right')
+    rows = (np.arange(size)*n)[:,None]
+    before = np.where(rows+starts > 0, cumulative[np.maximum(rows+starts-1, 0)], 0)
+    counts = np.where(ends > starts, cumulative[np.maximum(rows+ends-1, 0)], before) - before
+    medians = np.full((size, nbins), np.nan)
+    filled = counts > 0
+    lo = np.searchsorted(cumulative, before[filled] + (counts[filled]-1)//2 + 1)
+    hi = np.searchsorted(cumulative, before[filled] + counts[filled]//2 + 1)
+    medians[filled] = 0.5*(y_sorted[lo % n] + y_sorted[hi % n])
+    return medians
+
+def bootstrap_block(args):
+    """Statistics of a block of resamples. args is (kind, data, seed, size), with kind 'objects' and data
+    (b, y, nbins, statistic) sorted by (b, y), or kind 'counts' and data (k, n, model)."""
+    kind, data, seed, size = args
+    rng = np.random.default_rng(seed)
+    if kind == 'counts':
+        k, n, model = data
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if model == 'poisson':
+                drawn = rng.poisson(k, size=(size, len(n)))
+            else:
+                drawn = rng.binomial(n, np.where(n > 0, k/np.maximum(n, 1), 0), size=(size, len(n)))
+            return drawn/np.where(n > 0, n, np.nan)
+    b, y, nbins, statistic = data
+    indx = rng.integers(0, len(b), size=(size, len(b)))
+    if statistic == 'median':
+        return resampled_medians(indx, b, y, nbins)
+    indx = indx.ravel()
+    return stacked_statistic(b[indx], y[indx], nbins, statistic, size)
+
+###########################################################################################
+"""
+THE BOOTSTRAP DRIVER
+"""
+
+def bootstrap_tasks(kind, data, nboot, block_size, seed):
+    """Blocks of resamples (start, task) with the seeds spawned from seed."""
+    starts = np.arange(0, nboot, block_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    return [(start, (kind, data, seeds[n], min(block_size, nboot-start))) for n, start in enumerate(starts)]
+
+def run_bootstrap(kind, data, nbins, nboot, block_size, seed, p_workers):
+    """(nboot x nbins) realizations, filled as the rounds of blocks come back from the executor."""
+    if p_workers is None:
+        p_workers = SerialExecutor()
+    tasks = bootstrap_tasks(kind, data, nboot, block_size, seed)
+    realizations = np.zeros((nboot, nbins))
+    round_size = max(1, p_workers.nproc*CHUNKS_PER_WORKER)
+    for first in range(0, len(tasks), round_size):
+        batch = tasks[first:first+round_size]
+        for (start, task), values in zip(batch, p_workers.map(bootstrap_block, [task for start, task in batch])):
+            realizations[start:start+task[3]] = values
+    return realizations
+
+def bootstrap_summary(value, realizations, level, norm):
+    """Dictionary with the statistic, the bootstrap error (standard deviation of the realizations) and the
+    central confidence interval of the given level."""
+    if norm is not None:
+        value = value/norm
+        realizations = realizations/norm
+    results = {'statistic': value, 'realizations': realizations}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        results['error'] = np.nanstd(realizations, axis=0)
+        results['lower'], results['upper'] = np.nanpercentile(realizations, [50*(1-level), 50*(1+level)], axis=0)
+    return results
+
+def bootstrap_statistic(x, y, edges, statistic='mean', nboot=1000, level=0.68, seed=0, p_workers=None, norm=None):
+    """Bootstrap of the statistic of y in the bins of x with edges, resampling all the objects (those outside
+    the bins too, so the counts also change). For 'fraction' and 'rate' y holds 0/1 flags, and 'rate' is the
+    fraction divided by norm (e.g. the time spanned by each bin); any other statistic is also divided by norm
+    if it is given. p_workers is an executor (serial if None).
+
+    Returns a dictionary with:
+    statistic ====== the statistic of the sample, per bin
+    error ========== standard deviation of the bootstrap realizations
+    lower, upper === central confidence interval with probability level
+    realizations === (nboot x nbins) statistic of each resample"""
+    if statistic not in BOOTSTRAP_STATISTICS:
+        raise ValueError('Unknown statistic '+str(statistic)+', choose one of '+', '.join(BOOTSTRAP_STATISTICS))
+    if statistic == 'rate' and norm is None:
+        raise ValueError('The rate needs the normalization norm of each bin.')
+    edges = np.asarray(edges, dtype=np.float64)
+    nbins = len(edges)-1
+    b = bin_index(np.asarray(x, dtype=np.float64), edges)
+    y = np.asarray(y, dtype=np.float64)
+    order = np.lexsort((y, b))
+    b, y = b[order], y[order]
+    value = stacked_statistic(b, y, nbins, statistic, 1)[0]
+    block_size = int(min(nboot, max(1, BOOTSTRAP_BLOCK_ELEMENTS//max(len(b), 1))))
+    realizations = run_bootstrap('objects', (b, y, nbins, statistic), nbins, nboot, block_size, seed, p_workers)
+    return bootstrap_summary(value, realizations, level, norm)
+
+def bootstrap_counts(k, n, nboot=1000, level=0.68, seed=0, p_workers=None, norm=None, model='binomial'):
+    """Bootstrap of the fractions k/n in each bin, given only the counts, divided by norm if it is given
+    (rates). With model 'binomial' k are flagged objects out of the n objects, with 'poisson' k are events
+    counted per object (k can be larger than n). Returns the same dictionary as bootstrap_statistic."""
+    if model not in BOOTSTRAP_COUNT_MODELS:
+        raise ValueError('Unknown model '+str(model)+', choose one of '+', '.join(BOOTSTRAP_COUNT_MODELS))
+    k = np.asarray(k, dtype=np.int64)
+    n = np.asarray(n, dtype=np.int64)
+    if model == 'binomial' and np.any(k > n):
+        raise ValueError('The flagged counts k cannot be larger than the counts n, use the poisson model for events.')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(n > 0, k/np.maximum(n, 1), np.nan)
+    block_size = int(min(nboot, max(1, BOOTSTRAP_BLOCK_ELEMENTS//max(len(n), 1))))
+    realizations = run_bootstrap('counts', (k, n, model), len(n), nboot, block_size, seed, p_workers)
+    return bootstrap_summary(value, realizations, level, norm)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Bulk reading of the galaxy properties needed by progen_extractor.py from a Caesar file. Every quantity is
+read as a whole array, straight from the galaxy datasets of the Caesar HDF5 file when h5py is available,
+or in a single pass over sim.galaxies otherwise. The result is a dictionary of contiguous arrays indexed
+by the Caesar galaxy index, with the same names used in progen_tracks.TRACK_FIELDS.
+
+If the galaxy indexes rows are given, only those galaxies are read (in the order of rows), so the I/O and
+memory of a snapshot shrink with the galaxies selected. The rows are read from the HDF5 file as a contiguous
+slice when they are dense, or with sorted fancy indexing otherwise.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# Location of each quantity in the Caesar HDF5 file
+GALAXY_DATASETS = {
+    'g_type': 'galaxy_data/central',
+    'm': 'galaxy_data/dicts/masses.stellar',
+    'h1_gas': 'galaxy_data/dicts/masses.HI',
+    'h2_gas': 'galaxy_data/dicts/masses.H2',
+    'sfr': 'galaxy_data/sfr',
+    'pos': 'galaxy_data/pos',
+    'caesar_id': 'galaxy_data/GroupID',
+    'local_den': 'galaxy_data/local_mass_density',
+    'bhar': 'galaxy_data/bhmdot',
+    'bhm': 'galaxy_data/dicts/masses.bh',
+}
+# Quantities that are not present in runs without black holes, set to zero
+OPTIONAL_FIELDS = ['bhar', 'bhm']
+# Rows are read as one contiguous slice when they are at least this fraction of the galaxies they span
+DENSE_FRACTION = 0.1
+
+###########################################################################################
+"""
+FUNCTIONS TO HARVEST A SNAPSHOT
+"""
+
+def harvest_snapshot(filename, fields=None, rows=None, whole_fields=[]):
+    """Simulation parameters and galaxy properties of a Caesar file, as (sim_info, snap_data). If rows is
+    given only those galaxies are read, except for the quantities in whole_fields, read for all of them."""
+    if fields is None:
+        fields = list(GALAXY_DATASETS.keys())
+    whole = [name for name in fields if rows is None or name in whole_fields]
+    fields = [name for name in fields if name not in whole]
+    if h5py is not None:
+        with h5py.File(filename, 'r') as f:
+            if 'galaxy_data' in f:
+                snap_data = read_galaxy_datasets(f, whole)
+                snap_data.update(read_galaxy_datasets(f, fields, rows=rows))
+                return read_simulation_info(f), snap_data
+    import caesar
+    sim = caesar.load(filename, LoadHalo=False)
+    sim_info = {}
+    sim_info['redshift'] = sim.simulation.redshift
+    sim_info['hubble_constant'] = sim.simulation.hubble_constant
+    sim_info['omega_matter'] = sim.simulation.omega_matter
+    sim_info['omega_baryon'] = sim.simulation.omega_baryon
+    sim_info['boxsize_in_kpccm'] = float(sim.simulation.boxsize.to('kpccm'))
+    snap_data = harvest_galaxies(sim.galaxies, whole)
+    snap_data.update(harvest_galaxies(sim.galaxies, fields, rows=rows))
+    return sim_info, snap_data
+
+def read_simulation_info(f):
+    attrs = f['simulation_attributes'].attrs
+    sim_info = {}
+    for key in ['redshift', 'hubble_constant', 'omega_matter', 'omega_baryon']:
+        sim_info[key] = float(attrs[key])
+    boxsize = float(attrs['boxsize'])
+    units = f['simulation_attributes'].get('units')
+    if units is not None and 'boxsize' in units.attrs:
+        unit = units.attrs['boxsize']
+        if isinstance(unit, bytes):
+            unit = unit.decode()
+        if unit.endswith('/h'):
+            boxsize = boxsize/sim_info['hubble_constant']
+    sim_info['boxsize_in_kpccm'] = boxsize
+    return sim_info
+
+def read_rows(dset, rows):
+    """Rows of an HDF5 dataset in the order of rows (which may repeat), reading each of them once."""
+    unique, inverse = np.unique(rows, return_inverse=True)
+    if len(unique) == 0:
+        return dset[0:0]
+    start, stop = int(unique[0]), int(unique[-1])+1
+    if len(unique) >= DENSE_FRACTION*(stop-start):
+        values = dset[start:stop][unique-start]
+    else:
+        # h5py only takes increasing indexes
+        values = dset[unique]
+    return values[inverse.ravel()]
+
+def read_galaxy_datasets(f, fields, rows=None):
+    """Galaxy quantities of an open Caesar file, for all the galaxies or only for those in rows."""
+    ngal = f['galaxy_data/GroupID'].shape[0] if rows is None else len(rows)
+    snap_data = {}
+    for name in fields:
+        path = GALAXY_DATASETS[name]
+        if path in f:
+            snap_data[name] = f[path][:] if rows is None else read_rows(f[path], np.asarray(rows, dtype=np.int64))
+        elif name in OPTIONAL_FIELDS:
+            snap_data[name] = np.zeros(ngal)
+        else:
+            raise KeyError('Dataset %s not found in Caesar file %s' % (path, f.filename))
+    return snap_data
+
+def harvest_galaxies(galaxies, fields, rows=None):
+    """Single pass over a list of Caesar galaxy objects (only those in rows if given). Missing BH quantities
+    become zeros."""
+    if rows is not None:
+        galaxies = [galaxies[i] for i in rows]
+    ngal = len(galaxies)
+    snap_data = {}
+    for name in fields:
+        if name == 'pos':
+            snap_data[name] = np.zeros((ngal, 3))
+        else:
+            snap_data[name] = np.zeros(ngal)
+    getters = {
+        'g_type': lambda g: g.central,
+        'm': lambda g: g.masses['stellar'],
+        'h1_gas': lambda g: g.masses['HI'],
+        'h2_gas': lambda g: g.masses['H2'],
+        'sfr': lambda g: g.sfr,
+        'pos': lambda g: g.pos.d, # the .d removes the units
+        'caesar_id': lambda g: g.GroupID,
+        'local_den': lambda g: g.local_mass_density,
+        'bhar': lambda g: g.bhmdot.d if hasattr(g, 'bhmdot') else 0.0,
+        'bhm': lambda g: g.masses['bh'].d if 'bh' in g.masses else 0.0,
+    }
+    getters = [(snap_data[name], getters[name]) for name in fields]
+    for i, gal in enumerate(galaxies):
+        for values, getter in getters:
+            values[i] = getter(gal)
+    return snap_data
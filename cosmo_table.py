@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Cosmology and time lookup table of a simulation. The cosmological model is built only once, from the
+parameters of one Caesar file, and used to tabulate the age of the universe and the lookback time on a fine
+grid in redshift. For the snapshots of the simulation the table keeps the redshift, age and lookback time,
+together with the 'start' and 'end' sSFR thresholds of sfr_condition_2 in quenchingFinder.py, so that the
+finders can read them as arrays instead of computing log10(1/t) again for every galaxy.
+
+The table is saved as a .npz file next to the progen output.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import os
+
+# Parameters of the cosmological model kept in the table
+COSMO_PARAMETERS = ['hubble_constant', 'omega_matter', 'omega_baryon']
+# Redshift grid on which the ages are tabulated, evenly spaced in log(1+z)
+Z_GRID_MAX = 20.0
+Z_GRID_SIZE = 4000
+# Normalisation of the sSFR thresholds, log10(norm/t_H) - 9 with t_H in Gyr
+SSFR_NORMS = {'start': 1.0, 'end': 0.2}
+
+###########################################################################################
+"""
+FUNCTIONS TO BUILD THE TABLE
+"""
+
+def simulation_cosmology(sim_info):
+    from astropy.cosmology import FlatLambdaCDM
+    h = sim_info['hubble_constant']  # this is the hubble parameter = H0/100
+    return FlatLambdaCDM(H0=100*h, Om0=sim_info['omega_matter'], Ob0=sim_info['omega_baryon'],Tcmb0=2.73)
+
+def new_cosmo_table(sim_info):
+    """Age of the universe and lookback time (Gyr) on the redshift grid, for the cosmology of sim_info."""
+    cosmo = simulation_cosmology(sim_info)
+    table = {}
+    for key in COSMO_PARAMETERS:
+        table[key] = float(sim_info[key])
+    table['z_grid'] = np.expm1(np.linspace(0.0, np.log1p(Z_GRID_MAX), Z_GRID_SIZE))
+    table['age_grid'] = cosmo.age(table['z_grid']).value
+    table['lookback_grid'] = table['age_grid'][0] - table['age_grid']
+    return table
+
+def fill_snapshot_times(table, redshifts):
+    """Add the per-snapshot arrays for the snapshots at the given redshifts."""
+    table['redshifts'] = np.asarray(redshifts, dtype=np.float64)
+    table['t_hubble'] = age_of(table, table['redshifts'])
+    table['lookback'] = lookback_of(table, table['redshifts'])
+    table['ssfr_start'] = ssfr_threshold('start', table['t_hubble'])
+    table['ssfr_end'] = ssfr_threshold('end', table['t_hubble'])
+    return table
+
+def snapshot_cosmo_table(redshifts, t_hubble):
+    """Per-snapshot table built straight from the redshifts and ages of a progen dictionary, without the
+    redshift grid (for progen files extracted before the table existed)."""
+    table = {}
+    table['redshifts'] = np.asarray(redshifts, dtype=np.float64)
+    table['t_hubble'] = np.asarray(t_hubble, dtype=np.float64)
+    table['ssfr_start'] = ssfr_threshold('start', table['t_hubble'])
+    table['ssfr_end'] = ssfr_threshold('end', table['t_hubble'])
+    return table
+
+###########################################################################################
+"""
+FUNCTIONS TO USE THE TABLE
+"""
+
+def ssfr_threshold(type, time):
+    """log10 sSFR threshold ('start' or 'end') for an age of the universe time in Gyr, scalar or array."""
+    return np.log10(SSFR_NORMS[type]/np.asarray(time))-9
+
+def snapshot_thresholds(table, z):
+    """'start' and 'end' thresholds along a galaxy track, read from the table at the snapshot redshifts z."""
+    thresholds = {}
+    for type in SSFR_NORMS:
+        thresholds[type] = np.interp(z, table['redshifts'], table['ssfr_'+type])
+    return thresholds
+
+def age_of(table, z):
+    """Age of the universe in Gyr at redshift z, interpolated on the redshift grid."""
+    return np.interp(np.log1p(z), np.log1p(table['z_grid']), table['age_grid'])
+
+def lookback_of(table, z):
+    return np.interp(np.log1p(z), np.log1p(table['z_grid']), table['lookback_grid'])
+
+def redshift_of(table, t):
+    """Redshift at which the universe had an age t in Gyr (the ages grow as the redshift decreases)."""
+    log1pz = np.interp(t, table['age_grid'][::-1], np.log1p(table['z_grid'])[::-1])
+    return np.expm1(log1pz)
+
+###########################################################################################
+"""
+FUNCTIONS TO SAVE AND LOAD THE TABLE
+"""
+
+def save_cosmo_table(table, filename):
+    tmp_file = filename+'.tmp.npz'
+    np.savez(tmp_file, **table)
+    os.rename(tmp_file, filename)
+
+def load_cosmo_table(filename):
+    table = {}
+    with np.load(filename) as f:
+        for key in f.files:
+            table[key] = f[key][()] if f[key].ndim == 0 else f[key]
+    return table
+
+def same_cosmology(table, sim_info):
+    return all([key in table and np.isclose(table[key], sim_info[key]) for key in COSMO_PARAMETERS])
+
+def same_snapshots(table, redshifts, t_hubble):
+    """True if the per-snapshot arrays of the table are those of the progen data, for the snapshots that
+    were extracted (t_hubble > 0)."""
+    if 'redshifts' not in table or len(table['redshifts']) != len(redshifts):
+        return False
+    extracted = np.asarray(t_hubble) > 0
+    return bool(np.allclose(table['redshifts'][extracted], np.asarray(redshifts)[extracted]) and
+                np.allclose(table['t_hubble'][extracted], np.asarray(t_hubble)[extracted], rtol=1e-4))
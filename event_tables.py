@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Compact tables for the events found by the finders. All the mergers, quenches and rejuvenations of a
+population are kept in one NumPy structured array per kind of event, with one row per event keyed by the
+position of its galaxy in the catalog and the snapshot index of the event along the galaxy track:
+
+mergers ======== galaxy, indx, merger_ratio, fgas_boost (24 bytes per event)
+quenches ======= galaxy, above9, below11, indx, quench_time (24 bytes per event)
+rejuvenations == galaxy, indx (8 bytes per event)
+
+Missing indexes (e.g. a quench without below11) are -1 (None in the records) and missing times are NaN.
+Selections over all the events are a single mask, e.g. the mergers with 0 < z < 0.5 are
+    z = event_values(catalog, mergers, 'z'); mergers[(z > 0) & (z < 0.5)]
+
+The record classes give the attribute access of galaxy_class.Merger and Quench over a row of a table.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+
+EVENT_DTYPES = {
+    'mergers': np.dtype([('galaxy', np.int32), ('indx', np.int32), ('merger_ratio', np.float64), ('fgas_boost', np.float64)]),
+    'quenches': np.dtype([('galaxy', np.int32), ('above9', np.int32), ('below11', np.int32), ('indx', np.int32), ('quench_time', np.float64)]),
+    'rejuvenations': np.dtype([('galaxy', np.int32), ('indx', np.int32)]),
+}
+
+###########################################################################################
+"""
+FUNCTIONS TO BUILD AND QUERY THE TABLES
+"""
+
+def new_events(name, n=0):
+    return np.zeros(n, dtype=EVENT_DTYPES[name])
+
+def events_from_rows(name, rows):
+    """Table from a list of tuples in the column order of the table. None becomes -1 or NaN."""
+    dtype = EVENT_DTYPES[name]
+    table = new_events(name, len(rows))
+    if len(rows) == 0:
+        return table
+    columns = list(zip(*rows))
+    for k, column in enumerate(dtype.names):
+        missing = -1 if dtype[column].kind == 'i' else np.nan
+        table[column] = [missing if v is None else v for v in columns[k]]
+    return table
+
+def concatenate_events(name, tables):
+    tables = [table for table in tables if len(table) > 0]
+    if not tables:
+        return new_events(name)
+    return np.concatenate(tables).astype(EVENT_DTYPES[name])
+
+def sort_events(table):
+    """Sort the events by galaxy, keeping the order in which the events of each galaxy were found, so that
+    they are a contiguous block."""
+    return table[np.argsort(table['galaxy'], kind='stable')]
+
+def galaxy_rows(table, i):
+    """Rows of the events of galaxy i in a sorted table."""
+    return slice(np.searchsorted(table['galaxy'], i, side='left'), np.searchsorted(table['galaxy'], i, side='right'))
+
+def event_values(catalog, table, name, column='indx'):
+    """Value of track name at the snapshot of every event, with a single gather over the catalog."""
+    values = np.full(len(table), np.nan)
+    valid = table[column] >= 0
+    values[valid] = catalog.tracks[name][catalog.offsets[table['galaxy'][valid]] + table[column][valid]]
+    return values
+
+###########################################################################################
+"""
+RECORD VIEWS WITH THE ATTRIBUTES OF THE LEGACY CLASSES
+"""
+
+class EventRecord(object):
+    __slots__ = ['table', 'row']
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+    def _get(self, column):
+        value = self.table[column][self.row]
+        # Only the missing indexes become None, NaN values (e.g. of fgas_boost) are kept as in the legacy classes
+        if self.table.dtype[column].kind == 'i':
+            return None if value < 0 else int(value)
+        return float(value)
+
+class MergerRecord(EventRecord):
+    __slots__ = []
+    indx = property(lambda self: self._get('indx'))
+    merger_ratio = property(lambda self: self._get('merger_ratio'))
+    fgas_boost = property(lambda self: self._get('fgas_boost'))
+
+class QuenchRecord(EventRecord):
+    __slots__ = []
+    above9 = property(lambda self: self._get('above9'))
+    below11 = property(lambda self: self._get('below11'))
+    indx = property(lambda self: self._get('indx'))
+    quench_time = property(lambda self: self._get('quench_time'))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Executors used to run the finders over the galaxies: serially, with a pool of threads or with a pool of
+processes. All of them have the map(function, args) method used by merger_finder and quenchingFinder, with
+an explicit chunk size (by default the tasks are split in about 4 chunks per worker).
+
+The pools are only started the first time map is called, and the same pool is reused by all the stages
+that get the executor, so small test boxes or notebooks run with executor='serial' never fork processes.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+EXECUTORS = ['serial', 'thread', 'process']
+# Chunks per worker when no chunk size is given
+CHUNKS_PER_WORKER = 4
+
+###########################################################################################
+"""
+THE EXECUTORS
+"""
+
+class SerialExecutor(object):
+    kind = 'serial'
+    def __init__(self, nproc=1, chunksize=None):
+        self.nproc = 1
+        self.chunksize = chunksize
+    def map(self, function, args, chunksize=None):
+        return [function(arg) for arg in args]
+    def close(self):
+        pass
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+class PoolExecutor(SerialExecutor):
+    """Base of the executors with a pool of workers, started when it is first needed with the new_pool
+    method of the subclasses."""
+    def __init__(self, nproc=None, chunksize=None):
+        if nproc is None:
+            nproc = multiprocessing.cpu_count()
+        self.nproc = nproc
+        self.chunksize = chunksize
+        self.pool = None
+    def task_chunksize(self, ntasks, chunksize=None):
+        if chunksize is None:
+            chunksize = self.chunksize
+        if chunksize is None:
+            chunksize = max(1, ntasks//(CHUNKS_PER_WORKER*self.nproc))
+        return chunksize
+    def map(self, function, args, chunksize=None):
+        args = list(args)
+        if len(args) == 0:
+            return []
+        if self.nproc <= 1 or len(args) == 1:
+            return [function(arg) for arg in args]
+        if self.pool is None:
+            self.pool = self.new_pool()
+        return self.pool.map(function, args, self.task_chunksize(len(args), chunksize))
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+class ThreadExecutor(PoolExecutor):
+    kind = 'thread'
+    def new_pool(self):
+        return ThreadPool(self.nproc)
+
+class ProcessExecutor(PoolExecutor):
+    kind = 'process'
+    def new_pool(self):
+        return multiprocessing.Pool(self.nproc)
+
+###########################################################################################
+"""
+FUNCTIONS TO SELECT AN EXECUTOR
+"""
+
+def get_executor(kind='process', nproc=None, chunksize=None):
+    """Executor of the given kind ('serial', 'thread' or 'process') with nproc workers (all the cores by
+    default) and chunksize tasks sent to a worker at once (automatic by default)."""
+    if kind == 'serial':
+        return SerialExecutor(chunksize=chunksize)
+    elif kind == 'thread':
+        return ThreadExecutor(nproc=nproc, chunksize=chunksize)
+    elif kind == 'process':
+        return ProcessExecutor(nproc=nproc, chunksize=chunksize)
+    raise ValueError('Unknown executor '+str(kind)+', choose one of '+', '.join(EXECUTORS))
+
+def add_executor_arguments(parser):
+    """Command line options to choose the executor."""
+    parser.add_argument('--executor', default='process', choices=EXECUTORS, help='how the finders run over the galaxies')
+    parser.add_argument('--nproc', type=int, default=None, help='number of workers (default: all the cores)')
+    parser.add_argument('--chunksize', type=int, default=None, help='tasks sent to a worker at once (default: automatic)')
+    return parser
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Columnar catalog of galaxies, used instead of a list of GalaxyData objects. The tracks of all galaxies are
+kept as ragged arrays: one flat array of values per quantity, with the track of galaxy i in
+values[offsets[i]:offsets[i+1]]. The tracks run forward in time (the order used by GalaxyData), and the
+interpolated tracks of the quenching analysis have their own offsets. The events found by the finders
+(mergers, quenches and rejuvenations) are kept in the structured arrays of event_tables.py.
+
+Operations over the whole population become a single NumPy call on the flat arrays, e.g.
+catalog.tracks['sfr']/catalog.tracks['m'] or catalog.last('m'). For the legacy code, catalog.galaxy(i)
+returns a lightweight view with the same attributes as GalaxyData.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+from galaxy_class import GalaxyData
+from progen_tracks import galaxy_track, galaxy_ids_of
+from event_tables import EVENT_DTYPES, new_events, events_from_rows, sort_events, galaxy_rows, MergerRecord, QuenchRecord
+
+# Quantities followed along each track, with the name of the GalaxyData attribute and the progen field
+CATALOG_TRACKS = {
+    'sfr': 'sfr',
+    'm': 'm',
+    'z': 'z',
+    't': 't',
+    'h1_gas': 'h1_gas',
+    'h2_gas': 'h2_gas',
+    'bh_m': 'bhm',
+    'bhar': 'bhar',
+    'local_den': 'local_den',
+    'g_type': 'g_type',
+    'pos': 'pos',
+    'caesar_id': 'caesar_id',
+}
+# Quantities of the interpolated tracks
+INTERPOLATED_TRACKS = ['sfr', 'm', 't']
+
+###########################################################################################
+"""
+FUNCTIONS TO HANDLE RAGGED ARRAYS
+"""
+
+def ragged_offsets(lengths):
+    return np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+
+def ragged_owner(offsets):
+    """Position in the catalog of the galaxy that owns each entry of a ragged array."""
+    return np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+
+def ragged_positions(offsets):
+    """Position of each entry of a ragged array along its own track."""
+    start = offsets - offsets[0]
+    return np.arange(start[-1]) - start[ragged_owner(offsets)]
+
+def ragged_window(offsets, before, after):
+    """Flat indexes k of the entries with at least before entries before them and after entries after them
+    in their own track, so that the window values[k-before:k+after+1] never crosses into another track.
+    Returns k, the galaxy that owns each k and its position along the track."""
+    lengths = np.diff(offsets)
+    owner = ragged_owner(offsets)
+    positions = ragged_positions(offsets)
+    inside = np.flatnonzero((positions >= before) & (positions < lengths[owner]-after))
+    return inside + offsets[0], owner[inside], positions[inside]
+
+def ragged_take(offsets, indexes):
+    """Flat indexes of the entries of the tracks of galaxies indexes, one track after the other, and the
+    offsets of the new ragged array they make."""
+    lengths = np.diff(offsets)[indexes]
+    new_offsets = ragged_offsets(lengths)
+    take = np.arange(new_offsets[-1]) + np.repeat(np.asarray(offsets[:-1])[indexes] - new_offsets[:-1], lengths)
+    return take, new_offsets
+
+def ragged_to_padded(values, offsets, fill=np.nan):
+    """(ngal x longest track) matrix of a ragged array, with each track starting at column 0 and filled
+    with fill after its end."""
+    lengths = np.diff(offsets)
+    owner = ragged_owner(offsets)
+    start = offsets - offsets[0]
+    padded = np.full((len(lengths), lengths.max() if len(lengths) > 0 else 0)+values.shape[1:], fill, dtype=values.dtype)
+    padded[owner, np.arange(len(owner))-start[owner]] = values[offsets[0]:offsets[-1]]
+    return padded
+
+###########################################################################################
+"""
+THE CATALOG
+"""
+
+class GalaxyCatalog:
+    def __init__(self, progen_ids, offsets, tracks, interp_offsets=None, interp=None, events=None, meta=None):
+        self.progen_ids = np.asarray(progen_ids, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.tracks = tracks
+        if interp_offsets is None:
+            interp_offsets = np.zeros(len(self.progen_ids)+1, dtype=np.int64)
+            interp = {}
+            for name in INTERPOLATED_TRACKS:
+                interp[name] = np.zeros(0)
+        self.interp_offsets = np.asarray(interp_offsets, dtype=np.int64)
+        self.interp = interp
+        if events is None:
+            events = {}
+        for name in EVENT_DTYPES:
+            if name not in events:
+                events[name] = new_events(name)
+        self.events = events
+        self.meta = {} if meta is None else meta
+        self.lssfr = None
+        # {catalog position: (mags, scs)} of the galaxies crossmatched with the photometry
+        self.photometry = None
+    def __len__(self):
+        return len(self.progen_ids)
+    def lengths(self):
+        return np.diff(self.offsets)
+    def owner(self):
+        return ragged_owner(self.offsets)
+    def track(self, name, i):
+        return self.tracks[name][self.offsets[i]:self.offsets[i+1]]
+    def interpolated(self, name, i):
+        """Interpolated track of galaxy i, or 0 (as in GalaxyData) if it has none."""
+        if self.interp_offsets[i+1] == self.interp_offsets[i]:
+            return 0
+        return self.interp[name][self.interp_offsets[i]:self.interp_offsets[i+1]]
+    def last(self, name):
+        """Last value (the latest snapshot) of the track of every galaxy, NaN for empty tracks."""
+        values = np.full((len(self),)+self.tracks[name].shape[1:], np.nan)
+        filled = self.lengths() > 0
+        values[filled] = self.tracks[name][self.offsets[1:][filled]-1]
+        return values
+    def ssfr(self):
+        return self.tracks['sfr']/self.tracks['m']
+    def set_interpolated(self, interp_tracks):
+        """Set the interpolated tracks from a dictionary {catalog position: (sfr, m, t)}."""
+        lengths = np.zeros(len(self), dtype=np.int64)
+        for i in interp_tracks:
+            lengths[i] = len(interp_tracks[i][2])
+        self.interp_offsets = ragged_offsets(lengths)
+        order = sorted(interp_tracks.keys())
+        for k, name in enumerate(INTERPOLATED_TRACKS):
+            if order:
+                self.interp[name] = np.concatenate([np.asarray(interp_tracks[i][k], dtype=np.float64) for i in order])
+            else:
+                self.interp[name] = np.zeros(0)
+    def set_photometry(self, galaxies):
+        """Keep the magnitudes and super colours of a list of GalaxyData crossmatched with the photometry."""
+        self.photometry = dict([(i, (galaxy.mags, galaxy.scs)) for i, galaxy in enumerate(galaxies) if galaxy.mags or galaxy.scs])
+    def set_events(self, name, table):
+        """Replace the table of events name, sorting it by galaxy so that galaxy lookups are a bisection."""
+        self.events[name] = sort_events(np.asarray(table, dtype=EVENT_DTYPES[name]))
+    def event_rows(self, name, i):
+        rows = galaxy_rows(self.events[name], i)
+        return np.arange(rows.start, rows.stop)
+    def galaxy(self, i):
+        return GalaxyView(self, i)
+    def galaxies(self):
+        return [GalaxyView(self, i) for i in range(0, len(self))]
+    def to_galaxies(self):
+        """Full GalaxyData objects, for code that needs to modify them."""
+        galaxies = []
+        for i in range(0, len(self)):
+            view = GalaxyView(self, i)
+            galaxy = GalaxyData(self.progen_ids[i], view.sfr[0], view.m[0], view.z, view.t[0], view.h1_gas, view.h2_gas,
+                                view.bh_m, view.bhar, view.local_den, view.g_type, view.pos, view.caesar_id)
+            if not isinstance(view.t[1], int):
+                galaxy.interpolated_data(view.sfr[1], view.m[1], view.t[1])
+            galaxy.mergers = view.mergers
+            galaxy.quenching = view.quenching
+            galaxy.rejuvenations = view.rejuvenations
+            galaxy.mags, galaxy.scs = view.mags, view.scs
+            if self.lssfr is not None:
+                galaxy.lssfr[0] = dict([(key, self.lssfr[key][self.offsets[i]:self.offsets[i+1]]) for key in self.lssfr])
+            galaxies.append(galaxy)
+        return galaxies
+
+    @classmethod
+    def from_progen(cls, d):
+        """Catalog of all the galaxies of a progen dictionary, in either layout."""
+        galaxy_ids = galaxy_ids_of(d)
+        tracks = {}
+        if 'tracks' in d:
+            # Reverse the snapshot order so that the tracks run forward in time, as in GalaxyData
+            valid = np.asarray(d['tracks']['valid'])[:,::-1]
+            offsets = ragged_offsets(np.sum(valid, axis=1))
+            nsnap = valid.shape[1]
+            for name in CATALOG_TRACKS:
+                if name == 'z':
+                    tracks[name] = np.broadcast_to(d['redshifts'][:nsnap][::-1], valid.shape)[valid]
+                elif name == 't':
+                    tracks[name] = np.broadcast_to(d['t_hubble'][:nsnap][::-1], valid.shape)[valid]
+                elif CATALOG_TRACKS[name] in d['tracks']:
+                    tracks[name] = np.asarray(d['tracks'][CATALOG_TRACKS[name]])[:,::-1][valid]
+        else:
+            lengths = [len(galaxy_track(d, 'm', i)) for i in range(0, len(galaxy_ids))]
+            offsets = ragged_offsets(lengths)
+            for name in CATALOG_TRACKS:
+                if CATALOG_TRACKS[name]+'0' in d or name in ['z', 't']:
+                    tracks[name] = np.concatenate([np.asarray(galaxy_track(d, CATALOG_TRACKS[name], i))[::-1] for i in range(0, len(galaxy_ids))])
+        return cls(galaxy_ids, offsets, tracks)
+
+    @classmethod
+    def from_galaxies(cls, galaxies):
+        """Catalog built from a list of GalaxyData objects, with their interpolated tracks and events."""
+        offsets = ragged_offsets([len(galaxy.m[0]) for galaxy in galaxies])
+        tracks = {}
+        for name in CATALOG_TRACKS:
+            if name in INTERPOLATED_TRACKS:
+                tracks[name] = np.concatenate([np.asarray(getattr(galaxy, name)[0]) for galaxy in galaxies])
+            else:
+                tracks[name] = np.concatenate([np.asarray(getattr(galaxy, name)) for galaxy in galaxies])
+        catalog = cls([galaxy.progen_id for galaxy in galaxies], offsets, tracks)
+        interp_tracks = {}
+        for i, galaxy in enumerate(galaxies):
+            if not isinstance(galaxy.t[1], int):
+                interp_tracks[i] = (galaxy.sfr[1], galaxy.m[1], galaxy.t[1])
+        catalog.set_interpolated(interp_tracks)
+        rows = {'mergers':[], 'quenches':[], 'rejuvenations':[]}
+        for i, galaxy in enumerate(galaxies):
+            for merger in galaxy.mergers:
+                rows['mergers'].append((i, merger.indx, merger.merger_ratio, merger.fgas_boost))
+            for quench in galaxy.quenching:
+                rows['quenches'].append((i, quench.above9, quench.below11, quench.indx, quench.quench_time))
+            for indx in galaxy.rejuvenations:
+                rows['rejuvenations'].append((i, indx))
+        for name in rows:
+            catalog.set_events(name, events_from_rows(name, rows[name]))
+        return catalog
+
+###########################################################################################
+"""
+LIGHTWEIGHT VIEWS FOR THE LEGACY CODE
+"""
+
+class GalaxyView(object):
+    """Read-only view of a galaxy of a GalaxyCatalog with the attributes of GalaxyData. The lists of events
+    are built once per view, so that the same record is returned every time (as with GalaxyData, the legacy
+    code compares them by identity, e.g. quench is galaxy.quenching[-1])."""
+    __slots__ = ['catalog', 'i', 'lssfr', 'events']
+    def __init__(self, catalog, i):
+        self.catalog = catalog
+        self.i = i
+        # sSFR thresholds cached by quenchingFinder.ssfr_thresholds
+        self.lssfr = [None,None]
+        self.events = {}
+    def _track(self, name):
+        return self.catalog.track(name, self.i)
+    def _pair(self, name):
+        return [self._track(name), self.catalog.interpolated(name, self.i)]
+    @property
+    def progen_id(self):
+        return int(self.catalog.progen_ids[self.i])
+    @property
+    def interpolation(self):
+        return self.catalog.interp_offsets[self.i+1] > self.catalog.interp_offsets[self.i]
+    sfr = property(lambda self: self._pair('sfr'))
+    m = property(lambda self: self._pair('m'))
+    t = property(lambda self: self._pair('t'))
+    z = property(lambda self: self._track('z'))
+    h1_gas = property(lambda self: self._track('h1_gas'))
+    h2_gas = property(lambda self: self._track('h2_gas'))
+    bh_m = property(lambda self: self._track('bh_m'))
+    bhar = property(lambda self: self._track('bhar'))
+    local_den = property(lambda self: self._track('local_den'))
+    g_type = property(lambda self: self._track('g_type'))
+    pos = property(lambda self: self._track('pos'))
+    caesar_id = property(lambda self: self._track('caesar_id'))
+    @property
+    def ssfr(self):
+        sfr, m = self.sfr, self.m
+        return [sfr[0]/m[0], 0 if isinstance(m[1], int) else sfr[1]/m[1]]
+    def _events(self, name, record):
+        """Records of the events name of the galaxy, built again only if the table has been replaced."""
+        table = self.catalog.events[name]
+        if name not in self.events or self.events[name][0] is not table:
+            self.events[name] = (table, [record(table, k) for k in self.catalog.event_rows(name, self.i)])
+        return self.events[name][1]
+    @property
+    def mergers(self):
+        return self._events('mergers', MergerRecord)
+    @property
+    def quenching(self):
+        return self._events('quenches', QuenchRecord)
+    @property
+    def mags(self):
+        if self.catalog.photometry is None or self.i not in self.catalog.photometry:
+            return []
+        return self.catalog.photometry[self.i][0]
+    @property
+    def scs(self):
+        if self.catalog.photometry is None or self.i not in self.catalog.photometry:
+            return []
+        return self.catalog.photometry[self.i][1]
+    @property
+    def rejuvenations(self):
+        return self._events('rejuvenations', lambda table, k: int(table['indx'][k]))
@@ -23,6 +23,7 @@ class GalaxyData:
         self.m = [m,0]
         self.z = z
         self.t = [t,0]
+        self.lssfr = [None,None]
         self.h1_gas = h1_gas
         self.h2_gas = h2_gas
         self.bh_m = bh_m
@@ -49,15 +50,30 @@ class GalaxyData:
         self.sfr[1] = np.asarray(sfr_new)
         self.m[1] = np.asarray(m_new)
         self.t[1] = np.asarray(t_new)
+        self.lssfr[1] = None
 
-class Quench:
+class SlottedRecord(object):
+    """Pickling of the event classes, which keep their attributes in __slots__ (also for pickle files
+    written when they still had a __dict__)."""
+    __slots__ = []
+    def __getstate__(self):
+        return dict([(key, getattr(self, key)) for key in self.__slots__])
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = state[-1]
+        for key in state:
+            setattr(self, key, state[key])
+
+class Quench(SlottedRecord):
+    __slots__ = ['above9', 'below11', 'quench_time', 'indx']
     def __init__(self, above9):
         self.above9 = above9
         self.below11 = None
         self.quench_time = None
         self.indx = None
 
-class Merger:
+class Merger(SlottedRecord):
+    __slots__ = ['indx', 'merger_ratio', 'fgas_boost']
     def __init__(self,indx,merger_ratio,fgas_boost):
         self.indx = indx
         self.merger_ratio = merger_ratio
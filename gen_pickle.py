@@ -8,7 +8,9 @@ Created on 24 July 2019
 
 This code uses the mergerFinder and quenchingFinder algorithms to create dictionaries of GalaxyData holding 
 the details of mergers and quenching galaxies found. This dictionaries are saved in pickle file such that they
-can be used afterwards mutiple times.
+can be used afterwards mutiple times. The results are also saved in the results store mandq_results_MODEL
+(see results_store.py), which the analysis scripts read instead when it exists; with --no-pickle only the
+store is saved.
 
 For questions about the code:
 s1650043@ed.ac.uk
@@ -17,91 +19,161 @@ s1650043@ed.ac.uk
 import numpy as np
 import pickle
 import sys
-
-from galaxy_class import GalaxyData
+import os
+
+from progen_tracks import galaxy_ids_of
+from galaxy_catalog import GalaxyCatalog
+from progen_store import load_progen_store, is_progen_store
+from results_store import save_results_store
+from stage_cache import StageCache, stat_fingerprint, data_fingerprint, module_fingerprint
+from cosmo_table import load_cosmo_table, snapshot_cosmo_table, snapshot_thresholds, same_snapshots
+import mergerFinder
+import quenchingFinder
 from mergerFinder import merger_finder
-from quenchingFinder import quenchingFinder
-sys.path.insert(0, '../photo/SCA_simba')
+from quenchingFinder import quenching_stage
+from shared_tracks import shared_memory
+PHOTOMETRY_DIR = '../photo/SCA_simba' # Code (and default data) of the photometry crossmatch
+sys.path.insert(0, PHOTOMETRY_DIR)
+import loser_extractor
 from loser_extractor import read_mags, crossmatch_loserandquench
 
 """Setting multiprocessing capabilities"""
-import sys
-import multiprocessing
-
-#Let's create a pool of workers, that is a set of processes that we can use to handle computation.
-num_proc = multiprocessing.cpu_count()
-p_workers = multiprocessing.Pool(num_proc)
-
-MODEL = sys.argv[1]  # e.g. m50n512
-WIND = sys.argv[2]   # e.g. s50
-SNAP_0 = int(sys.argv[3]) # e.g. 125
-magcols = sys.argv[4:] # for UVJ plots, you need 6 0 7
+import argparse
+from executors import get_executor, add_executor_arguments
+
+parser = argparse.ArgumentParser(description='Find the mergers, quenchings and rejuvenations of the SIMBA galaxies.')
+parser.add_argument('MODEL', help='e.g. m50n512')
+parser.add_argument('WIND', help='e.g. s50')
+parser.add_argument('SNAP_0', type=int, help='e.g. 125')
+parser.add_argument('magcols', nargs='*', help='for UVJ plots, you need 6 0 7')
+parser.add_argument('--no-pickle', dest='pickle', action='store_false', help='only save the results store, not the mandq_results_MODEL.pkl pickle')
+parser.add_argument('--pickle', dest='pickle', action='store_true', help='save the mandq_results_MODEL.pkl pickle too (the default)')
+parser.add_argument('--cache-dir', '--cache_dir', default='./stage_cache', help='folder where the outputs of the stages are cached')
+parser.add_argument('--no-cache', '--no_cache', action='store_true', help='recompute all the stages and do not cache them')
+parser.add_argument('--per-galaxy', '--per_galaxy', action='store_true', help='run the finders galaxy by galaxy on the workers instead of the vectorized kernels')
+parser.add_argument('--photometry-files', nargs='+', default=[PHOTOMETRY_DIR], help='files or folders read by the photometry crossmatch, for the cache key')
+add_executor_arguments(parser)
+args = parser.parse_args()
+MODEL = args.MODEL
+WIND = args.WIND
+SNAP_0 = args.SNAP_0
+magcols = args.magcols
+
+#A single executor for all the stages, its pool of workers is only started when first needed
+p_workers = get_executor(args.executor, nproc=args.nproc, chunksize=args.chunksize)
+#Outputs of the stages cached under the hash of their inputs and parameters
+cache = StageCache(args.cache_dir, enabled=not args.no_cache)
 
 progen_file = '../progen_analysis/%s/progen_%s.pkl' % (MODEL, MODEL) # File holding the progen info of galaxies
+progen_store = '../progen_analysis/%s/progen_%s' % (MODEL, MODEL) # Columnar store, used instead if it exists
+cosmo_file = '../progen_analysis/%s/progen_%s_cosmo.npz' % (MODEL, MODEL) # Cosmology table of the simulation
 
 # Extract progen data from txt files
-obj = open(progen_file, 'rb')
-d = pickle.load(obj)
-obj.close()
-ngal = int(d['galaxies_per_snap'][0])
+if is_progen_store(progen_store):
+    d = load_progen_store(progen_store)
+    progen_key = stat_fingerprint(progen_store)
+else:
+    progen_key = stat_fingerprint(progen_file)
+    obj = open(progen_file, 'rb')
+    d = pickle.load(obj)
+    obj.close()
+# The cosmology table is only used if it belongs to the snapshots of the progen data
+cosmo = None
+if os.path.exists(cosmo_file):
+    cosmo = load_cosmo_table(cosmo_file)
+    if not same_snapshots(cosmo, d['redshifts'], d['t_hubble']):
+        print('Cosmology table '+cosmo_file+' does not match the progen data, using the progen snapshot times.')
+        cosmo = None
+if cosmo is None:
+    extracted = d['t_hubble'] > 0
+    cosmo = snapshot_cosmo_table(d['redshifts'][extracted], d['t_hubble'][extracted])
+galaxy_ids = galaxy_ids_of(d)
+ngal = len(galaxy_ids)
 print('Total number of galaxies at z = 0: '+str(ngal))
 
 #Store the galaxies sorted in objects of type GalaxyData
 d_results = {}
 d_results['redshifts'] = d['redshifts']
-d_results['sf_galaxies_mass'] = d['sf_galaxies_mass']
+if 'sf_table' in d:
+    d_results['sf_table'] = d['sf_table']
+else:
+    d_results['sf_galaxies_mass'] = d['sf_galaxies_mass']
 d_results['sf_galaxies_per_snap'] = d['sf_galaxies_per_snap']
 d_results['boxsize_in_kpccm'] = d['boxsize_in_kpccm']
-d_results['galaxies'] = []
-for i in range(0,ngal):
-    sfr_gal = d['sfr' + str(i)][::-1]
-    z_gal = d['z' + str(i)][::-1]
-    galaxy_t = d['t' + str(i)][::-1]
-    galaxy_m = d['m'+str(i)][::-1]
-    gal_type = d['g_type'+str(i)][::-1]
-    gal_pos = d['pos'+str(i)][::-1]
-    caesar_id = d['caesar_id'+str(i)][::-1]
-    h1_gas = d['h1_gas'+str(i)][::-1]
-    h2_gas = d['h2_gas'+str(i)][::-1]
-    local_den = d['local_den'+str(i)][::-1]
-    bh_m = d['bhm'+str(i)][::-1]
-    bhar = d['bhar'+str(i)][::-1]
-    galaxy = GalaxyData(i, sfr_gal, galaxy_m, z_gal, galaxy_t, h1_gas, h2_gas, bh_m, bhar,local_den, gal_type, gal_pos, caesar_id)
-    d_results['galaxies'].append(galaxy)
+d_results['cosmo_table'] = cosmo
+# Columnar catalog of all the galaxies, with the sSFR thresholds read from the cosmology table at once
+catalog = GalaxyCatalog.from_progen(d)
+catalog.lssfr = snapshot_thresholds(cosmo, catalog.tracks['z'])
 
 # Setting the limiting conditions of the survey
-max_ngal = len(d_results['galaxies'])
 mass_limit = 9.5
 min_merger_ratio = 0.2
 max_redshift_mergers = 2.5
+sfr_condition = 1
 
 d_results['mass_limit'], d_results['min_merger_ratio'], d_results['max_redshift_mergers'] = mass_limit,min_merger_ratio,max_redshift_mergers
 
-# Perform the search for mergers
-d_results['galaxies'] = merger_finder(d_results['galaxies'][0:max_ngal], min_merger_ratio, 10**mass_limit, max_redshift_mergers, p_workers)
+# The finders run on the flat tracks of the catalog, unless asked to go galaxy by galaxy on the workers
+vectorized = not args.per_galaxy
+# Share the tracks with the workers through shared memory when it is available
+shared = shared_memory is not None and p_workers.kind == 'process'
 
-print('Merger analysis done.')
+# The stages depend on the progen data, the cosmology table used and the code of the finders (with all the
+# modules they import)
+inputs = [progen_key, data_fingerprint(cosmo)]
 
-# Perform the quenching and rejuvenation analysis
-d_results['galaxies'] = quenchingFinder(d_results['galaxies'][0:max_ngal], 1, mass_limit, p_workers)
+# Perform the search for mergers
+def merger_stage():
+    merger_finder(catalog, min_merger_ratio, 10**mass_limit, max_redshift_mergers, p_workers, shared=shared,
+                  vectorized='ragged' if vectorized else False)
+    return {'mergers': catalog.events['mergers']}
+merger_key, outputs = cache.run('mergers', inputs+[module_fingerprint(mergerFinder)],
+                                {'mass_limit': mass_limit, 'min_merger_ratio': min_merger_ratio,
+                                 'max_redshift_mergers': max_redshift_mergers}, merger_stage)
+catalog.set_events('mergers', outputs['mergers'])
 
-print('Performing interpolation of quenching data...')
+print('Merger analysis done.')
 
-d_results['galaxies'] = quenchingFinder(d_results['galaxies'][0:max_ngal], 1, mass_limit, p_workers, interpolation=True)
+# Perform the quenching and rejuvenation analysis, with the interpolation of the quenching data in the same tasks
+def quench_stage():
+    quenching_stage(catalog, sfr_condition, mass_limit, p_workers, shared=shared, vectorized=vectorized)
+    outputs = {'interp_offsets': catalog.interp_offsets, 'quenches': catalog.events['quenches'],
+               'rejuvenations': catalog.events['rejuvenations']}
+    for name in catalog.interp:
+        outputs['interp_'+name] = catalog.interp[name]
+    return outputs
+quench_key, outputs = cache.run('quenching', inputs+[module_fingerprint(quenchingFinder)],
+                                {'mass_limit': mass_limit, 'sfr_condition': sfr_condition}, quench_stage)
+catalog.interp_offsets = outputs['interp_offsets']
+for name in catalog.interp:
+    catalog.interp[name] = outputs['interp_'+name]
+catalog.set_events('quenches', outputs['quenches'])
+catalog.set_events('rejuvenations', outputs['rejuvenations'])
 
 print('Quenching analysis done.')
 
 print('Now performing cross matching of quenching catalogue and photometry data...')
 
-d_results['galaxies'] = crossmatch_loserandquench(MODEL,WIND,SNAP_0,d_results['galaxies'],magcols)
+def crossmatch_stage():
+    catalog.set_photometry(crossmatch_loserandquench(MODEL,WIND,SNAP_0,catalog.to_galaxies(),magcols))
+    return {'photometry': catalog.photometry}
+# The crossmatch gets the galaxies with their mergers and quenches, and reads the photometry files
+crossmatch_inputs = [merger_key, quench_key, module_fingerprint(loser_extractor)]+[stat_fingerprint(path) for path in args.photometry_files]
+crossmatch_key, outputs = cache.run('crossmatch', crossmatch_inputs, {'MODEL': MODEL, 'WIND': WIND, 'SNAP_0': SNAP_0,
+                                    'magcols': magcols}, crossmatch_stage)
+catalog.photometry = outputs['photometry']
 
 print('Cross matching done!')
-
-print('Now, saving data to pickle file...')
-
-import cPickle as pickle
-
-output = open('./mandq_results_'+str(MODEL)+'.pkl','wb')
-pickle.dump(d_results, output)
-print('Data saved in pickle file.')
-output.close()
+p_workers.close()
+
+print('Now, saving data to results store...')
+save_results_store(d_results, catalog, './mandq_results_'+str(MODEL))
+print('Data saved in results store.')
+
+if args.pickle:
+    print('Now, saving data to pickle file...')
+    d_results['galaxies'] = catalog.to_galaxies()
+    output = open('./mandq_results_'+str(MODEL)+'.pkl','wb')
+    pickle.dump(d_results, output)
+    print('Data saved in pickle file.')
+    output.close()
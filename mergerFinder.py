@@ -14,9 +14,17 @@ s1650043@ed.ac.uk
 import numpy as np
 import pylab as plt
 from scipy import stats
-import cPickle as pickle
-from quenchingFinder import sfr_condition_2, GalaxyData
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 from galaxy_class import GalaxyData, Merger
+from cosmo_table import ssfr_threshold
+from event_tables import new_events, events_from_rows, concatenate_events
+from shared_tracks import SharedCatalog, attach_catalog, index_ranges
+from galaxy_catalog import ragged_to_padded, ragged_window
+from subvolume_stats import subvolume_statistics
+from bootstrap_stats import bootstrap_statistic
 ###########################################################################################
 """
 FUNCTION THAT DEFINES THE CONDITIONS FOLLOWED TO DETECT A MERGER
@@ -38,67 +46,255 @@ MAIN FUNCTION FOR THE MERGER FINDER OVER THE GALAXIES
 
 ARGUMENTS
 
-galaxies ======= dictionary containing all the galaxies with their properties
-                    (ssfr in this case should be sfr instead)
+galaxies ======= GalaxyCatalog with all the galaxies and their tracks (see galaxy_catalog.py)
 merger_ratio === the ratio above which the code looks for mergers, i.e. R=4:1 would be merger_ratio=0.2
 mass_limit ===== minimum mass of final galaxy at which the code looks for mergers
 redshift_limit = maximum redshift at which the code looks for mergers
 out_file ======= if set to True, the merger results are saved in a pickle file for future
                     uses; if not, only the list of quenched galaxies is returned
+shared ========= if set to True, the tracks are put once in shared memory and each task only carries a
+                    range of galaxies (see shared_tracks.py)
+vectorized ===== if set to True, the mergers are found by merger_kernel on blocks of galaxies at once in
+                    this process, instead of galaxy by galaxy by the workers; if set to 'ragged', by
+                    ragged_mergers directly on the flat tracks of the catalog
 
-
+Each worker receives only the tracks needed by the merger conditions and returns the mergers of its galaxy
+as an event table (see event_tables.py), which are merged into the catalog.
 """
 def singlegalRoutine(args):
     # Unpack arguments
-    gal, redshift_limit, merger_condition, merger_ratio, mass_limit, sfr_condition_2 = args
-    mass = gal.m[0]
-    z = gal.z
-    t = gal.t[0]
-    sfr = gal.sfr[0]
-    fgas = gal.h2_gas[0]/gal.m[0]
-    n_merg = 0
+    gal_indx, mass, z, t, sfr, h2_gas, lssfr_end, redshift_limit, merger_ratio, mass_limit = args
+    fgas = h2_gas[0]/mass
+    ssfr = sfr/mass
+    rows = []
     for i in range(1, len(mass)-3):
         if z[i]<=redshift_limit:
             delta_t = t[i+1]-t[i]
             condition,ratio = merger_condition(sfr[i], delta_t, mass, i, merger_ratio, mass_limit)
-            sfcondition = sfr_condition_2('end', gal, i+1, 0)
-            ssfr = sfr/mass
+            sfcondition = lssfr_end[i+1]
             if condition == True and ssfr[i+1]>=(10**sfcondition):
                 boost = (fgas[i+1]-fgas[i-1])/fgas[i-1]
                 # Save data at the merger
-                merger = Merger(i,ratio,boost)
-                gal.mergers.append(merger)
-                n_merg = n_merg + 1
-            # else:
-            #     if mass[i]>mass_limit and ssfr[i]>=(10**sfcondition) and fgas[i]>0:
-            #         sf_gal = GalaxyData(id,sfr[i],sfe[i],z[i],time[i],mass[i],fgas[i],type[i], pos[i], c_id[i])
-            #         # Add star forming galaxy to the list
-            #         sf_galaxies.append(sf_gal)
-    return n_merg
-def merger_finder(galaxies, merger_ratio, mass_limit, redshift_limit, p_workers, out_file=False):
+                rows.append((gal_indx, i, ratio, boost))
+    return events_from_rows('mergers', rows)
+
+def merger_args(galaxies, i, redshift_limit, merger_ratio, mass_limit):
+    """Arrays of galaxy i sent to the worker, with the 'end' sSFR thresholds of its snapshots."""
+    t = galaxies.track('t', i)
+    if galaxies.lssfr is not None:
+        lssfr_end = galaxies.lssfr['end'][galaxies.offsets[i]:galaxies.offsets[i+1]]
+    else:
+        lssfr_end = ssfr_threshold('end', t)
+    return (i, galaxies.track('m', i), galaxies.track('z', i), t, galaxies.track('sfr', i), galaxies.track('h2_gas', i),
+            lssfr_end, redshift_limit, merger_ratio, mass_limit)
+
+def rangeRoutine(args):
+    # Galaxies of a range of the catalog shared in memory
+    handle, indexes, redshift_limit, merger_ratio, mass_limit = args
+    galaxies = attach_catalog(handle)
+    tables = [singlegalRoutine(merger_args(galaxies, i, redshift_limit, merger_ratio, mass_limit)) for i in indexes]
+    return concatenate_events('mergers', tables)
 
-    args = [(galaxies[i], redshift_limit, merger_condition, merger_ratio, mass_limit, sfr_condition_2) for i in range(0, len(galaxies))]
+# Tracks read by the merger conditions
+MERGER_TRACKS = ['m', 'z', 't', 'sfr', 'h2_gas']
 
-    n_mergs = np.array(p_workers.map(singlegalRoutine, args))
+def merger_finder(galaxies, merger_ratio, mass_limit, redshift_limit, p_workers, out_file=False, shared=False, vectorized=False):
+
+    if vectorized == 'ragged':
+        tables = [ragged_mergers(galaxies, redshift_limit, merger_ratio, mass_limit)]
+    elif vectorized:
+        tables = [block_mergers(galaxies, block, redshift_limit, merger_ratio, mass_limit)
+                  for block in index_ranges(np.arange(len(galaxies)), KERNEL_BLOCK_SIZE)]
+    elif shared:
+        with SharedCatalog(galaxies, MERGER_TRACKS) as handle:
+            args = [(handle, indexes, redshift_limit, merger_ratio, mass_limit) for indexes in index_ranges(np.arange(len(galaxies)))]
+            tables = p_workers.map(rangeRoutine, args)
+    else:
+        args = [merger_args(galaxies, i, redshift_limit, merger_ratio, mass_limit) for i in range(0, len(galaxies))]
+        tables = p_workers.map(singlegalRoutine, args)
+
+    mergers = concatenate_events('mergers', tables)
+    galaxies.set_events('mergers', mergers)
 
     print('Star-forming main sequence and mergers found up to z = '+str(redshift_limit))
-    print('Total number of mergers = '+str(np.sum(n_mergs)))
-    # if out_file:
-    #     d = {}
-    #     d['mergers'] = mergers
-    #     d['sf_galaxies'] = sf_galaxies
-    #     d['merger_ratio_min'] = merger_ratio
-    #     d['mass_limit'] = mass_limit
-    #     d['redshift_limit'] = redshift_limit
-    #     print('Saving merger data into pickle file with name merger_results.pkl')
-    #     output = open('../mergers/m100n1024/merger_results.pkl','wb')
-    #     pickle.dump(d, output)
-    #     print('Data saved in pickle file.')
-    #     output.close()
-    # return(mergers, sf_galaxies)
+    print('Total number of mergers = '+str(len(mergers)))
     return galaxies
 
 
+##########################################################################################
+"""
+VECTORIZED MERGER KERNEL
+
+merger_kernel evaluates the merger conditions of singlegalRoutine (the six criteria of merger_condition,
+the redshift limit and the sSFR cut) and the fgas boost for all the galaxies and snapshots of a block at
+once, on (ngal x nsnap) matrices with the tracks starting at column 0 and padded after their end. The
+candidate at column i needs columns i-1 to i+3, so it is only valid for 1 <= i <= length-4.
+"""
+
+# Galaxies processed at once by merger_kernel, which bounds the size of its matrices
+KERNEL_BLOCK_SIZE = 10000
+
+def merger_kernel(mass, z, t, sfr, h2_gas_0, lssfr_end, lengths, redshift_limit, merger_ratio, mass_limit):
+    """Merger event rows (galaxy row, indx, merger_ratio, fgas_boost) of the padded tracks, with h2_gas_0 the
+    first value of the h2_gas track of each galaxy, ordered by galaxy and snapshot."""
+    nsnap = mass.shape[1]
+    if nsnap < 5:
+        return (np.zeros(0, dtype=np.int64),)*2 + (np.zeros(0),)*2
+    # Columns i-1, i, i+1, i+2 and i+3 for i = 1 ... nsnap-4
+    c = [slice(k, nsnap-4+k) for k in range(0, 5)]
+    i = np.arange(1, nsnap-3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        predicted = sfr[:,c[1]]*(t[:,c[2]]-t[:,c[1]])*(10**9)
+        actual = mass[:,c[2]] - mass[:,c[1]]
+        diff = (mass[:,c[2]]-mass[:,c[1]])/mass[:,c[1]]
+        diff2 = abs((mass[:,c[3]]-mass[:,c[1]])/mass[:,c[1]])
+        diff3 = abs((mass[:,c[2]]-mass[:,c[0]])/mass[:,c[0]])
+        diff4 = abs((mass[:,c[4]]-mass[:,c[1]])/mass[:,c[1]])
+        condition = (i[None,:] <= lengths[:,None]-4) & (z[:,c[1]] <= redshift_limit)
+        condition &= (diff>=merger_ratio) & (diff2>=merger_ratio) & (predicted <= 0.25*actual) & (diff-diff3 < 0.001)
+        condition &= (diff4>=merger_ratio) & (mass[:,c[1]]>=mass_limit)
+        condition &= sfr[:,c[2]]/mass[:,c[2]] >= 10**lssfr_end[:,c[2]]
+        rows, cols = np.nonzero(condition)
+        fgas_next = h2_gas_0[rows]/mass[rows, cols+2]
+        fgas_prev = h2_gas_0[rows]/mass[rows, cols]
+        boost = (fgas_next-fgas_prev)/fgas_prev
+    return rows, cols+1, diff[rows, cols], boost
+
+def block_mergers(galaxies, indexes, redshift_limit, merger_ratio, mass_limit):
+    """Merger event table of the galaxies of the catalog in indexes (a contiguous range)."""
+    offsets = galaxies.offsets[indexes[0]:indexes[-1]+2]
+    flat = slice(offsets[0], offsets[-1])
+    padded = dict([(name, ragged_to_padded(galaxies.tracks[name], offsets)) for name in ['m', 'z', 't', 'sfr']])
+    if galaxies.lssfr is not None:
+        lssfr_end = galaxies.lssfr['end'][flat]
+    else:
+        lssfr_end = ssfr_threshold('end', galaxies.tracks['t'][flat])
+    lssfr_end = ragged_to_padded(np.asarray(lssfr_end), offsets - offsets[0])
+    lengths = np.diff(offsets)
+    h2_gas_0 = np.full(len(lengths), np.nan)
+    h2_gas_0[lengths > 0] = galaxies.tracks['h2_gas'][offsets[:-1][lengths > 0]]
+    rows, indx, ratio, boost = merger_kernel(padded['m'], padded['z'], padded['t'], padded['sfr'], h2_gas_0, lssfr_end,
+                                             lengths, redshift_limit, merger_ratio, mass_limit)
+    mergers = new_events('mergers', len(rows))
+    mergers['galaxy'] = np.asarray(indexes)[rows]
+    mergers['indx'] = indx
+    mergers['merger_ratio'] = ratio
+    mergers['fgas_boost'] = boost
+    return mergers
+
+def ragged_mergers(galaxies, redshift_limit, merger_ratio, mass_limit):
+    """Merger event table of all the galaxies, with the conditions of merger_kernel evaluated on the flat
+    tracks of the catalog. Only the entries with one snapshot before and three after them in their own
+    track are candidates, so no window reaches the track of the next galaxy."""
+    k, owner, indx = ragged_window(galaxies.offsets, 1, 3)
+    mass, z, t, sfr = [galaxies.tracks[name] for name in ['m', 'z', 't', 'sfr']]
+    if galaxies.lssfr is not None:
+        lssfr_end = galaxies.lssfr['end'][k+1]
+    else:
+        lssfr_end = ssfr_threshold('end', t[k+1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        predicted = sfr[k]*(t[k+1]-t[k])*(10**9)
+        actual = mass[k+1] - mass[k]
+        diff = (mass[k+1]-mass[k])/mass[k]
+        diff2 = abs((mass[k+2]-mass[k])/mass[k])
+        diff3 = abs((mass[k+1]-mass[k-1])/mass[k-1])
+        diff4 = abs((mass[k+3]-mass[k])/mass[k])
+        condition = (z[k] <= redshift_limit) & (diff>=merger_ratio) & (diff2>=merger_ratio) & (predicted <= 0.25*actual)
+        condition &= (diff-diff3 < 0.001) & (diff4>=merger_ratio) & (mass[k]>=mass_limit)
+        condition &= sfr[k+1]/mass[k+1] >= 10**lssfr_end
+        selected = np.flatnonzero(condition)
+        k, owner = k[selected], owner[selected]
+        h2_gas_0 = galaxies.tracks['h2_gas'][galaxies.offsets[owner]]
+        fgas_prev = h2_gas_0/mass[k-1]
+        boost = (h2_gas_0/mass[k+1]-fgas_prev)/fgas_prev
+    mergers = new_events('mergers', len(k))
+    mergers['galaxy'] = owner
+    mergers['indx'] = indx[selected]
+    mergers['merger_ratio'] = diff[selected]
+    mergers['fgas_boost'] = boost
+    return mergers
+
+##########################################################################################
+"""
+PARAMETER SWEEP OVER THE MERGER THRESHOLDS
+
+The quantities used by merger_condition (diff, diff2, diff3, diff4, predicted and actual growth), the sSFR
+cut and the fgas boost only depend on the tracks, so sweep_quantities computes them once for every
+snapshot that can hold a merger. merger_sweep then evaluates a whole grid of merger_ratio, mass_limit and
+redshift_limit against them, giving the same mergers as merger_finder for every point of the grid.
+"""
+
+# Quantities of each merger candidate, with the galaxy and snapshot index of the candidate
+SWEEP_QUANTITIES = ['galaxy', 'indx', 'diff', 'diff2', 'diff3', 'diff4', 'predicted', 'actual', 'mass', 'z', 'sf', 'boost']
+
+def sweepRoutine(args):
+    # Unpack arguments
+    gal_indx, mass, z, t, sfr, h2_gas, lssfr_end = args
+    q = {}
+    i = np.arange(1, len(mass)-3)
+    q['galaxy'] = np.full(len(i), gal_indx, dtype=np.int32)
+    q['indx'] = i.astype(np.int32)
+    if len(i) == 0:
+        for name in SWEEP_QUANTITIES[2:]:
+            q[name] = np.zeros(0)
+        return q
+    fgas = h2_gas[0]/mass
+    q['predicted'] = sfr[i]*(t[i+1]-t[i])*(10**9)
+    q['actual'] = mass[i+1] - mass[i]
+    q['diff'] = (mass[i+1]-mass[i])/mass[i]
+    q['diff2'] = abs((mass[i+2]-mass[i])/mass[i])
+    q['diff3'] = abs((mass[i+1]-mass[i-1])/mass[i-1])
+    q['diff4'] = abs((mass[i+3]-mass[i])/mass[i])
+    q['mass'] = mass[i]
+    q['z'] = z[i]
+    q['sf'] = sfr[i+1]/mass[i+1] >= 10**lssfr_end[i+1]
+    q['boost'] = (fgas[i+1]-fgas[i-1])/fgas[i-1]
+    return q
+
+def sweep_quantities(galaxies, p_workers):
+    """Quantities of all the merger candidates of the catalog, as flat arrays."""
+    args = [merger_args(galaxies, i, None, None, None)[:7] for i in range(0, len(galaxies))]
+    results = p_workers.map(sweepRoutine, args)
+    q = {}
+    for name in SWEEP_QUANTITIES:
+        q[name] = np.concatenate([result[name] for result in results]) if results else np.zeros(0)
+    # Part of the merger conditions that does not depend on the thresholds
+    q['fixed'] = (q['predicted'] <= 0.25*q['actual']) & (q['diff']-q['diff3'] < 0.001) & q['sf']
+    q['min_diff'] = np.minimum(np.minimum(q['diff'], q['diff2']), q['diff4'])
+    return q
+
+def sweep_mergers(q, merger_ratio, mass_limit, redshift_limit):
+    """Merger event table of the candidates q for one point of the grid."""
+    selected = q['fixed'] & (q['min_diff'] >= merger_ratio) & (q['mass'] >= mass_limit) & (q['z'] <= redshift_limit)
+    mergers = new_events('mergers', np.count_nonzero(selected))
+    mergers['galaxy'] = q['galaxy'][selected]
+    mergers['indx'] = q['indx'][selected]
+    mergers['merger_ratio'] = q['diff'][selected]
+    mergers['fgas_boost'] = q['boost'][selected]
+    return mergers
+
+def merger_sweep(galaxies, merger_ratios, mass_limits, redshift_limits, p_workers, q=None, tables=True):
+    """Mergers found for every combination of merger_ratios, mass_limits and redshift_limits. The arguments
+    have the same meaning as in merger_finder. Returns a dictionary with the number of mergers in 'counts',
+    an array of shape (len(merger_ratios), len(mass_limits), len(redshift_limits)), and if tables is True the
+    event table of every point in 'mergers', keyed by (merger_ratio, mass_limit, redshift_limit). The
+    quantities of sweep_quantities can be given as q to reuse them between sweeps."""
+    if q is None:
+        q = sweep_quantities(galaxies, p_workers)
+    counts = np.zeros((len(merger_ratios), len(mass_limits), len(redshift_limits)), dtype=np.int64)
+    sweep = {'merger_ratios': np.asarray(merger_ratios), 'mass_limits': np.asarray(mass_limits),
+             'redshift_limits': np.asarray(redshift_limits), 'counts': counts, 'mergers': {}}
+    # The fixed conditions are applied once, so that the grid only goes over the remaining candidates
+    candidates = dict([(name, q[name][q['fixed']]) for name in q])
+    for a, merger_ratio in enumerate(merger_ratios):
+        for b, mass_limit in enumerate(mass_limits):
+            for c, redshift_limit in enumerate(redshift_limits):
+                mergers = sweep_mergers(candidates, merger_ratio, mass_limit, redshift_limit)
+                counts[a, b, c] = len(mergers)
+                if tables:
+                    sweep['mergers'][(merger_ratio, mass_limit, redshift_limit)] = mergers
+    return sweep
+
 ##########################################################################################
 """
 EXTRA FUNCTIONS USEFUL FOR THE ANALYSIS OF THE RESULTS
@@ -110,7 +306,7 @@ def histedges_equalN(x, nbin):
                      np.arange(npt),
                      np.sort(x))
 
-def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=8,label=None,pos=None,boxsize=-1, bin_choosen=0):
+def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=8,label=None,pos=None,boxsize=-1, bin_choosen=0, nside=2, error='scatter'):
     if len(yflag) != len(x):
         #print 'Plotmedian: No flag provided, using all values'
         xp = x
@@ -122,7 +318,7 @@ def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=8,
     #if bins < 0: bin_edges = histedges_equalN(xp,-bins)
     #else: bin_edges = np.arange(0.999*min(xp),1.001*max(xp),(max(xp)-min(xp))/(bins))
     #else: bin_edges = bin_choosen
-    #if bins < 0:	bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bin_edges,statistic=stat)
+    #if bins < 0:       bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bin_edges,statistic=stat)
     #else: bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bins,statistic=stat)
     #bin_cent = 0.5*(bin_edges[1:]+bin_edges[:-1])
     #ax.plot(bin_cent, bin_means, ltype, lw=lw, color=c, label=label)
@@ -130,21 +326,12 @@ def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=8,
     print(bin_means, bin_edges, binnumber)
     bin_cent = 0.5*(bin_edges[1:]+bin_edges[:-1])
 
-    if boxsize > 0:  # determine cosmic variance over 8 octants, plot errorbars
-	if len(yflag) != len(x): posp = pos
-	else: posp = pos[yflag]
-        pos = np.floor(posp/(0.5*boxsize)).astype(np.int)
-        gal_index = pos[:,0] + pos[:,1]*2 + pos[:,2]*4
-        bin_oct = np.zeros((abs(bins),8))
-        for i0 in xrange(8):
-            xq = xp[gal_index==i0]
-            yq = yp[gal_index==i0]
-	    if bins < 0: bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_edges,statistic=stat)
-        #else: bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_choosen,statistic=stat)
-        else: bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_edges,statistic=stat)
-        bin_oct  = np.ma.masked_invalid(bin_oct)
-        var  = np.ma.std(bin_oct, axis=1)
-        print(bin_oct[:,i0], bin_edges, binnumber)
+    if boxsize > 0:  # determine cosmic variance over nside^3 sub-volumes (octants for nside=2), plot errorbars
+        if len(yflag) != len(x): posp = pos
+        else: posp = pos[yflag]
+        sub = subvolume_statistics(xp,yp,bin_edges,posp,boxsize,nside=nside,statistic=stat,jackknife=(error=='jackknife'))
+        if error == 'jackknife': var = sub['jackknife_error']
+        else: var = sub['scatter']
         print(var)
         #ax.errorbar(bin_cent, bin_means, yerr=[var,var], fmt='o', linewidth=lw, color=c)
     elif boxsize == -1:
@@ -161,7 +348,7 @@ def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=8,
     return bin_means,var
 
 
-def plotmedian2(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=7,label=None,pos=None,boxsize=-1, edges=0):
+def plotmedian2(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=7,label=None,pos=None,boxsize=-1, edges=0, nside=2, error='scatter', nboot=1000, p_workers=None):
     if len(yflag) != len(x):
         #print 'Plotmedian: No flag provided, using all values'
         xp = x
@@ -172,32 +359,26 @@ def plotmedian2(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',ax='plt',bins=7
     # bins<0 sets bins such that there are equal numbers per bin
     if bins < 0: bin_edges = histedges_equalN(xp,-bins)
     else: bin_edges = np.arange(0.999*min(xp),1.001*max(xp),(max(xp)-min(xp))/(bins))
-    if bins < 0:	bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bin_edges,statistic=stat)
+    if bins < 0:        bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bin_edges,statistic=stat)
     else: bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bins,statistic=stat)
     if isinstance(edges, np.ndarray): bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=edges,statistic=stat)
     #print(np.arange(0.999*min(xp),1.001*max(xp),(max(xp)-min(xp))/(bins)))
     bin_cent = 0.5*(bin_edges[1:]+bin_edges[:-1])
     #ax.plot(bin_cent, bin_means, ltype, lw=lw, color=c, label=label)
     print(bins)
-    if boxsize > 0:  # determine cosmic variance over 8 octants, plot errorbars
-	if len(yflag) != len(x): posp = pos
-	else: posp = pos[yflag]
-        pos = np.floor(posp/(0.5*boxsize)).astype(np.int)
-        gal_index = pos[:,0] + pos[:,1]*2 + pos[:,2]*4
-        bin_oct = np.zeros((abs(bins),8))
-        for i0 in xrange(8):
-            xq = xp[gal_index==i0]
-            yq = yp[gal_index==i0]
-	    if bins < 0: bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_edges,statistic=stat)
-	    else: bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_edges,statistic=stat)
-        bin_oct  = np.ma.masked_invalid(bin_oct)
-        if stat=='median' or stat=='count':
-            var  = np.ma.std(bin_oct, axis=1)
+    if error == 'bootstrap':  # half width of the 68% bootstrap confidence interval
+        boot = bootstrap_statistic(xp,yp,bin_edges,statistic=stat,nboot=nboot,p_workers=p_workers)
+        var = 0.5*(boot['upper']-boot['lower'])
+    elif boxsize > 0:  # determine cosmic variance over nside^3 sub-volumes (octants for nside=2), plot errorbars
+        if len(yflag) != len(x): posp = pos
+        else: posp = pos[yflag]
+        sub = subvolume_statistics(xp,yp,bin_edges,posp,boxsize,nside=nside,statistic=stat,jackknife=(error=='jackknife'))
+        if error == 'jackknife':
+            var = sub['jackknife_error']
         elif stat=='mean':
-            lens = np.zeros(len(bin_oct))
-            for i in range(0, len(bin_oct)):
-                lens[i] = len(bin_oct[i])
-            var  = np.ma.std(bin_oct, axis=1)/np.ma.sqrt(lens)
+            var = sub['scatter']/np.sqrt(nside**3)
+        else:
+            var = sub['scatter']
         #ax.errorbar(bin_cent, bin_means, yerr=[var,var], fmt='o', linewidth=lw, color=c)
     elif boxsize == -1:
         var = []
@@ -29,29 +29,30 @@ WIND = sys.argv[2]  # e.g. s50 for Simba
 
 # Import other codes
 from galaxy_class import GalaxyData, Merger
+from quenchingFinder import sfr_condition_2
+from subvolume_stats import subvolume_statistics
+from results_store import load_results_store, is_results_store
 results_folder = '../mergers/%s/' % (MODEL) # You can change this to the folder where you want your resulting plots
 data_file = '/home/curro/quenchingSIMBA/code/SH_Project/mandq_results_%s.pkl' % (MODEL) # File holding the mergerFinder and quenchingFinder info of galaxies
+data_store = '/home/curro/quenchingSIMBA/code/SH_Project/mandq_results_%s' % (MODEL) # Results store, used instead if it exists
 
 # Extract data from mergers and quenching pickle files
-print('Loading pickle file with data...')
-obj = open(data_file, 'rb')
-data = pickle.load(obj)
-obj.close()
+if is_results_store(data_store):
+    print('Loading results store with data...')
+    data = load_results_store(data_store, interpolated=False)
+else:
+    print('Loading pickle file with data...')
+    obj = open(data_file, 'rb')
+    data = pickle.load(obj)
+    obj.close()
 galaxies = data['galaxies']
 max_redshift_mergers = data['max_redshift_mergers']
 print('Data extracted from pickle file!')
 
 def lsfr_condition(type, galaxy, i, d_indx):
-    if d_indx != None:
-        if type == 'start':
-            lsfr = np.log10(1/(galaxy.t[d_indx][i]))-9
-        elif type == 'end':
-            lsfr  = np.log10(0.2/(galaxy.t[d_indx][i]))-9
-    else:
-        lsfr = 0
-    return lsfr
+    return sfr_condition_2(type, galaxy, i, d_indx)
 
-def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',bins=8,label=None,pos=None,boxsize=-1):
+def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',bins=8,label=None,pos=None,boxsize=-1,nside=2,error='scatter'):
     if len(yflag) != len(x):
         #print 'Plotmedian: No flag provided, using all values'
         xp = x
@@ -59,28 +60,19 @@ def plotmedian(x,y,yflag=[],c='k',ltype='--',lw=3,stat='median',bins=8,label=Non
     else:
         xp = x[yflag]
         yp = y[yflag]
-    b = bins
     # bins<0 sets bins such that there are equal numbers per bin
     if not isinstance(bins, np.ndarray):
         bins = np.arange(0.999*min(xp),1.001*max(xp),(max(xp)-min(xp))/(bins))
-    else:
-        b = len(bins)-1
     bin_means, bin_edges, binnumber = stats.binned_statistic(xp,yp,bins=bins,statistic=stat)
     bin_std, useless1, useless2 = stats.binned_statistic(xp,yp,bins=bins,statistic='std')
     bin_cent = 0.5*(bin_edges[1:]+bin_edges[:-1])
 
-    if boxsize > 0:  # determine cosmic variance over 8 octants, plot errorbars
+    if boxsize > 0:  # determine cosmic variance over nside^3 sub-volumes (octants for nside=2), plot errorbars
         if len(yflag) != len(x): posp = pos
         else: posp = pos[yflag]
-        pos = np.floor(posp/(0.5*boxsize)).astype(np.int)
-        gal_index = pos[:,0] + pos[:,1]*2 + pos[:,2]*4
-        bin_oct = np.zeros((abs(b),8))
-        for i0 in xrange(8):
-            xq = xp[gal_index==i0]
-            yq = yp[gal_index==i0]
-            bin_oct[:,i0], bin_edges, binnumber = stats.binned_statistic(xq,yq,bins=bin_edges,statistic=stat)
-        bin_oct  = np.ma.masked_invalid(bin_oct)
-        var  = np.ma.std(bin_oct, axis=1)
+        sub = subvolume_statistics(xp,yp,bin_edges,posp,boxsize,nside=nside,statistic=stat,jackknife=(error=='jackknife'))
+        if error == 'jackknife': var = sub['jackknife_error']
+        else: var = sub['scatter']
     elif boxsize == -1:
         var = []
         for i0 in range(len(bin_edges)-1):
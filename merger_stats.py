@@ -25,6 +25,7 @@ import sys
 
 MODEL = sys.argv[1]  # e.g. m50n512
 WIND = sys.argv[2]  # e.g. s50 for Simba
+ERROR = sys.argv[3] if len(sys.argv) > 3 else 'scatter'  # errors of the binned statistics: scatter, jackknife or bootstrap
 
 # Import other codes
 from quenchingFinder import GalaxyData
@@ -163,8 +164,8 @@ def SFR_Evolution2(mergers, msq_galaxies, n_bins):
     pos_nm = np.asarray(pos_nm)
     red_m = np.asarray(red_m)
     red_nm = np.asarray(red_nm)
-    cent_m, ssfr_m_ave, ssfr_m_error = plotmedian2(red_m,ssfr_m, pos=pos_m, boxsize=d['boxsize_in_kpccm'], stat='mean')
-    cent_nm, ssfr_nm_ave, ssfr_nm_error = plotmedian2(red_nm,ssfr_nm, pos=pos_nm, boxsize=d['boxsize_in_kpccm'], stat='mean')
+    cent_m, ssfr_m_ave, ssfr_m_error = plotmedian2(red_m,ssfr_m, pos=pos_m, boxsize=d['boxsize_in_kpccm'], stat='mean', error=ERROR)
+    cent_nm, ssfr_nm_ave, ssfr_nm_error = plotmedian2(red_nm,ssfr_nm, pos=pos_nm, boxsize=d['boxsize_in_kpccm'], stat='mean', error=ERROR)
     return cent_m,ssfr_m_ave,ssfr_m_error,cent_nm,ssfr_nm_ave,ssfr_nm_error
 
 def SFR_Evolution3(mergers, msq_galaxies, n_bins):
@@ -289,8 +290,8 @@ def Merger_Fraction_Mass_Distribution(mergers, msq_galaxies, n_bins):
         msq_m = np.asarray(msq_m)
         msq_pos = np.asarray(msq_pos)
         msq_y = np.zeros(len(msq_m))
-        cent_m, c_m_ave, c_m_error = plotmedian2(merg_m,merg_y,stat='count',pos=merg_pos,boxsize=d['boxsize_in_kpccm'], edges=mass_bins)
-        cent_msq, c_msq_ave, c_msq_error = plotmedian2(msq_m,msq_y,stat='count',pos=msq_pos,boxsize=d['boxsize_in_kpccm'], edges=mass_bins)
+        cent_m, c_m_ave, c_m_error = plotmedian2(merg_m,merg_y,stat='count',pos=merg_pos,boxsize=d['boxsize_in_kpccm'], edges=mass_bins, error=ERROR)
+        cent_msq, c_msq_ave, c_msq_error = plotmedian2(msq_m,msq_y,stat='count',pos=msq_pos,boxsize=d['boxsize_in_kpccm'], edges=mass_bins, error=ERROR)
         print(cent_m)
         print(cent_msq)
         f_merger = c_m_ave/c_msq_ave
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Full merger tree of the galaxies of a simulation, with every progenitor link between consecutive snapshots
+and not only the main progenitor branch of the progen .dat file.
+
+The links are read from the progenitor lists that Caesar saves in each file (n_most progenitors per
+galaxy, most important first, -1 padded) and kept as a CSR graph over all the galaxies of all snapshots:
+
+node ========== galaxy i of snapshot s is node snap_offsets[s] + i, with s in the snapshot order of
+                    progen_extractor.py (s = 0 is z = 0 and the following snapshots go back in time)
+offsets ======= links of node n are offsets[n]:offsets[n+1] in the link arrays
+parents ======= node of the progenitor of each link, in snapshot s+1
+children ====== node of the descendant of each link, i.e. the node that owns it
+m ============= stellar mass of each node
+
+Caesar links each file to the snapshot just before it (snapshot number - 1). When that snapshot is not in the
+list (e.g. snapshot 116, which is skipped by progen_extractor.py) the tree is cut there: the galaxies of the
+file after the gap get no progenitors, instead of being linked to the wrong snapshot.
+
+All arrays are flat int32/float64 arrays, so the tree is walked and measured with NumPy calls and no Python
+object per galaxy. It is saved as a directory of .npy files that are memory-mapped when loaded.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import json
+import os
+import shutil
+from caesar_harvest import h5py, harvest_snapshot
+
+# Location of the progenitor lists in the Caesar HDF5 file (run caesar progen with n_most > 1)
+PROGEN_DATASET = 'tree_data/progen_galaxy_star'
+TREE_ARRAYS = ['snap_offsets', 'offsets', 'parents', 'children', 'm']
+
+###########################################################################################
+"""
+FUNCTIONS TO BUILD THE TREE
+"""
+
+def read_progenitor_links(filename):
+    """Progenitor indexes in the previous snapshot of every galaxy in a Caesar file, as an int32
+    (ngal x n_most) matrix with -1 for missing progenitors, together with the stellar masses."""
+    if h5py is None:
+        raise ImportError('h5py is needed to read the progenitor lists of the Caesar files.')
+    with h5py.File(filename, 'r') as f:
+        if PROGEN_DATASET not in f:
+            raise KeyError('Progenitor lists %s not found in Caesar file %s' % (PROGEN_DATASET, filename))
+        links = np.asarray(f[PROGEN_DATASET][:], dtype=np.int32)
+    if links.ndim == 1:
+        links = links[:,None]
+    sim_info, snap_data = harvest_snapshot(filename, fields=['m'])
+    return links, snap_data['m']
+
+def snapshot_number(snap):
+    """Number of a snapshot from the name of its Caesar file, e.g. 117 for m50n512_117.hdf5."""
+    return int(snap[-8:-5])
+
+def build_merger_tree(links, masses, snap_numbers=None):
+    """CSR merger tree from the per-snapshot progenitor matrices and stellar masses, in snapshot order.
+    links[s] holds the progenitors of the galaxies of snapshot s in snapshot snap_numbers[s]-1, and they are
+    only kept when that snapshot is the next one in the list; otherwise (and for the last snapshot) the tree
+    is cut there. Without snap_numbers the snapshots are taken as consecutive."""
+    nsnap = len(masses)
+    if snap_numbers is None:
+        snap_numbers = np.arange(nsnap, 0, -1)
+    ngals = np.array([len(m) for m in masses], dtype=np.int64)
+    snap_offsets = np.concatenate(([0], np.cumsum(ngals)))
+    counts = np.zeros(snap_offsets[-1], dtype=np.int64)
+    parents = []
+    for s in range(0, nsnap-1):
+        if snap_numbers[s+1] != snap_numbers[s]-1:
+            print('Merger tree cut between snapshots '+str(snap_numbers[s])+' and '+str(snap_numbers[s+1]))
+            continue
+        if len(links[s]) != ngals[s]:
+            raise ValueError('Snapshot %d has %d galaxies but %d progenitor lists' % (snap_numbers[s], ngals[s], len(links[s])))
+        valid = links[s] != -1
+        if np.any(links[s][valid] >= ngals[s+1]):
+            raise ValueError('Progenitor links of snapshot %d point beyond the %d galaxies of snapshot %d'
+                             % (snap_numbers[s], ngals[s+1], snap_numbers[s+1]))
+        counts[snap_offsets[s]:snap_offsets[s+1]] = np.sum(valid, axis=1)
+        # The matrix is read row by row, so the links stay grouped by descendant and in Caesar order
+        parents.append(links[s][valid] + snap_offsets[s+1])
+    tree = {}
+    tree['snap_offsets'] = snap_offsets
+    tree['offsets'] = np.concatenate(([0], np.cumsum(counts)))
+    tree['parents'] = np.concatenate(parents).astype(np.int32) if parents else np.zeros(0, dtype=np.int32)
+    tree['children'] = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    tree['m'] = np.concatenate(masses).astype(np.float64)
+    return tree
+
+def extract_merger_tree(caesarfile, snapshots):
+    """Merger tree of the Caesar files in caesarfile, for the list of snapshot files in snapshot order."""
+    links = []
+    masses = []
+    for snap in snapshots:
+        snap_links, m = read_progenitor_links(caesarfile+snap)
+        links.append(snap_links)
+        masses.append(m)
+        print('Progenitor links read from '+snap+': '+str(np.sum(snap_links != -1)))
+    tree = build_merger_tree(links, masses, [snapshot_number(snap) for snap in snapshots])
+    tree['snapshots'] = [snap[:-5] for snap in snapshots]
+    return tree
+
+###########################################################################################
+"""
+FUNCTIONS TO WALK THE TREE
+"""
+
+def node_of(tree, s, i):
+    return tree['snap_offsets'][s] + i
+
+def snapshot_of(tree, nodes):
+    """Snapshot and galaxy index inside it of each node."""
+    s = np.searchsorted(tree['snap_offsets'], nodes, side='right') - 1
+    return s, nodes - tree['snap_offsets'][s]
+
+def progenitors(tree, node):
+    return tree['parents'][tree['offsets'][node]:tree['offsets'][node+1]]
+
+def n_progenitors(tree):
+    return np.diff(tree['offsets'])
+
+def main_branch(tree, node):
+    """Nodes of the main progenitor branch starting at node, following the first progenitor of each link."""
+    branch = [node]
+    offsets = tree['offsets']
+    while offsets[node+1] > offsets[node]:
+        node = tree['parents'][offsets[node]]
+        branch.append(node)
+    return np.array(branch, dtype=np.int64)
+
+def main_branches(tree, nodes, nsnap=None):
+    """Main progenitor branches of many nodes at once, as an (nnodes x nsnap) matrix with -1 once the
+    branch ends. All the branches are advanced one snapshot at a time with a single array operation."""
+    if nsnap is None:
+        nsnap = len(tree['snap_offsets'])-1
+    nodes = np.asarray(nodes, dtype=np.int64)
+    branches = np.full((len(nodes), nsnap), -1, dtype=np.int64)
+    current = nodes.copy()
+    alive = np.ones(len(nodes), dtype=bool)
+    for k in range(0, nsnap):
+        branches[alive,k] = current[alive]
+        start = tree['offsets'][current[alive]]
+        has_progen = tree['offsets'][current[alive]+1] > start
+        idx = np.flatnonzero(alive)
+        alive[idx[~has_progen]] = False
+        current[idx[has_progen]] = tree['parents'][start[has_progen]]
+        if not np.any(alive):
+            break
+    return branches
+
+###########################################################################################
+"""
+FUNCTIONS TO MEASURE THE MERGERS
+"""
+
+def progenitor_mass_ratios(tree):
+    """Mass ratio between the second most massive and the most massive progenitor of every node, 0 for the
+    nodes with less than two progenitors."""
+    counts = n_progenitors(tree)
+    ratios = np.zeros(len(counts))
+    if len(tree['parents']) == 0:
+        return ratios
+    link_m = tree['m'][tree['parents']]
+    # Sort the links by descendant and then by decreasing progenitor mass
+    order = np.lexsort((-link_m, tree['children']))
+    sorted_m = link_m[order]
+    merging = np.flatnonzero(counts >= 2)
+    first = sorted_m[tree['offsets'][merging]]
+    second = sorted_m[tree['offsets'][merging]+1]
+    ratios[merging] = np.where(first > 0, second/np.where(first > 0, first, 1.0), 0.0)
+    return ratios
+
+def branch_mergers(tree, node, merger_ratio):
+    """Nodes along the main branch of node where the secondary progenitor is above merger_ratio, with
+    their mass ratios."""
+    branch = main_branch(tree, node)
+    ratios = progenitor_mass_ratios(tree)[branch]
+    found = ratios >= merger_ratio
+    return branch[found], ratios[found]
+
+###########################################################################################
+"""
+FUNCTIONS TO SAVE AND LOAD THE TREE
+"""
+
+def save_merger_tree(tree, tree_dir):
+    tmp_dir = tree_dir.rstrip('/')+'.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for name in TREE_ARRAYS:
+        np.save(os.path.join(tmp_dir, name+'.npy'), tree[name])
+    meta = {}
+    meta['nsnap'] = int(len(tree['snap_offsets'])-1)
+    meta['nnodes'] = int(tree['snap_offsets'][-1])
+    meta['nlinks'] = int(len(tree['parents']))
+    meta['snapshots'] = list(tree.get('snapshots', []))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    if os.path.exists(tree_dir):
+        shutil.rmtree(tree_dir)
+    os.rename(tmp_dir, tree_dir)
+
+def load_merger_tree(tree_dir, mmap=True):
+    mmap_mode = 'r' if mmap else None
+    with open(os.path.join(tree_dir, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    tree = {}
+    tree['snapshots'] = meta['snapshots']
+    for name in TREE_ARRAYS:
+        tree[name] = np.load(os.path.join(tree_dir, name+'.npy'), mmap_mode=mmap_mode)
+    return tree
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Online version of the merger finder, for snapshots given one at a time forward in time (e.g. while the
+simulation is still running). The merger conditions at snapshot index i of a track only need the snapshots
+i-1 to i+3, so the detector keeps for each track a ring buffer with its last RING_SIZE snapshots and
+reports the merger at i as soon as snapshot i+3 of the track arrives. Its memory depends on the number of
+tracks, not on the number of snapshots.
+
+The tracks are identified by integer keys chosen by the caller, which have to follow the main progenitor
+branch from one snapshot to the next. The mergers found are the same as those of merger_finder over the
+complete tracks, with the key of the track in the galaxy column and the position of the snapshot along the
+track in indx.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+from cosmo_table import ssfr_threshold
+from event_tables import new_events, concatenate_events
+
+# Snapshots kept per track: from index-1 to index+3
+RING_SIZE = 5
+# Quantities kept in the ring buffers
+RING_QUANTITIES = ['m', 'z', 't', 'sfr', 'lssfr_end']
+
+###########################################################################################
+"""
+THE DETECTOR
+"""
+
+class OnlineMergerDetector(object):
+    """Merger finder fed one snapshot at a time. The arguments are the same as in merger_finder."""
+    def __init__(self, merger_ratio, mass_limit, redshift_limit):
+        self.merger_ratio = merger_ratio
+        self.mass_limit = mass_limit
+        self.redshift_limit = redshift_limit
+        # Sorted keys of the tracks seen so far and the slot of each of them in the buffers
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.slots = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.h2_gas_0 = np.zeros(0)
+        self.ring = dict([(name, np.zeros((0, RING_SIZE))) for name in RING_QUANTITIES])
+    def __len__(self):
+        return len(self.keys)
+    def track_slots(self, keys):
+        """Slots of the tracks keys, adding new slots for the tracks not seen before."""
+        known = np.zeros(len(keys), dtype=bool)
+        where = np.zeros(len(keys), dtype=np.int64)
+        if len(self.keys) > 0:
+            where = np.minimum(np.searchsorted(self.keys, keys), len(self.keys)-1)
+            known = self.keys[where] == keys
+        slots = np.zeros(len(keys), dtype=np.int64)
+        slots[known] = self.slots[where[known]]
+        new = np.flatnonzero(~known)
+        if len(new) > 0:
+            nslots = len(self.count)
+            slots[new] = nslots + np.arange(len(new))
+            self.count = np.concatenate((self.count, np.zeros(len(new), dtype=np.int64)))
+            self.h2_gas_0 = np.concatenate((self.h2_gas_0, np.full(len(new), np.nan)))
+            for name in RING_QUANTITIES:
+                self.ring[name] = np.concatenate((self.ring[name], np.full((len(new), RING_SIZE), np.nan)))
+            keys_all = np.concatenate((self.keys, keys[new]))
+            slots_all = np.concatenate((self.slots, slots[new]))
+            order = np.argsort(keys_all, kind='stable')
+            self.keys, self.slots = keys_all[order], slots_all[order]
+        return slots
+    def add_snapshot(self, keys, m, sfr, h2_gas, z, t, lssfr_end=None):
+        """Add a snapshot with the mass, sfr and h2_gas of the tracks keys, at redshift z and age t. The
+        'end' sSFR threshold is ssfr_threshold('end', t) unless given. Returns the merger event table of the
+        mergers confirmed by this snapshot."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(keys) != len(np.unique(keys)):
+            raise ValueError('The keys of the tracks of a snapshot must be unique.')
+        if lssfr_end is None:
+            lssfr_end = ssfr_threshold('end', t)
+        slots = self.track_slots(keys)
+        first = self.count[slots] == 0
+        self.h2_gas_0[slots[first]] = np.asarray(h2_gas)[first]
+        column = self.count[slots] % RING_SIZE
+        values = {'m': m, 'z': z, 't': t, 'sfr': sfr, 'lssfr_end': lssfr_end}
+        for name in RING_QUANTITIES:
+            self.ring[name][slots, column] = np.broadcast_to(np.asarray(values[name], dtype=np.float64), slots.shape)
+        self.count[slots] += 1
+        # Tracks whose snapshot count-4 has now its whole window, and is not the first one of the track
+        ready = self.count[slots] >= RING_SIZE
+        return self.window_mergers(keys[ready], slots[ready])
+    def window_mergers(self, keys, slots):
+        """Mergers at the snapshot count-4 of the tracks in slots, with the conditions of merger_kernel."""
+        # Columns of the ring buffer holding the snapshots index-1 ... index+3
+        c = [(self.count[slots] - RING_SIZE + n) % RING_SIZE for n in range(0, RING_SIZE)]
+        mass, z, t, sfr, lssfr_end = [[self.ring[name][slots, c[n]] for n in range(0, RING_SIZE)] for name in RING_QUANTITIES]
+        merger_ratio, mass_limit = self.merger_ratio, self.mass_limit
+        with np.errstate(divide='ignore', invalid='ignore'):
+            predicted = sfr[1]*(t[2]-t[1])*(10**9)
+            actual = mass[2] - mass[1]
+            diff = (mass[2]-mass[1])/mass[1]
+            diff2 = abs((mass[3]-mass[1])/mass[1])
+            diff3 = abs((mass[2]-mass[0])/mass[0])
+            diff4 = abs((mass[4]-mass[1])/mass[1])
+            condition = (z[1] <= self.redshift_limit) & (diff>=merger_ratio) & (diff2>=merger_ratio) & (predicted <= 0.25*actual)
+            condition &= (diff-diff3 < 0.001) & (diff4>=merger_ratio) & (mass[1]>=mass_limit)
+            condition &= sfr[2]/mass[2] >= 10**lssfr_end[2]
+            selected = np.flatnonzero(condition)
+            h2_gas_0 = self.h2_gas_0[slots[selected]]
+            fgas_prev = h2_gas_0/mass[0][selected]
+            boost = (h2_gas_0/mass[2][selected]-fgas_prev)/fgas_prev
+        mergers = new_events('mergers', len(selected))
+        mergers['galaxy'] = keys[selected]
+        mergers['indx'] = self.count[slots[selected]] - RING_SIZE + 1
+        mergers['merger_ratio'] = diff[selected]
+        mergers['fgas_boost'] = boost
+        return mergers
+
+###########################################################################################
+"""
+FUNCTIONS TO REPLAY EXTRACTED DATA
+"""
+
+def progen_snapshots(d):
+    """Snapshots of a progen dictionary in the matrix layout, forward in time, as the arguments of
+    OnlineMergerDetector.add_snapshot with the row of each galaxy as its key."""
+    valid = np.asarray(d['tracks']['valid'])
+    nsnap = valid.shape[1]
+    for s in range(nsnap-1, -1, -1):
+        keys = np.flatnonzero(valid[:,s])
+        yield (keys, np.asarray(d['tracks']['m'])[keys,s], np.asarray(d['tracks']['sfr'])[keys,s],
+               np.asarray(d['tracks']['h2_gas'])[keys,s], d['redshifts'][s], d['t_hubble'][s])
+
+def online_mergers(d, merger_ratio, mass_limit, redshift_limit, lssfr_end=None):
+    """Mergers of a progen dictionary found by replaying its snapshots through the online detector. The
+    'end' thresholds of the snapshots (in the order of d) can be given as lssfr_end."""
+    detector = OnlineMergerDetector(merger_ratio, mass_limit, redshift_limit)
+    tables = []
+    nsnap = np.asarray(d['tracks']['valid']).shape[1]
+    for n, snapshot in enumerate(progen_snapshots(d)):
+        tables.append(detector.add_snapshot(*snapshot, lssfr_end=None if lssfr_end is None else lssfr_end[nsnap-1-n]))
+    mergers = concatenate_events('mergers', tables)
+    return mergers[np.lexsort((mergers['indx'], mergers['galaxy']))]
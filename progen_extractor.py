@@ -8,161 +8,357 @@ at z = 0 with their progenitors in previous snapshots, the information coming fr
 
 All this information is saved in a dictionary that is dumped into a pickle file.
 
+With --matrix, each quantity is saved as a single (ngal x nsnap) matrix filled one snapshot column at a time,
+together with a validity mask for the snapshots without progenitor (see progen_tracks.py).
+
+With --tree, every progenitor link between consecutive snapshots is also saved as a CSR merger tree
+(see merger_tree.py), cut at the snapshot 116 skipped by sorted_snapshots.
+
 @author: currorodriguez
 """
 
 # Import required libraries
-import caesar
 import numpy as np
-from functools import reduce
 import os
-from astropy.cosmology import FlatLambdaCDM
 import cPickle as pickle
-import sys
-
-MODEL = sys.argv[1]  # e.g. m50n512
-WIND = sys.argv[2]  # e.g. s50 for Simba
-
-caesarfile = '/home/rad/data/%s/%s/Groups/' % (MODEL,WIND)
-progenref_file = '/disk01/rad/sim/%s/%s/Groups/progen_%s_151.dat' % (MODEL,WIND,MODEL)
-simname = 'm100n1024'#input('SIMBA simulation version: ')
-results_folder = '../progen_analysis/%s/' % (MODEL)
-
-
-progenref = open(progenref_file, 'r').readlines()
-lengal = int(progenref[0].split(' ')[0])
-progenref_data = []
-lines = int((len(progenref)-1)/(2*lengal))
-print(lengal)
-for galaxy in range(0, lengal):
-
-    start = galaxy*lines + 1
-    end = start + lines
-
-    super_line = reduce(lambda x,y:x+y,[progenref[line] for line in range(start, end)])
-    super_line = super_line.replace('[', ' ')
-    super_line = super_line.replace(']', ' ')
-
-    super_line = super_line.split()
-
-    progenref_data.append([int(x) for x in super_line])
-
-d = {}
-for j in range(0, lengal):
-    d['m'+str(j)] = np.array([])
-    d['sfr'+str(j)] = np.array([])
-    d['h1_gas'+str(j)] = np.array([])
-    d['h2_gas'+str(j)] = np.array([])
-    d['g_type'+str(j)] = np.array([])
-    d['caesar_id'+str(j)] = np.array([])
-    d['bhm'+str(j)] = np.array([])
-    d['bhar'+str(j)] = np.array([])
-    d['local_den'+str(j)] = np.array([])
-    d['z'+str(j)] = np.array([])
-    d['t'+str(j)] = np.array([])
-
-
-snaps = filter(lambda file:file[-5:]=='.hdf5' and file[0]=='m' and int(file[-8:-5])!=116, os.listdir(caesarfile))
-snaps_sorted = sorted(snaps,key=lambda file: int(file[-8:-5]), reverse=True)
-print('Progenitor indexes obtained from .dat file.')
-print('Saving data to dictionary...')
-d['sf_galaxies_per_snap'] = np.zeros(len(snaps_sorted))
-d['galaxies_per_snap'] = np.zeros(len(snaps_sorted))
-d['sf_galaxies_mass'] = np.array([])
-d['redshifts'] = np.zeros(len(snaps_sorted))
-d['t_hubble'] = np.zeros(len(snaps_sorted))
-print(snaps_sorted)
-def sfr_condition(type, time):
-    if type == 'start':
-        lsfr = np.log10(1/(time))-9
-    elif type == 'end':
-        lsfr  = np.log10(0.2/(time))-9
-    return lsfr
-
-for s in range(0, len(progenref_data[0])+1):
-
-    #if snaps_sorted[s] != 'm50n512_116.hdf5' and WIND == 's50': # This condition is just to solve an issue with that snapshot
-    sim = caesar.load(caesarfile+snaps_sorted[s],LoadHalo=False) # load caesar file
-
-    # initialize simulation parameters
-    redshift = sim.simulation.redshift  # this is the redshift of the simulation output
-    h = sim.simulation.hubble_constant  # this is the hubble parameter = H0/100
-    cosmo = FlatLambdaCDM(H0=100*sim.simulation.hubble_constant, Om0=sim.simulation.omega_matter, Ob0=sim.simulation.omega_baryon,Tcmb0=2.73)  # set our cosmological parameters
-    thubble = cosmo.age(redshift).value  # age of universe at this redshift
-
-    # Get galaxy info
-    gals = np.asarray([i.central for i in sim.galaxies])   # read in galaxies from caesar file
-    ms = np.asarray([i.masses['stellar'] for i in sim.galaxies])   # read in stellar masses of galaxies
-    mHI = np.asarray([i.masses['HI'] for i in sim.galaxies])   # read in neutral hydrogen masses
-    mH2 = np.asarray([i.masses['H2'] for i in sim.galaxies])   # read in molecular hydrogen
-    sfr = np.asarray([i.sfr for i in sim.galaxies])   # read in instantaneous star formation rates
-    galpos = np.array([g.pos.d for g in sim.galaxies]) # the .d removes the units
-    caesar_id = np.array([i.GroupID for i in sim.galaxies]) # getting the Caesar ID for each galaxy
-    local_mass_density = np.array([i.local_mass_density for i in sim.galaxies]) # getting environmental measure of mass density
-    bh_dot = [] # getting the BH accretion rate for the most massive BH particle
-    bh_mass = [] # getting mass of most massive BH particle in galaxy
-    for gal in sim.galaxies:
-        try:
-            bh_dot.append(float(gal.bhmdot.d))
-        except AttributeError:
-            bh_dot.append(0.0)
-    for gal in sim.galaxies:
+import argparse
+import multiprocessing
+
+from progen_tracks import TRACK_FIELDS, read_progen_indices, build_index_matrix, allocate_tracks, scatter_column, galaxy_ids_of
+from caesar_harvest import harvest_snapshot, h5py, GALAXY_DATASETS
+from sf_census import sf_census, new_sf_table, fill_sf_table, sf_table_row
+from progen_store import save_progen_store, load_progen_store, is_progen_store
+from merger_tree import extract_merger_tree, save_merger_tree
+from cosmo_table import new_cosmo_table, fill_snapshot_times, age_of, ssfr_threshold, save_cosmo_table, load_cosmo_table, same_cosmology
+
+# Quantities read for all the galaxies of a snapshot, for the star-forming census
+CENSUS_FIELDS = ['m', 'sfr']
+
+def sorted_snapshots(caesarfile):
+    snaps = filter(lambda file:file[-5:]=='.hdf5' and file[0]=='m' and int(file[-8:-5])!=116, os.listdir(caesarfile))
+    snaps_sorted = sorted(snaps,key=lambda file: int(file[-8:-5]), reverse=True)
+    return snaps_sorted
+
+def process_snapshot(args):
+    """Harvest a single snapshot and keep only the progenitors of the z = 0 galaxies.
+    Runs in the worker processes when the snapshots are loaded in parallel."""
+    filename, indx, fields, cosmo = args
+    valid = indx != -1
+    progens = indx[valid]
+    # read the chosen galaxy properties of the progenitors only from caesar file, plus the masses and star
+    # formation rates of all the galaxies for the star-forming census
+    sim_info, snap_data = harvest_snapshot(filename, fields=sorted(set(fields)|set(CENSUS_FIELDS)), rows=progens,
+                                           whole_fields=CENSUS_FIELDS)
+
+    redshift = sim_info['redshift']  # this is the redshift of the simulation output
+    thubble = float(age_of(cosmo, redshift))  # age of universe at this redshift, from the cosmology table
+
+    result = {}
+    result['sim_info'] = sim_info
+    result['thubble'] = thubble
+    result['sf_census'] = sf_census(snap_data['m'], snap_data['sfr'], ssfr_threshold('end',thubble))
+    # Compact per-snapshot arrays, one entry per z = 0 galaxy with a progenitor in this snapshot
+    result['valid'] = valid
+    result['data'] = {}
+    for name in fields:
+        result['data'][name] = snap_data[name][progens] if name in CENSUS_FIELDS else snap_data[name]
+    return result
+
+def snapshot_memory(filename, nrows=None):
+    """Rough estimate in bytes of the memory needed to harvest a snapshot, reading nrows galaxies (all of
+    them if None) of all the quantities but those of the census."""
+    if h5py is not None:
+        with h5py.File(filename, 'r') as f:
+            if 'galaxy_data' in f:
+                nbytes = 0
+                for name in GALAXY_DATASETS:
+                    if GALAXY_DATASETS[name] in f:
+                        dset = f[GALAXY_DATASETS[name]]
+                        fraction = 1.0 if nrows is None or name in CENSUS_FIELDS else min(1.0, float(nrows)/max(dset.shape[0], 1))
+                        nbytes = nbytes + fraction*dset.size*max(dset.dtype.itemsize, 8)
+                return 3*nbytes
+    # caesar.load keeps the whole file and one Python object per galaxy in memory
+    return 5*os.path.getsize(filename)
+
+def snapshot_results(args, nproc=1, max_memory=None):
+    """Iterate over the processed snapshots in the order of args, a list of (filename, progenitor indexes).
+    With nproc > 1 the snapshots are loaded by a pool of workers, limited so that the estimated memory
+    stays below max_memory (GB)."""
+    if len(args) == 0:
+        return
+    if max_memory is not None and nproc > 1:
+        per_snap = snapshot_memory(args[0][0], nrows=np.sum(args[0][1] != -1))
+        nproc = max(1, min(nproc, int(max_memory*1024**3/per_snap)))
+        print('Memory cap of '+str(max_memory)+' GB allows '+str(nproc)+' snapshots loaded at once.')
+    if nproc <= 1:
+        for arg in args:
+            yield process_snapshot(arg)
+    else:
+        p_workers = multiprocessing.Pool(nproc)
         try:
-            bh_mass.append(float(gal.masses['bh'].d))
-        except KeyError:
-            bh_mass.append(0.0)
-    bh_dot = np.asarray(bh_dot)
-    bh_mass = np.asarray(bh_mass)
-    ssfr_gal = sfr/ms
-    sfgals = 0
-    ssfr_cond = sfr_condition('end',thubble)
-    sfmass = []
-    for i in range(0, len(gals)):
-        if ssfr_gal[i] >= 10**ssfr_cond:
-            sfgals = sfgals + 1
-            sfmass.append(ms[i])
-    sfmass = np.asarray(sfmass)
-    d['sf_galaxies_mass'] = np.concatenate((d['sf_galaxies_mass'],sfmass))
-    print('Number of star forming galaxies in this snapshot: '+str(sfgals))
-    print('Median mass of star forming galaxies in this snapshot: '+str(np.median(d['sf_galaxies_mass'][s]))+' M*')
-    d['sf_galaxies_per_snap'][s] = sfgals
-    d['galaxies_per_snap'][s] = len(gals)
-    d['redshifts'][s] = redshift
-    d['t_hubble'][s] = thubble
-    if s==0:
-        d['boxsize_in_kpccm'] = sim.simulation.boxsize.to('kpccm')
-    for k in range(0, lengal):
+            for result in p_workers.imap(process_snapshot, args):
+                yield result
+        finally:
+            p_workers.terminate()
+
+###########################################################################################
+"""
+FUNCTIONS TO SAVE AND REUSE THE RESULTS OF SNAPSHOTS ALREADY HARVESTED
+"""
+
+def checkpoint_file(checkpoint_dir, snapname):
+    return os.path.join(checkpoint_dir, snapname+'.npz')
+
+def save_checkpoint(checkpoint_dir, snapname, indx, result):
+    checkpoint = {}
+    checkpoint['indx'] = indx
+    for key in result['sim_info']:
+        checkpoint['sim_'+key] = result['sim_info'][key]
+    for key in ['thubble', 'valid']:
+        checkpoint[key] = result[key]
+    for key in result['sf_census']:
+        checkpoint['sf_'+key] = result['sf_census'][key]
+    for name in result['data']:
+        checkpoint['data_'+name] = result['data'][name]
+    # Write to a temporary file first so that a crash never leaves a broken checkpoint behind
+    tmp_file = checkpoint_file(checkpoint_dir, snapname+'.tmp')
+    np.savez(tmp_file, **checkpoint)
+    os.rename(tmp_file, checkpoint_file(checkpoint_dir, snapname))
+
+def has_checkpoint(checkpoint_dir, snapname, indx, fields):
+    """True if the snapshot was already harvested with the same progenitor indexes and fields."""
+    filename = checkpoint_file(checkpoint_dir, snapname)
+    if not os.path.exists(filename):
+        return False
+    with np.load(filename) as checkpoint:
+        if not all(['data_'+name in checkpoint.files for name in fields]) or 'sf_sf_count' not in checkpoint.files:
+            return False
+        return np.array_equal(checkpoint['indx'], indx)
+
+def load_checkpoint(checkpoint_dir, snapname, fields):
+    result = {'sim_info':{}, 'data':{}, 'sf_census':{}}
+    with np.load(checkpoint_file(checkpoint_dir, snapname)) as checkpoint:
+        for key in checkpoint.files:
+            if key.startswith('sim_'):
+                result['sim_info'][key[4:]] = checkpoint[key][()]
+            elif key.startswith('sf_'):
+                result['sf_census'][key[3:]] = checkpoint[key]
+            elif key.startswith('data_') and key[5:] in fields:
+                result['data'][key[5:]] = checkpoint[key]
+            elif key != 'indx':
+                result[key] = checkpoint[key][()] if checkpoint[key].ndim == 0 else checkpoint[key]
+    return result
+
+def previous_result(previous, s, fields):
+    """Result of snapshot s taken back from a progen dictionary in the matrix layout."""
+    result = {'sim_info':{}, 'data':{}}
+    result['sim_info']['redshift'] = previous['redshifts'][s]
+    result['sim_info']['boxsize_in_kpccm'] = previous['boxsize_in_kpccm']
+    result['thubble'] = previous['t_hubble'][s]
+    result['sf_census'] = sf_table_row(previous['sf_table'], s)
+    result['valid'] = previous['tracks']['valid'][:,s]
+    for name in fields:
+        result['data'][name] = previous['tracks'][name][result['valid'],s]
+    return result
+
+def select_galaxies(caesarfile, ngal, min_mass=None, id_range=None):
+    """Indexes of the z = 0 galaxies above a stellar mass cut (log10 of M*) and/or inside an id range."""
+    selected = np.ones(ngal, dtype=bool)
+    if id_range is not None:
+        ids = np.arange(ngal)
+        selected = selected & (ids >= id_range[0]) & (ids < id_range[1])
+    if min_mass is not None:
+        # only the stellar masses of the z = 0 snapshot are needed for the cut
+        sim_info, snap_data = harvest_snapshot(caesarfile, fields=['m'])
+        selected = selected & (snap_data['m'][:ngal] >= 10**min_mass)
+    return np.flatnonzero(selected)
+
+def simulation_cosmo_table(caesarfile, cosmo_file=None):
+    """Cosmology table of the simulation, read from cosmo_file if it exists and has the cosmology of the
+    Caesar file, or built again from the parameters of the Caesar file otherwise."""
+    sim_info, snap_data = harvest_snapshot(caesarfile, fields=[])
+    if cosmo_file is not None and os.path.exists(cosmo_file):
+        table = load_cosmo_table(cosmo_file)
+        if same_cosmology(table, sim_info):
+            return table
+        print('Cosmology table '+cosmo_file+' does not match the Caesar files, building it again.')
+    return new_cosmo_table(sim_info)
+
+def extract_progen(caesarfile, progenref_file, matrix=False, nproc=1, max_memory=None, index_cache=None,
+                    checkpoint_dir=None, resume=False, previous=None, fields=None, min_mass=None, id_range=None,
+                    cosmo_file=None):
+    """Evolution of the z = 0 galaxies along their main progenitor branch.
+
+    If checkpoint_dir is given, the compact results of each snapshot are saved there as soon as they are
+    harvested, and with resume=True the snapshots with a checkpoint for the same progenitor indexes are not
+    harvested again. A previous progen dictionary in the matrix layout can be given to only extract the
+    snapshots (or progenitor indexes) that are new with respect to it.
+
+    Only the quantities in fields (all of TRACK_FIELDS by default) are extracted, and only for the z = 0
+    galaxies with log10(M*) >= min_mass and index inside id_range = (start, stop), if given. The selection is
+    done before harvesting any snapshot, and the indexes of the selected galaxies are kept in d['galaxy_ids'].
+
+    The ages of the snapshots and the sSFR thresholds are taken from the cosmology table of the simulation
+    (see cosmo_table.py), which is saved in cosmo_file if given and reused from it in later runs."""
+    progenref_data = read_progen_indices(progenref_file, cache_file=index_cache)
+    lengal = progenref_data.shape[0]
+    nsnap = progenref_data.shape[1]+1
+    print(lengal)
+    index = build_index_matrix(progenref_data, lengal)
+    if fields is None:
+        fields = list(TRACK_FIELDS.keys())
+
+    snaps_sorted = sorted_snapshots(caesarfile)
+    galaxy_ids = np.arange(lengal)
+    if min_mass is not None or id_range is not None:
+        galaxy_ids = select_galaxies(caesarfile+snaps_sorted[0], lengal, min_mass=min_mass, id_range=id_range)
+        index = index[galaxy_ids]
+        lengal = len(galaxy_ids)
+        print('Galaxies selected at z = 0: '+str(lengal))
+    cosmo = simulation_cosmo_table(caesarfile+snaps_sorted[0], cosmo_file=cosmo_file)
+    print('Progenitor indexes obtained from .dat file.')
+    print('Saving data to dictionary...')
+    d = {}
+    if matrix:
+        d['tracks'] = allocate_tracks(lengal, nsnap, fields=fields)
+    else:
+        for j in range(0, lengal):
+            for key in fields:
+                if key == 'pos':
+                    d['pos'+str(j)] = np.zeros((0,3))
+                else:
+                    d[key+str(j)] = np.array([])
+            d['z'+str(j)] = np.array([])
+            d['t'+str(j)] = np.array([])
+    d['sf_galaxies_per_snap'] = np.zeros(len(snaps_sorted))
+    d['galaxies_per_snap'] = np.zeros(len(snaps_sorted))
+    d['sf_table'] = new_sf_table(len(snaps_sorted))
+    d['redshifts'] = np.zeros(len(snaps_sorted))
+    d['t_hubble'] = np.zeros(len(snaps_sorted))
+    d['snapshots'] = [snaps_sorted[s][:-5] for s in range(0, nsnap)]
+    d['progen_index'] = index
+    d['galaxy_ids'] = galaxy_ids
+    print(snaps_sorted)
+
+    # Find which snapshots can be reused and which ones need to be harvested
+    reused = {}
+    if previous is not None:
+        if 'tracks' not in previous or 'snapshots' not in previous:
+            raise ValueError('Incremental extraction needs a previous progen file saved in the matrix layout.')
+        if not np.array_equal(galaxy_ids_of(previous), galaxy_ids) or not all([name in previous['tracks'] for name in fields]):
+            raise ValueError('Incremental extraction needs a previous progen file with the same galaxies and fields.')
+        for s_old in range(0, len(previous['snapshots'])):
+            snapname = previous['snapshots'][s_old]
+            if snapname in d['snapshots']:
+                s = d['snapshots'].index(snapname)
+                if np.array_equal(previous['progen_index'][:,s_old], index[:,s]):
+                    reused[s] = s_old
+    if checkpoint_dir is not None and not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+    checkpointed = []
+    todo = []
+    for s in range(0, nsnap):
+        if s in reused:
+            continue
+        elif resume and checkpoint_dir is not None and has_checkpoint(checkpoint_dir, d['snapshots'][s], index[:,s], fields):
+            checkpointed.append(s)
+        else:
+            todo.append(s)
+    print('Snapshots reused: '+str(len(reused))+', from checkpoints: '+str(len(checkpointed))+', to harvest: '+str(len(todo)))
+
+    args = [(caesarfile+snaps_sorted[s], index[:,s], fields, cosmo) for s in todo]
+    harvested = snapshot_results(args, nproc=nproc, max_memory=max_memory)
+    for s in range(0, nsnap):
+        if s in reused:
+            result = previous_result(previous, reused[s], fields)
+        elif s in checkpointed:
+            result = load_checkpoint(checkpoint_dir, d['snapshots'][s], fields)
+        else:
+            result = next(harvested)
+            if checkpoint_dir is not None:
+                save_checkpoint(checkpoint_dir, d['snapshots'][s], index[:,s], result)
+        redshift = result['sim_info']['redshift']
+        thubble = result['thubble']
+        fill_sf_table(d['sf_table'], s, result['sf_census'])
+        print('Number of star forming galaxies in this snapshot: '+str(result['sf_census']['sf_count']))
+        print('Median mass of star forming galaxies in this snapshot: '+str(result['sf_census']['mass_quantiles'][1])+' M*')
+        d['sf_galaxies_per_snap'][s] = result['sf_census']['sf_count']
+        d['galaxies_per_snap'][s] = result['sf_census']['total']
+        d['redshifts'][s] = redshift
+        d['t_hubble'][s] = thubble
         if s==0:
-            d['m'+str(k)] = np.concatenate((d['m'+str(k)], ms[k]), axis=None)
-            d['sfr'+str(k)] = np.concatenate((d['sfr'+str(k)],sfr[k]), axis=None)
-            d['h1_gas'+str(k)] = np.concatenate((d['h1_gas'+str(k)],mHI[k]), axis=None)
-            d['h2_gas'+str(k)] = np.concatenate((d['h2_gas'+str(k)],mH2[k]), axis=None)
-            d['z'+str(k)] = np.concatenate((d['z'+str(k)],redshift), axis=None)
-            d['t'+str(k)] = np.concatenate((d['t'+str(k)],thubble), axis=None)
-            d['g_type'+str(k)] = np.concatenate((d['g_type'+str(k)],gals[k]), axis=None)
-            d['caesar_id'+str(k)] = np.concatenate((d['caesar_id'+str(k)],caesar_id[k]), axis=None)
-            d['bhar'+str(k)] = np.concatenate((d['bhar'+str(k)],bh_dot[k]), axis=None)
-            d['bhm'+str(k)] = np.concatenate((d['bhm'+str(k)],bh_mass[k]), axis=None)
-            d['pos'+str(k)] = np.array([galpos[k]])
-            d['local_den'+str(k)] = np.concatenate((d['local_den'+str(k)],local_mass_density[k]), axis=None)
-
-        elif progenref_data[k][s-1] !=-1:
-            index = progenref_data[k][s-1]
-            d['m'+str(k)] = np.concatenate((d['m'+str(k)], ms[index]), axis=None)
-            d['sfr'+str(k)] = np.concatenate((d['sfr'+str(k)],sfr[index]), axis=None)
-            d['h1_gas'+str(k)] = np.concatenate((d['h1_gas'+str(k)],mHI[index]), axis=None)
-            d['h2_gas'+str(k)] = np.concatenate((d['h2_gas'+str(k)],mH2[index]), axis=None)
+            d['boxsize_in_kpccm'] = result['sim_info']['boxsize_in_kpccm']
+        if matrix:
+            # Whole snapshot column at once, missing progenitors are left out by the validity mask
+            scatter_column(d['tracks'], s, result['valid'], result['data'])
+            continue
+        for n, k in enumerate(np.flatnonzero(result['valid'])):
+            for key in fields:
+                if key != 'pos':
+                    d[key+str(k)] = np.concatenate((d[key+str(k)], result['data'][key][n]), axis=None)
             d['z'+str(k)] = np.concatenate((d['z'+str(k)],redshift), axis=None)
             d['t'+str(k)] = np.concatenate((d['t'+str(k)],thubble), axis=None)
-            d['g_type'+str(k)] = np.concatenate((d['g_type'+str(k)],gals[index]), axis=None)
-            d['caesar_id'+str(k)] = np.concatenate((d['caesar_id'+str(k)],caesar_id[index]), axis=None)
-            d['bhar'+str(k)] = np.concatenate((d['bhar'+str(k)],bh_dot[index]), axis=None)
-            d['bhm'+str(k)] = np.concatenate((d['bhm'+str(k)],bh_mass[index]), axis=None)
-            d['pos'+str(k)] = np.concatenate((d['pos'+str(k)],np.asarray([galpos[index]])), axis=0)
-            d['local_den'+str(k)] = np.concatenate((d['local_den'+str(k)],local_mass_density[index]), axis=None)
-print('Data saved to dictionary.')
-output = open(results_folder+'progen_'+str(MODEL)+'.pkl','wb')
-pickle.dump(d, output)
-print('Data saved in pickle file.')
-output.close()
-print('Progen extraction of galactic data: DONE!')
+            if 'pos' in fields:
+                d['pos'+str(k)] = np.concatenate((d['pos'+str(k)],np.asarray([result['data']['pos'][n]])), axis=0)
+    fill_snapshot_times(cosmo, d['redshifts'][0:nsnap])
+    if cosmo_file is not None:
+        save_cosmo_table(cosmo, cosmo_file)
+    print('Data saved to dictionary.')
+    return d
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract the evolution of SIMBA galaxies along their main progenitor branch.')
+    parser.add_argument('MODEL', help='e.g. m50n512')
+    parser.add_argument('WIND', help='e.g. s50 for Simba')
+    parser.add_argument('--matrix', action='store_true', help='save one (ngal x nsnap) matrix per quantity instead of per-galaxy arrays')
+    parser.add_argument('--store', action='store_true', help='save the tracks in the columnar progen store (implies --matrix) instead of a pickle file')
+    parser.add_argument('--nproc', type=int, default=1, help='number of processes loading snapshots in parallel')
+    parser.add_argument('--max-memory', type=float, default=None, help='approximate memory cap in GB for the snapshots loaded at once')
+    parser.add_argument('--checkpoint', action='store_true', help='save the results of each snapshot as soon as it is harvested')
+    parser.add_argument('--resume', action='store_true', help='skip the snapshots already saved by a previous run with --checkpoint')
+    parser.add_argument('--incremental', action='store_true', help='only extract the snapshots that are new with respect to the existing progen file (matrix layout)')
+    parser.add_argument('--fields', nargs='+', default=None, choices=list(TRACK_FIELDS.keys()), help='quantities to extract (default: all)')
+    parser.add_argument('--min-mass', type=float, default=None, help='only extract z = 0 galaxies with log10(M*) above this value')
+    parser.add_argument('--id-range', type=int, nargs=2, default=None, metavar=('START','STOP'), help='only extract z = 0 galaxies with START <= index < STOP')
+    parser.add_argument('--tree', action='store_true', help='also save the full merger tree with all the progenitors of every galaxy')
+    args = parser.parse_args()
+    MODEL = args.MODEL
+    WIND = args.WIND
+
+    caesarfile = '/home/rad/data/%s/%s/Groups/' % (MODEL,WIND)
+    progenref_file = '/disk01/rad/sim/%s/%s/Groups/progen_%s_151.dat' % (MODEL,WIND,MODEL)
+    simname = 'm100n1024'#input('SIMBA simulation version: ')
+    results_folder = '../progen_analysis/%s/' % (MODEL)
+
+    index_cache = results_folder+'progen_%s_151_index.npy' % (MODEL)
+    progen_file = results_folder+'progen_'+str(MODEL)+'.pkl'
+    store_dir = results_folder+'progen_'+str(MODEL)
+    cosmo_file = results_folder+'progen_%s_cosmo.npz' % (MODEL)
+    tree_dir = results_folder+'progen_%s_tree' % (MODEL)
+    checkpoint_dir = None
+    if args.checkpoint or args.resume:
+        checkpoint_dir = results_folder+'progen_%s_checkpoints/' % (MODEL)
+    previous = None
+    if args.incremental and is_progen_store(store_dir):
+        previous = load_progen_store(store_dir)
+    elif args.incremental and os.path.exists(progen_file):
+        obj = open(progen_file, 'rb')
+        previous = pickle.load(obj)
+        obj.close()
+
+    d = extract_progen(caesarfile, progenref_file, matrix=args.matrix or args.store, nproc=args.nproc, max_memory=args.max_memory,
+                        index_cache=index_cache, checkpoint_dir=checkpoint_dir, resume=args.resume, previous=previous,
+                        fields=args.fields, min_mass=args.min_mass, id_range=args.id_range, cosmo_file=cosmo_file)
+    if args.store:
+        save_progen_store(d, store_dir)
+        print('Data saved in progen store '+store_dir)
+    else:
+        output = open(progen_file,'wb')
+        pickle.dump(d, output)
+        print('Data saved in pickle file.')
+        output.close()
+    if args.tree:
+        tree = extract_merger_tree(caesarfile, sorted_snapshots(caesarfile))
+        save_merger_tree(tree, tree_dir)
+        print('Merger tree saved in '+tree_dir)
+    print('Progen extraction of galactic data: DONE!')
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Columnar on-disk format for the progen data in the matrix layout of progen_tracks.py. Instead of a single
+pickle file, the data is saved in a directory with one .npy file per quantity, shaped (ngal x nsnap), plus
+the validity mask, the per-snapshot arrays and a small meta.json header.
+
+Since the matrices are stored row by row, the tracks of a range of galaxies are one contiguous block of each
+file. Loading memory-maps the files, so only the fields and galaxies that are actually used are read.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import json
+import os
+import shutil
+
+STORE_VERSION = 1
+# Arrays with one entry per snapshot
+SNAPSHOT_ARRAYS = ['redshifts', 't_hubble', 'galaxies_per_snap', 'sf_galaxies_per_snap', 'sf_galaxies_mass']
+# Arrays of the star-forming census table (see sf_census.py)
+SF_TABLE_ARRAYS = ['sf_count', 'total', 'mass_quantiles', 'mass_hist', 'quantiles', 'mass_bins']
+
+###########################################################################################
+"""
+FUNCTIONS TO SAVE AND LOAD THE STORE
+"""
+
+def save_progen_store(d, store_dir):
+    """Save a progen dictionary in the matrix layout into the directory store_dir.
+    The new store is written next to the old one and swapped in at the end."""
+    if 'tracks' not in d:
+        raise ValueError('Only progen dictionaries in the matrix layout can be saved as a store.')
+    tmp_dir = store_dir.rstrip('/')+'.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(os.path.join(tmp_dir, 'tracks'))
+    fields = []
+    for name in d['tracks']:
+        np.save(os.path.join(tmp_dir, 'tracks', name+'.npy'), d['tracks'][name])
+        if name != 'valid':
+            fields.append(name)
+    for name in SNAPSHOT_ARRAYS:
+        if name in d:
+            np.save(os.path.join(tmp_dir, name+'.npy'), d[name])
+    for name in ['progen_index', 'galaxy_ids']:
+        if name in d:
+            np.save(os.path.join(tmp_dir, name+'.npy'), d[name])
+    if 'sf_table' in d:
+        for name in SF_TABLE_ARRAYS:
+            np.save(os.path.join(tmp_dir, 'sf_table_'+name+'.npy'), d['sf_table'][name])
+    meta = {}
+    meta['version'] = STORE_VERSION
+    meta['ngal'] = int(d['tracks']['valid'].shape[0])
+    meta['nsnap'] = int(d['tracks']['valid'].shape[1])
+    meta['fields'] = fields
+    meta['boxsize_in_kpccm'] = float(d['boxsize_in_kpccm'])
+    meta['snapshots'] = list(d.get('snapshots', []))
+    for key in d:
+        # Any extra small parameters (e.g. selections) are kept in the header
+        if key not in meta and isinstance(d[key], (int, float, str)):
+            meta[key] = d[key]
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    old_dir = store_dir.rstrip('/')+'.old'
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+def load_progen_store(store_dir, fields=None, galaxies=None, mmap=True):
+    """Load a progen store as a dictionary in the matrix layout.
+
+    fields ==== list of track quantities to load, all of them if None
+    galaxies == slice or array of positions in the store of the galaxies to load, all of them if None.
+                    The z = 0 indexes of the loaded galaxies are kept in d['galaxy_ids']
+    mmap ====== if True the tracks are memory-mapped and only read from disk when used"""
+    with open(os.path.join(store_dir, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] > STORE_VERSION:
+        raise ValueError('Progen store version '+str(meta['version'])+' is newer than this code.')
+    if fields is None:
+        fields = meta['fields']
+    if galaxies is None:
+        galaxies = slice(0, meta['ngal'])
+    mmap_mode = 'r' if mmap else None
+    d = {}
+    for key in meta:
+        if key not in ['version', 'ngal', 'nsnap', 'fields']:
+            d[key] = meta[key]
+    filename = os.path.join(store_dir, 'galaxy_ids.npy')
+    if os.path.exists(filename):
+        d['galaxy_ids'] = np.load(filename)[galaxies]
+    else:
+        d['galaxy_ids'] = np.arange(meta['ngal'])[galaxies]
+    d['tracks'] = {}
+    for name in list(fields)+['valid']:
+        track = np.load(os.path.join(store_dir, 'tracks', name+'.npy'), mmap_mode=mmap_mode)
+        d['tracks'][name] = track[galaxies]
+    for name in SNAPSHOT_ARRAYS:
+        filename = os.path.join(store_dir, name+'.npy')
+        if os.path.exists(filename):
+            d[name] = np.load(filename)
+    if os.path.exists(os.path.join(store_dir, 'sf_table_sf_count.npy')):
+        d['sf_table'] = {}
+        for name in SF_TABLE_ARRAYS:
+            d['sf_table'][name] = np.load(os.path.join(store_dir, 'sf_table_'+name+'.npy'))
+    filename = os.path.join(store_dir, 'progen_index.npy')
+    if os.path.exists(filename):
+        d['progen_index'] = np.load(filename, mmap_mode=mmap_mode)[galaxies]
+    return d
+
+def is_progen_store(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
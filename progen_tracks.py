@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Tools to hold the evolution of galaxy properties along the main progenitor branch as one (ngal x nsnap)
+matrix per quantity, instead of one growing array per galaxy and quantity.
+
+Column s of each matrix corresponds to the s-th snapshot in the order used by progen_extractor.py, i.e.
+column 0 is z = 0 and the following columns go back in time. Snapshots in which a galaxy has no progenitor
+(index -1 in the progen file) are marked as False in the validity mask.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import os
+
+# Quantities followed along the main progenitor branch: name -> (dtype, shape of a single entry)
+TRACK_FIELDS = {
+    'm': (np.float64, ()),
+    'sfr': (np.float64, ()),
+    'h1_gas': (np.float64, ()),
+    'h2_gas': (np.float64, ()),
+    'g_type': (np.float64, ()),
+    'caesar_id': (np.float64, ()),
+    'bhm': (np.float64, ()),
+    'bhar': (np.float64, ()),
+    'local_den': (np.float64, ()),
+    'pos': (np.float64, (3,)),
+}
+
+###########################################################################################
+"""
+FUNCTIONS TO BUILD AND FILL THE TRACK MATRICES
+"""
+
+def read_progen_indices(progenref_file, cache_file=None):
+    """Main progenitor index of each z = 0 galaxy in the snapshots of the progen .dat file, as an int32
+    (ngal x nsnap-1) matrix.
+
+    The text file is streamed line by line and each galaxy is written straight into its row of the matrix.
+    If cache_file is given, the matrix is saved there as a .npy file and later calls memory-map it instead
+    of parsing the text file again, as long as the cache is newer than the progen file."""
+    if cache_file is not None and os.path.exists(cache_file) and \
+            os.path.getmtime(cache_file) >= os.path.getmtime(progenref_file):
+        return np.load(cache_file, mmap_mode='r')
+    brackets = {ord('['):' ', ord(']'):' '}
+    with open(progenref_file, 'r') as progenref:
+        lengal = int(progenref.readline().split(' ')[0])
+        progen_index = None
+        galaxy = 0
+        tokens = []
+        for line in progenref:
+            tokens.extend(line.translate(brackets).split())
+            if ']' not in line:
+                continue
+            # A closing bracket ends the list of progenitors of this galaxy
+            if progen_index is None:
+                progen_index = np.empty((lengal, len(tokens)), dtype=np.int32)
+            progen_index[galaxy] = np.array(tokens, dtype=np.int32)
+            tokens = []
+            galaxy = galaxy + 1
+            if galaxy == lengal:
+                break
+    if cache_file is not None:
+        tmp_file = cache_file+'.tmp.npy'
+        np.save(tmp_file, progen_index)
+        os.rename(tmp_file, cache_file)
+        return np.load(cache_file, mmap_mode='r')
+    return progen_index
+
+def build_index_matrix(progenref_data, ngal):
+    """Progenitor index of each z = 0 galaxy in every snapshot, with -1 for missing progenitors.
+    The first column is the galaxy itself."""
+    progenref_data = np.asarray(progenref_data, dtype=np.int32)[:ngal]
+    index = np.empty((ngal, progenref_data.shape[1]+1), dtype=np.int32)
+    index[:,0] = np.arange(ngal, dtype=np.int32)
+    index[:,1:] = progenref_data
+    return index
+
+def allocate_tracks(ngal, nsnap, fields=None):
+    """Allocate one NaN-filled (ngal x nsnap) matrix per quantity and an empty validity mask."""
+    if fields is None:
+        fields = list(TRACK_FIELDS.keys())
+    tracks = {}
+    for name in fields:
+        dtype, shape = TRACK_FIELDS[name]
+        tracks[name] = np.full((ngal, nsnap)+shape, np.nan, dtype=dtype)
+    tracks['valid'] = np.zeros((ngal, nsnap), dtype=bool)
+    return tracks
+
+def scatter_snapshot(tracks, index, s, snap_data):
+    """Fill column s of all the track matrices from the per-galaxy arrays of a single snapshot.
+
+    snap_data is a dictionary with one array per quantity, indexed by the Caesar galaxy index in that
+    snapshot. The progenitor indexes are taken from column s of the index matrix."""
+    indx = index[:,s]
+    valid = indx != -1
+    data = {}
+    for name in snap_data:
+        data[name] = np.asarray(snap_data[name])[indx[valid]]
+    return scatter_column(tracks, s, valid, data)
+
+def scatter_column(tracks, s, valid, data):
+    """Fill column s of all the track matrices with values already gathered for the galaxies in valid."""
+    tracks['valid'][:,s] = valid
+    for name in tracks:
+        if name == 'valid' or name not in data:
+            continue
+        tracks[name][valid,s] = data[name]
+    return tracks
+
+###########################################################################################
+"""
+FUNCTIONS TO ACCESS THE TRACKS OF INDIVIDUAL GALAXIES
+"""
+
+def galaxy_track(d, name, i):
+    """Track of quantity name for galaxy i, in the snapshot order of progen_extractor.py.
+    Works with both the per-galaxy dictionary and the matrix layout of the progen pickle file."""
+    if 'tracks' not in d:
+        return d[name+str(i)]
+    valid = d['tracks']['valid'][i]
+    if name == 'z':
+        return d['redshifts'][valid]
+    elif name == 't':
+        return d['t_hubble'][valid]
+    return d['tracks'][name][i][valid]
+
+def galaxy_ids_of(d):
+    """Index at z = 0 of each galaxy stored in a progen dictionary, in storage order."""
+    if 'galaxy_ids' in d:
+        return np.asarray(d['galaxy_ids'])
+    elif 'tracks' in d:
+        return np.arange(d['tracks']['valid'].shape[0])
+    return np.arange(int(d['galaxies_per_snap'][0]))
+
+def tracks_to_dict(d):
+    """Convert a progen dictionary in the matrix layout into the per-galaxy layout ('m0', 'sfr0', ...)."""
+    d_old = {}
+    for key in d:
+        if key not in ['tracks']:
+            d_old[key] = d[key]
+    ngal = d['tracks']['valid'].shape[0]
+    names = [name for name in d['tracks'] if name != 'valid'] + ['z', 't']
+    for i in range(0, ngal):
+        for name in names:
+            d_old[name+str(i)] = galaxy_track(d, name, i)
+    return d_old
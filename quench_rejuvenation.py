@@ -25,19 +25,26 @@ WIND = sys.argv[2]  # e.g. s50 for Simba
 
 # Import other codes
 from quenchingFinder import GalaxyData
+from results_store import load_results_store, is_results_store
+from sf_census import sf_redshift_counts, sf_mass_counts
 results_folder = '../quench_analysis/%s/' % (MODEL) # You can change this to the folder where you want your resulting plots
 #quench_file = '../quench_analysis/%s/quenching_results.pkl' % (MODEL) # File holding the progen info of galaxies
 data_file = '/home/curro/quenchingSIMBA/code/SH_Project/mandq_results_%s.pkl' % (MODEL)
+data_store = '/home/curro/quenchingSIMBA/code/SH_Project/mandq_results_%s' % (MODEL) # Results store, used instead if it exists
 
 # Extract data from quenching pickle file
 # obj = open(quench_file, 'rb')
 # quench_data = pickle.load(obj)
 # obj.close()
 # galaxies_interpolated = quench_data['quenched_galaxies']
-print('Loading pickle file with data...')
-obj = open(data_file, 'rb')
-quench_data = pickle.load(obj)
-obj.close()
+if is_results_store(data_store):
+    print('Loading results store with data...')
+    quench_data = load_results_store(data_store, events=['quenches', 'rejuvenations'])
+else:
+    print('Loading pickle file with data...')
+    obj = open(data_file, 'rb')
+    quench_data = pickle.load(obj)
+    obj.close()
 galaxies_interpolated = quench_data['galaxies']
 print('Data extracted from pickle file!')
 
@@ -107,7 +114,7 @@ print(len(quenching_times2[1][0]), len(quenching_times2[1][1]), len(quenching_ti
 print('Quenching and Rejuvenation analysis done.')
 print(' ')
 
-def Fraction_Fast_vs_Slow(x, times, sf_d, bins):
+def Fraction_Fast_vs_Slow(x, times, sf_d, bins, sf_counts=None):
     slow = []
     fast = []
     delta = bins[1] - bins[0]
@@ -127,13 +134,17 @@ def Fraction_Fast_vs_Slow(x, times, sf_d, bins):
         sf = 0
         f = 0
         s = 0
-        for j in range(0, len(sf_d[0])):
-            if len(sf_d)>1:
-                if bins[i] <= sf_d[1][j] < bins[i+1]:
-                    sf = sf + sf_d[0][j]
-            else:
-                if bins[i] <= sf_d[0][j] < bins[i+1]:
-                    sf = sf + 1
+        if sf_counts is not None:
+            # Star-forming galaxies per bin already counted from the star-forming census table
+            sf = sf_counts[i]
+        else:
+            for j in range(0, len(sf_d[0])):
+                if len(sf_d)>1:
+                    if bins[i] <= sf_d[1][j] < bins[i+1]:
+                        sf = sf + sf_d[0][j]
+                else:
+                    if bins[i] <= sf_d[0][j] < bins[i+1]:
+                        sf = sf + 1
         for j in range(0, len(slow)):
             if bins[i] <= slow[j] < bins[i+1]:
                 s = s + 1
@@ -156,7 +167,10 @@ def Quenching_Scatter_Plot(redshifts, quenching_times, ste_mass):
     name_file = ['redshift', 'mass']
     colours = ['r','b']
     linestyles = ['-','--']
-    sf_x = [quench_data['redshifts'],np.log10(quench_data['sf_galaxies_mass'])]
+    if 'sf_table' in quench_data:
+        sf_x = [quench_data['redshifts'], None]
+    else:
+        sf_x = [quench_data['redshifts'],np.log10(quench_data['sf_galaxies_mass'])]
     x_data = [redshifts, ste_mass]
     props = dict(boxstyle='round', facecolor='white', edgecolor='k', alpha=0.7)
     for i in range(0, len(x_labels)):
@@ -195,8 +209,13 @@ def Quenching_Scatter_Plot(redshifts, quenching_times, ste_mass):
                     else:
                         sf_data = [sf_x[i]]
                         bins = np.linspace(9.5,12.5,12)
-                    fast, slow, cent = Fraction_Fast_vs_Slow(x_datas, quenchs, sf_data, bins)
-                    fast_r, slow_r, cent_r = Fraction_Fast_vs_Slow(x_datas_r, quenchs_r, sf_data, bins)
+                    sf_counts = None
+                    if 'sf_table' in quench_data and i==0:
+                        sf_counts = sf_redshift_counts(quench_data['sf_table'], quench_data['redshifts'], bins)
+                    elif 'sf_table' in quench_data:
+                        sf_counts = sf_mass_counts(quench_data['sf_table'], bins)
+                    fast, slow, cent = Fraction_Fast_vs_Slow(x_datas, quenchs, sf_data, bins, sf_counts)
+                    fast_r, slow_r, cent_r = Fraction_Fast_vs_Slow(x_datas_r, quenchs_r, sf_data, bins, sf_counts)
                     if i==0:
                         ax[j].plot(np.log10(1+cent), np.log10(fast), label = frac_labels[k]+'fast quenching', color=colours[0], ls=linestyles[k])
                         ax[j].plot(np.log10(1+cent), np.log10(slow), label = frac_labels[k]+'slow quenching', color=colours[1], ls=linestyles[k])
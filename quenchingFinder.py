@@ -12,8 +12,15 @@ s1650043@ed.ac.uk
 """Import some necessary packages"""
 import numpy as np
 from scipy import interpolate
-import cPickle as pickle
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 from galaxy_class import GalaxyData, Quench
+from event_tables import new_events, events_from_rows, concatenate_events
+from galaxy_catalog import ragged_take
+from shared_tracks import SharedCatalog, attach_catalog, index_ranges
+from cosmo_table import ssfr_threshold, SSFR_NORMS
 
 ###########################################################################################
 """
@@ -21,55 +28,49 @@ MAIN FUNCTION FOR THE QUENCHING FINDER OVER THE GALAXIES
 
 ARGUMENTS
 
-galaxies ======= dictionary containing all the galaxies with their properties
+galaxies ======= GalaxyCatalog with all the galaxies and their tracks (see galaxy_catalog.py)
 sfr_condition == method that will be used for the thresholds in star formation and quenching
 mass_limit ===== minimum mass of final galaxy at which the code looks for quenching
 interpolation == if set to True, the interpolated data is used for the quenching analysis. If
                     set to nothing it is set to False
 out_file ======= if set to True, the quenching results are saved in a pickle file for future
                     uses; if not, only the list of quenched galaxies is returned
+shared ========= if set to True, the tracks are put once in shared memory and each task only carries a
+                    range of galaxies (see shared_tracks.py)
 
+Each worker receives only the tracks of one galaxy and rebuilds a local GalaxyData from them. It returns the
+number of quenched galaxies, its quenches and rejuvenations as event tables (see event_tables.py) and its
+interpolated tracks, which are all merged into the catalog by the parent.
 """
 
 def singlegalRoutine(args):
 
     # Unpack the arguments
-    galaxy, sfr_condition, mass_limit, interpolation, d_indx = args
+    gal_indx, tracks, interp_tracks, lssfr, sfr_condition, mass_limit, interpolation, d_indx = args
+    galaxy = GalaxyData(gal_indx, tracks[0], tracks[1], tracks[2], tracks[3], None, None, None, None, None, None, None, None)
+    if interp_tracks is not None:
+        galaxy.interpolated_data(*interp_tracks)
+        # Set by the first pass over this galaxy, and needed to map the interpolated times back to snapshots
+        galaxy.ssfr[0] = galaxy.sfr[0]/galaxy.m[0]
+    galaxy.lssfr[0] = lssfr
 
     quenched_gal = 0
 
     if not interpolation:
-        lookup_condition = sfr_condition('end', galaxy, -1, d_indx)
-        m = np.log10(galaxy.m[d_indx][-1])
-        ssfr = galaxy.sfr[d_indx][-1]/galaxy.m[d_indx][-1]
-        if ssfr<(10**lookup_condition) and m>=mass_limit:
-            galaxy.get_ssfr()
-            quenched_gal = 1
-            #State of the search
-            state = (0, galaxy.t[d_indx][0], None)
-            #The state has 3 elements.
-            #The first one indicates the stage we are in (initial, pre_quench or quench)
-            #The second one has the inital time of the period we are considering
-            #The third one has the time of the moment we found a pre_quench
-
-            #Set the number of snapshots to be observed
-            last_snapshot = len(galaxy.t[d_indx])
-
-            #Go over each snapshot and save the new data of the galaxy
-            for j in range(0, last_snapshot-3):
-                state = analyseState[state[0]](galaxy,j, state, sfr_condition, d_indx)
-            #Check if the last quenching is a valid one:
-            if galaxy.quenching and galaxy.quenching[-1].below11 == None:
-                del galaxy.quenching[-1]
-            # galaxy_interpolated = ssfr_interpolation(galaxy)
-            if galaxy.quenching:
-                galaxy = ssfr_interpolation(galaxy)
-            galaxy.quenching = []
-            galaxy.rejuvenations = []
+        quenched_gal = detect_quenching(galaxy, sfr_condition, mass_limit)
     elif interpolation and not isinstance(galaxy.t[d_indx], int):
-        galaxy.interpolation = True
+        quenched_gal = redetect_quenching(galaxy, sfr_condition)
+    return galaxy_results(gal_indx, galaxy, quenched_gal, interpolation)
+
+def detect_quenching(galaxy, sfr_condition, mass_limit):
+    """First pass over the snapshots of a galaxy: if it is quenched at z=0, find its quenching candidates and
+    interpolate its track around them. Returns 1 if the galaxy is quenched at z=0."""
+    d_indx = 0
+    lookup_condition = sfr_condition('end', galaxy, -1, d_indx)
+    m = np.log10(galaxy.m[d_indx][-1])
+    ssfr = galaxy.sfr[d_indx][-1]/galaxy.m[d_indx][-1]
+    if ssfr<(10**lookup_condition) and m>=mass_limit:
         galaxy.get_ssfr()
-        quenched_gal = 1
         #State of the search
         state = (0, galaxy.t[d_indx][0], None)
         #The state has 3 elements.
@@ -77,20 +78,81 @@ def singlegalRoutine(args):
         #The second one has the inital time of the period we are considering
         #The third one has the time of the moment we found a pre_quench
 
-
         #Set the number of snapshots to be observed
         last_snapshot = len(galaxy.t[d_indx])
 
         #Go over each snapshot and save the new data of the galaxy
-        for j in range(0, last_snapshot):
-            state = analyseState[state[0]](galaxy,j, state, sfr_condition, d_indx, interpolation=True)
-
+        for j in range(0, last_snapshot-3):
+            state = analyseState[state[0]](galaxy,j, state, sfr_condition, d_indx)
         #Check if the last quenching is a valid one:
         if galaxy.quenching and galaxy.quenching[-1].below11 == None:
             del galaxy.quenching[-1]
-    return quenched_gal
+        # galaxy_interpolated = ssfr_interpolation(galaxy)
+        if galaxy.quenching:
+            galaxy = ssfr_interpolation(galaxy)
+        galaxy.quenching = []
+        galaxy.rejuvenations = []
+        return 1
+    return 0
+
+def redetect_quenching(galaxy, sfr_condition):
+    """Second pass, over the interpolated track of a galaxy: find its quenches and rejuvenations. Returns 1."""
+    d_indx = 1
+    galaxy.interpolation = True
+    galaxy.get_ssfr()
+    #State of the search
+    state = (0, galaxy.t[d_indx][0], None)
+    #The state has 3 elements.
+    #The first one indicates the stage we are in (initial, pre_quench or quench)
+    #The second one has the inital time of the period we are considering
+    #The third one has the time of the moment we found a pre_quench
+
+
+    #Set the number of snapshots to be observed
+    last_snapshot = len(galaxy.t[d_indx])
+
+    #Go over each snapshot and save the new data of the galaxy
+    for j in range(0, last_snapshot):
+        state = analyseState[state[0]](galaxy,j, state, sfr_condition, d_indx, interpolation=True)
+
+    #Check if the last quenching is a valid one:
+    if galaxy.quenching and galaxy.quenching[-1].below11 == None:
+        del galaxy.quenching[-1]
+    return 1
+
+def galaxy_results(gal_indx, galaxy, quenched_gal, interpolation):
+    """Compact results of a worker: the events found and, in the first pass, the interpolated tracks."""
+    quenches = events_from_rows('quenches', [(gal_indx, q.above9, q.below11, q.indx, q.quench_time) for q in galaxy.quenching])
+    rejuvenations = events_from_rows('rejuvenations', [(gal_indx, indx) for indx in galaxy.rejuvenations])
+    interp_tracks = None
+    if not interpolation and not isinstance(galaxy.t[1], int):
+        interp_tracks = (galaxy.sfr[1], galaxy.m[1], galaxy.t[1])
+    return quenched_gal, quenches, rejuvenations, interp_tracks
+
+def quenching_args(galaxies, i, sfr_condition, mass_limit, interpolation, d_indx):
+    """Arrays of galaxy i sent to the worker."""
+    tracks = (galaxies.track('sfr', i), galaxies.track('m', i), galaxies.track('z', i), galaxies.track('t', i))
+    interp_tracks = None
+    if not isinstance(galaxies.interpolated('t', i), int):
+        interp_tracks = tuple([galaxies.interpolated(name, i) for name in ['sfr', 'm', 't']])
+    lssfr = None
+    if galaxies.lssfr is not None:
+        lssfr = dict([(key, galaxies.lssfr[key][galaxies.offsets[i]:galaxies.offsets[i+1]]) for key in galaxies.lssfr])
+    return (i, tracks, interp_tracks, lssfr, sfr_condition, mass_limit, interpolation, d_indx)
         
-def quenchingFinder(galaxies,sfr_condition, mass_limit, p_workers, interpolation=False, out_file=False):
+def rangeRoutine(args):
+    # Galaxies of a range of the catalog shared in memory, with their results put together
+    handle, indexes, sfr_condition, mass_limit, interpolation, d_indx = args
+    galaxies = attach_catalog(handle)
+    results = [singlegalRoutine(quenching_args(galaxies, i, sfr_condition, mass_limit, interpolation, d_indx)) for i in indexes]
+    interp_tracks = dict([(indexes[k], results[k][3]) for k in range(0, len(results)) if results[k][3] is not None])
+    return (np.sum([result[0] for result in results]), concatenate_events('quenches', [result[1] for result in results]),
+            concatenate_events('rejuvenations', [result[2] for result in results]), interp_tracks)
+
+# Tracks read by the quenching state machine
+QUENCHING_TRACKS = ['sfr', 'm', 'z', 't']
+
+def quenchingFinder(galaxies,sfr_condition, mass_limit, p_workers, interpolation=False, out_file=False, shared=False):
 
     sfr_conditions = [sfr_condition_1, sfr_condition_2]
     sfr_condition = sfr_conditions[int(sfr_condition)]
@@ -100,10 +162,29 @@ def quenchingFinder(galaxies,sfr_condition, mass_limit, p_workers, interpolation
         d_indx = 1
     else:
         d_indx = 0
-    args = [(galaxies[i], sfr_condition, mass_limit, interpolation, d_indx) for i in range(0,len(galaxies))]
-    quenched_gals = np.array(p_workers.map(singlegalRoutine, args))
+    if interpolation:
+        # Only the galaxies with interpolated tracks can be analysed in this pass
+        indexes = np.flatnonzero(np.diff(galaxies.interp_offsets) > 0)
+    else:
+        indexes = range(0, len(galaxies))
+    if shared:
+        with SharedCatalog(galaxies, QUENCHING_TRACKS) as handle:
+            args = [(handle, chunk, sfr_condition, mass_limit, interpolation, d_indx) for chunk in index_ranges(indexes)]
+            results = p_workers.map(rangeRoutine, args)
+        interp_tracks = {}
+        for result in results:
+            interp_tracks.update(result[3])
+    else:
+        args = [quenching_args(galaxies, i, sfr_condition, mass_limit, interpolation, d_indx) for i in indexes]
+        results = p_workers.map(singlegalRoutine, args)
+        interp_tracks = dict([(indexes[k], results[k][3]) for k in range(0, len(results)) if results[k][3] is not None])
 
-    total_quenched = np.sum(quenched_gals)
+    total_quenched = np.sum([result[0] for result in results])
+    if interpolation:
+        galaxies.set_events('quenches', concatenate_events('quenches', [result[1] for result in results]))
+        galaxies.set_events('rejuvenations', concatenate_events('rejuvenations', [result[2] for result in results]))
+    else:
+        galaxies.set_interpolated(interp_tracks)
 
     print ('Total number of quenched galaxies at z=0 : '+str(total_quenched))
     # if out_file:
@@ -121,6 +202,257 @@ def quenchingFinder(galaxies,sfr_condition, mass_limit, p_workers, interpolation
     return galaxies
 
 
+###########################################################################################
+"""
+FUSED QUENCHING STAGE
+
+quenching_stage does the work of the two calls to quenchingFinder (detection and interpolation, then the
+search over the interpolated tracks) with a single task per galaxy: each worker detects the quenching
+candidates, interpolates the track and runs the search again on it, returning the final quenches and
+rejuvenations together with the interpolated track. The arguments are the same as in quenchingFinder, and
+with vectorized=True the whole stage is run by ragged_quenching_stage in this process.
+"""
+
+def fusedRoutine(args):
+
+    # Unpack the arguments
+    gal_indx, tracks, lssfr, sfr_condition, mass_limit = args
+    galaxy = GalaxyData(gal_indx, tracks[0], tracks[1], tracks[2], tracks[3], None, None, None, None, None, None, None, None)
+    galaxy.lssfr[0] = lssfr
+    quenched_gal = detect_quenching(galaxy, sfr_condition, mass_limit)
+    interp_tracks = None
+    if not isinstance(galaxy.t[1], int):
+        redetect_quenching(galaxy, sfr_condition)
+        interp_tracks = (galaxy.sfr[1], galaxy.m[1], galaxy.t[1])
+    quenched_gal, quenches, rejuvenations, _ = galaxy_results(gal_indx, galaxy, quenched_gal, True)
+    return quenched_gal, quenches, rejuvenations, interp_tracks
+
+def fused_args(galaxies, i, sfr_condition, mass_limit):
+    """Arrays of galaxy i sent to the worker of the fused stage."""
+    tracks = tuple([galaxies.track(name, i) for name in QUENCHING_TRACKS])
+    lssfr = None
+    if galaxies.lssfr is not None:
+        lssfr = dict([(key, galaxies.lssfr[key][galaxies.offsets[i]:galaxies.offsets[i+1]]) for key in galaxies.lssfr])
+    return (i, tracks, lssfr, sfr_condition, mass_limit)
+
+def fusedRangeRoutine(args):
+    # Fused stage over a range of the catalog shared in memory
+    handle, indexes, sfr_condition, mass_limit = args
+    galaxies = attach_catalog(handle)
+    results = [fusedRoutine(fused_args(galaxies, i, sfr_condition, mass_limit)) for i in indexes]
+    interp_tracks = dict([(indexes[k], results[k][3]) for k in range(0, len(results)) if results[k][3] is not None])
+    return (np.sum([result[0] for result in results]), concatenate_events('quenches', [result[1] for result in results]),
+            concatenate_events('rejuvenations', [result[2] for result in results]), interp_tracks)
+
+def quenching_stage(galaxies, sfr_condition, mass_limit, p_workers, shared=False, vectorized=False):
+
+    if vectorized:
+        # The ragged kernel has the thresholds of sfr_condition_2
+        if int(sfr_condition) != 1:
+            raise ValueError('The vectorized quenching stage only supports sfr_condition 1 (sfr_condition_2).')
+        return ragged_quenching_stage(galaxies, mass_limit)
+    sfr_conditions = [sfr_condition_1, sfr_condition_2]
+    sfr_condition = sfr_conditions[int(sfr_condition)]
+    indexes = range(0, len(galaxies))
+    if shared:
+        with SharedCatalog(galaxies, QUENCHING_TRACKS) as handle:
+            args = [(handle, chunk, sfr_condition, mass_limit) for chunk in index_ranges(indexes)]
+            results = p_workers.map(fusedRangeRoutine, args)
+        interp_tracks = {}
+        for result in results:
+            interp_tracks.update(result[3])
+    else:
+        args = [fused_args(galaxies, i, sfr_condition, mass_limit) for i in indexes]
+        results = p_workers.map(fusedRoutine, args)
+        interp_tracks = dict([(indexes[k], results[k][3]) for k in range(0, len(results)) if results[k][3] is not None])
+
+    galaxies.set_interpolated(interp_tracks)
+    galaxies.set_events('quenches', concatenate_events('quenches', [result[1] for result in results]))
+    galaxies.set_events('rejuvenations', concatenate_events('rejuvenations', [result[2] for result in results]))
+
+    print ('Total number of quenched galaxies at z=0 : '+str(np.sum([result[0] for result in results])))
+    print ('Total number of galaxies with interpolated quenching data : '+str(len(interp_tracks)))
+    return galaxies
+
+
+###########################################################################################
+"""
+RAGGED QUENCHING KERNEL
+
+ragged_quenching_stage gives the results of quenching_stage (with sfr_condition_2) working on the flat
+tracks of the catalog. The state machine of initial, readyToLook, pre_quench and quench is run for all the
+tracks at once, one snapshot at a time, on arrays with the state of every galaxy, so the Python overhead
+is per snapshot and not per galaxy. Only the spline fits of ssfr_interpolation are done galaxy by galaxy,
+for the galaxies that have quenches.
+"""
+
+def ragged_reju_condition(m, k, lengths, positions):
+    """reju_condition at the flat indexes k of the track m, False where the window goes past the track."""
+    condition = np.zeros(len(k), dtype=bool)
+    inside = positions+1 < lengths
+    k = k[inside]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff = (m[k]-m[k-1])/m[k-1]
+        diff2 = abs((m[k+1]-m[k-1])/m[k-1])
+        diff3 = abs((m[k+1]-m[k-2])/m[k-2])
+        condition[inside] = (abs(diff-diff2) < 0.25) & (abs(diff-diff3) < 0.25)
+    return condition
+
+def snapshot_index(t0, ssfr0, offsets0, g, t, lssfr, above):
+    """Snapshot of the original track of galaxy g closest to the interpolated time t, moved to the next one
+    if its sSFR is above (or below, if above is False) 10**lssfr, as in pre_quench and quench."""
+    track = t0[offsets0[g]:offsets0[g+1]]
+    indx = np.argmin(abs(track - t))
+    ssfr = ssfr0[offsets0[g]+indx]
+    if (above and ssfr >= 10**lssfr) or (not above and ssfr <= 10**lssfr):
+        indx = indx + 1
+    return indx
+
+def quench_automaton(ssfr, t, m, lstart, lend, offsets, nsteps, original=None):
+    """Run the quenching state machine over the first nsteps snapshots of every ragged track. If original is
+    given as (t0, ssfr0, offsets0), the tracks are the interpolated ones and the indexes of the events are
+    mapped back to the snapshots of the original tracks. Returns the quench rows (galaxy, above9, below11,
+    indx, quench_time) and the rejuvenation rows (galaxy, indx), with galaxy the position in offsets."""
+    ngal = len(offsets)-1
+    lengths = np.diff(offsets)
+    state = np.zeros(ngal, dtype=np.int8)
+    t_state = np.full(ngal, np.nan)
+    t_pre = np.full(ngal, np.nan)
+    # The last quench of each galaxy, which can still be removed
+    q_open = np.zeros(ngal, dtype=bool)
+    q = dict([(key, np.full(ngal, -1, dtype=np.int64)) for key in ['above9', 'below11', 'indx']])
+    q['quench_time'] = np.full(ngal, np.nan)
+    quenches = []
+    rejuvenations = []
+    def close_quenches(g):
+        g = g[q_open[g]]
+        quenches.append((g, q['above9'][g], q['below11'][g], q['indx'][g], q['quench_time'][g]))
+    # Galaxies sorted by number of steps, so that the active ones at each step are the first ones
+    order = np.argsort(-np.asarray(nsteps), kind='stable')
+    nsorted = np.asarray(nsteps)[order]
+    for j in range(0, int(nsorted[0]) if ngal > 0 else 0):
+        act = order[:np.count_nonzero(nsorted > j)]
+        k = offsets[act] + j
+        s = state[act]
+        x, tj = ssfr[k], t[k]
+        start = 10**lstart[k]
+        # initial
+        up = (s == 0) & (x > start)
+        state[act[up]] = 1
+        t_state[act[up]] = tj[up]
+        # readyToLook
+        new = (s == 1) & (x <= start)
+        g = act[new]
+        close_quenches(g)
+        q_open[g] = True
+        q['above9'][g] = j-1
+        q['below11'][g] = -1
+        q['indx'][g] = -1
+        q['quench_time'][g] = np.nan
+        state[g] = 2
+        t_pre[g] = tj[new]
+        # pre_quench
+        pre = s == 2
+        end = np.full(len(act), np.nan)
+        end[pre] = 10**lend[k[pre]]
+        done = pre & (x < end)
+        back = pre & ~done & (x >= start)
+        g = act[done]
+        q['below11'][g] = j
+        q['quench_time'][g] = abs(t_pre[g] - tj[done])
+        if original is None:
+            q['indx'][g] = j
+        else:
+            for n in np.flatnonzero(done):
+                q['indx'][act[n]] = snapshot_index(original[0], original[1], original[2], act[n], tj[n], lend[k[n]], True)
+        state[g] = 3
+        g = act[back]
+        q_open[g] = False
+        state[g] = 1
+        t_state[g] = tj[back]
+        # quench
+        sign = (s == 3) & (x > start)
+        late = sign & (tj > 1.2*np.maximum(t_state[act], 0.5))
+        early = sign & ~late
+        reju = np.zeros(len(act), dtype=bool)
+        reju[late] = ragged_reju_condition(m, k[late], lengths[act[late]], np.full(np.count_nonzero(late), j))
+        if original is None:
+            rejuvenations.append((act[reju], np.full(np.count_nonzero(reju), j)))
+        else:
+            rejuvenations.append((act[reju], np.array([snapshot_index(original[0], original[1], original[2], act[n], tj[n],
+                                                       lstart[k[n]], False) for n in np.flatnonzero(reju)], dtype=np.int64)))
+        q_open[act[early]] = False
+        state[act[sign]] = 1
+        t_state[act[sign]] = tj[sign]
+    # The last quench only counts if it reached below11
+    close_quenches(np.flatnonzero(q['below11'] >= 0))
+    quenches = [np.concatenate([rows[n] for rows in quenches]) for n in range(0, 5)]
+    order = np.argsort(quenches[0], kind='stable')
+    quenches = [column[order] for column in quenches]
+    rejuvenations = [np.concatenate([rows[n] for rows in rejuvenations] if rejuvenations else [np.zeros(0, dtype=np.int64)]) for n in range(0, 2)]
+    order = np.argsort(rejuvenations[0], kind='stable')
+    rejuvenations = [column[order] for column in rejuvenations]
+    return quenches, rejuvenations
+
+def ragged_quenching_stage(galaxies, mass_limit):
+    """Quenches, rejuvenations and interpolated tracks of all the galaxies, set in the catalog."""
+    offsets = galaxies.offsets
+    lengths = galaxies.lengths()
+    sfr, m, t = [galaxies.tracks[name] for name in ['sfr', 'm', 't']]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssfr = sfr/m
+    if galaxies.lssfr is not None:
+        lstart, lend = galaxies.lssfr['start'], galaxies.lssfr['end']
+    else:
+        lstart, lend = ssfr_threshold('start', t), ssfr_threshold('end', t)
+
+    # Galaxies quenched at z=0, the only ones searched in the first pass
+    last = offsets[1:]-1
+    quenched = np.zeros(len(galaxies), dtype=bool)
+    filled = lengths > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quenched[filled] = (ssfr[last[filled]] < 10**lend[last[filled]]) & (np.log10(m[last[filled]]) >= mass_limit)
+    selected = np.flatnonzero(quenched)
+    take, sub_offsets = ragged_take(offsets, selected)
+    quenches = quench_automaton(ssfr[take], t[take], m[take], lstart[take], lend[take], sub_offsets,
+                                np.maximum(lengths[selected]-3, 0))[0]
+
+    # Interpolation around the quenches of each galaxy, as in ssfr_interpolation
+    interp_tracks = {}
+    if len(quenches[0]) > 0:
+        g, first = np.unique(quenches[0], return_index=True)
+        above = np.minimum.reduceat(quenches[1], first)
+        below = np.maximum.reduceat(quenches[2], first) + 1
+        for n in np.flatnonzero(below - above > 3):
+            i = selected[g[n]]
+            window = slice(offsets[i]+above[n], offsets[i]+below[n]+1)
+            interp_tracks[i] = spline_tracks(t[window], sfr[window], m[window])
+    galaxies.set_interpolated(interp_tracks)
+
+    # Second pass, over the interpolated tracks
+    interpolated = np.flatnonzero(np.diff(galaxies.interp_offsets) > 0)
+    take, sub_offsets = ragged_take(offsets, interpolated)
+    interp_take, interp_offsets = ragged_take(galaxies.interp_offsets, interpolated)
+    t1 = galaxies.interp['t'][interp_take]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssfr1 = galaxies.interp['sfr'][interp_take]/galaxies.interp['m'][interp_take]
+    quenches, rejuvenations = quench_automaton(ssfr1, t1, galaxies.interp['m'][interp_take], ssfr_threshold('start', t1),
+                                               ssfr_threshold('end', t1), interp_offsets, np.diff(interp_offsets),
+                                               original=(t[take], ssfr[take], sub_offsets))
+    table = new_events('quenches', len(quenches[0]))
+    for n, column in enumerate(['galaxy', 'above9', 'below11', 'indx', 'quench_time']):
+        table[column] = quenches[n] if column != 'galaxy' else interpolated[quenches[0]]
+    galaxies.set_events('quenches', table)
+    table = new_events('rejuvenations', len(rejuvenations[0]))
+    table['galaxy'] = interpolated[rejuvenations[0]]
+    table['indx'] = rejuvenations[1]
+    galaxies.set_events('rejuvenations', table)
+
+    print ('Total number of quenched galaxies at z=0 : '+str(len(selected)))
+    print ('Total number of galaxies with interpolated quenching data : '+str(len(interpolated)))
+    return galaxies
+
+
 ###########################################################################################
 """
 FUNCTIONS THAT DEFINE THE DIFFERENT STAGES FOR QUENCHING AND REJUVENATION
@@ -257,21 +589,7 @@ def ssfr_interpolation(galaxy):
         t_non = [galaxy.t[0][j] for j in range(above-limit, below+limit+1,1)]
         m_non = [galaxy.m[0][j] for j in range(above-limit, below+limit+1,1)]
 
-        time_new = np.arange(np.amin(t_non), np.amax(t_non), 0.001)
-
-        # f = interpolate.interp1d(t_non,sfr_gal_non,kind='cubic')
-        # sfr_new = f(time_new)
-
-        # f = interpolate.interp1d(t_non,m_non,kind='cubic')
-        # m_new = f(time_new)
-
-        tck = interpolate.splrep(t_non,sfr_gal_non, k=3)
-        sfr_new = interpolate.splev(time_new, tck, der=0)
-
-        tck = interpolate.splrep(t_non,m_non, k=3)
-        m_new = interpolate.splev(time_new, tck, der=0)
-
-        galaxy.interpolated_data(sfr_new,m_new,time_new)
+        galaxy.interpolated_data(*spline_tracks(t_non, sfr_gal_non, m_non))
 
         # new_gal = GalaxyData(galaxy.id, sfr_new.tolist(), galaxy.sfe_gal[quench.below11],
         #                         galaxy.z_gal[quench.below11],time_new.tolist(), m_new.tolist(),
@@ -282,6 +600,23 @@ def ssfr_interpolation(galaxy):
         #new_galaxies.append(new_gal)
     return galaxy
 
+def spline_tracks(t_non, sfr_gal_non, m_non):
+    """Cubic splines of the sfr and mass between the snapshots of a quench, sampled every Myr."""
+    time_new = np.arange(np.amin(t_non), np.amax(t_non), 0.001)
+
+    # f = interpolate.interp1d(t_non,sfr_gal_non,kind='cubic')
+    # sfr_new = f(time_new)
+
+    # f = interpolate.interp1d(t_non,m_non,kind='cubic')
+    # m_new = f(time_new)
+
+    tck = interpolate.splrep(t_non,sfr_gal_non, k=3)
+    sfr_new = interpolate.splev(time_new, tck, der=0)
+
+    tck = interpolate.splrep(t_non,m_non, k=3)
+    m_new = interpolate.splev(time_new, tck, der=0)
+    return sfr_new, m_new, time_new
+
 
 ##########################################################################################
 """
@@ -302,15 +637,22 @@ def sfr_condition_1(type, galaxy, j, d_indx):
 
 def sfr_condition_2(type, galaxy, j, d_indx):
     if d_indx != None:
-        if type == 'start':
-            lsfr = np.log10(1/(galaxy.t[d_indx][j]))-9
-        elif type == 'end':
-            lsfr  = np.log10(0.2/(galaxy.t[d_indx][j]))-9
-            #lsfr  = np.log10(0.04/(galaxy.t[d_indx][j]))-9
+        lsfr = ssfr_thresholds(galaxy, d_indx)[type][j]
     else:
         lsfr = 0
     return lsfr
 
+def ssfr_thresholds(galaxy, d_indx):
+    """'start' and 'end' thresholds of sfr_condition_2 along the times of the galaxy, as arrays. They are
+    computed once per galaxy, unless already given from the cosmology table (see gen_pickle.py)."""
+    if getattr(galaxy, 'lssfr', None) is None:
+        galaxy.lssfr = [None,None]
+    if galaxy.lssfr[d_indx] is None:
+        galaxy.lssfr[d_indx] = {}
+        for type in SSFR_NORMS:
+            galaxy.lssfr[d_indx][type] = ssfr_threshold(type, galaxy.t[d_indx])
+    return galaxy.lssfr[d_indx]
+
 def reju_condition(galaxy, j, d_indx):
     mass_list = galaxy.m[d_indx]
     condition = False
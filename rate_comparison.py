@@ -23,18 +23,38 @@ import sys
 
 MODEL = sys.argv[1]  # e.g. m50n512
 WIND = sys.argv[2]  # e.g. s50 for Simba
+NBOOT = int(sys.argv[3]) if len(sys.argv) > 3 else 0  # bootstrap resamples for the errors of the rates (0 for none)
+SF_NORM = sys.argv[4] if len(sys.argv) > 4 else 'sample'  # star-forming galaxies of the rates: 'sample' or 'census'
 
 # Import other codes
 from quenchingFinder import GalaxyData
+from sf_census import sf_mass_counts
+from progen_store import load_progen_store, is_progen_store
+from bootstrap_stats import bootstrap_counts
 results_folder = '../rate_analysis/%s/' % (MODEL) # You can change this to the folder where you want your resulting plots
 merger_file = '../mergers/%s/merger_results.pkl' % (MODEL) # File holding the progen info of galaxies
 quench_file = '../quench_analysis/%s/quenching_results.pkl' % (MODEL) # File holding the progen info of galaxies
+progen_store = '../progen_analysis/%s/progen_%s' % (MODEL, MODEL) # Progen store with the star-forming census table
 
 # Extract data from mergers and quenching pickle files
 obj = open(merger_file, 'rb')
 merger_data = pickle.load(obj)
 obj.close()
 mergers, sf_galaxies, max_redshift_mergers = merger_data['mergers'], merger_data['sf_galaxies'], merger_data['redshift_limit']
+# By default the rates are normalised by the star-forming galaxies of the merger finder sample (sf_galaxies),
+# the same population where the mergers and quenchings are counted. With 'census' they are normalised by
+# all the star-forming galaxies of the box instead, from the census table of the progen store written by
+# progen_extractor.py
+sf_data = None
+if SF_NORM == 'census':
+    if not is_progen_store(progen_store):
+        raise IOError('The census normalisation needs the progen store '+progen_store)
+    progen = load_progen_store(progen_store, fields=[])
+    if 'sf_table' not in progen:
+        raise ValueError('The progen store '+progen_store+' has no star-forming census table.')
+    sf_data = (progen['sf_table'], progen['redshifts'], progen['t_hubble'])
+elif SF_NORM != 'sample':
+    raise ValueError('Unknown normalisation '+str(SF_NORM)+', choose sample or census')
 
 obj = open(quench_file, 'rb')
 quench_data = pickle.load(obj)
@@ -106,7 +126,10 @@ def Mass_Bin_Type(mass_bins, m_gal):
             mass_type = mbin
     return mass_type
 
-def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,reju_m,n_bins,max_redshift_mergers):
+def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,reju_m,n_bins,max_redshift_mergers,sf_data=None,nboot=0):
+    # If sf_data = (sf_table, redshifts, t_hubble) is given, the star-forming galaxies are counted from the
+    # per-snapshot star-forming census table of the whole box instead of the sample list sf_galaxies
+    # If nboot > 0 the rates of all the galaxies get the 68% bootstrap confidence intervals as error bars
     mass_limits = [[9.5,10.3], [10.3,11.0],[11.0,18.0]]
     mass_labels = [r'$9.5\leq \log(M_*) < 10.3$', r'$10.3\leq \log(M_*) < 11.0$', r'$\log(M_*) \geq 11.0$']
     z_bins = np.linspace(0.0, max_redshift_mergers, n_bins)
@@ -120,6 +143,8 @@ def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,
         r_merger['massbin'+str(bini)] = np.zeros(n_bins-1)
         r_quench['massbin'+str(bini)] = np.zeros(n_bins-1)
         r_reju['massbin'+str(bini)] = np.zeros(n_bins-1)
+    counts_all = dict([(key, np.zeros(n_bins-1, dtype=np.int64)) for key in ['merger', 'quench', 'reju', 'population']])
+    delta_t_all = np.zeros(n_bins-1)
     delta = z_bins[1]-z_bins[0]
     z_cent = z_bins - delta/2
     z_cent = np.delete(z_cent, 0)
@@ -138,13 +163,21 @@ def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,
                         counter = counter + 1
                     r_merger['massbin'+str(type)][i] = r_merger['massbin'+str(type)][i] + 1
                     times.append(merger.galaxy_t[2])
-        for k in range(0, len(sf_galaxies)):
-            sf = sf_galaxies[k]
-            if z_bins[i]<= sf.z_gal < z_bins[i+1]:
-                type = Mass_Bin_Type(mass_limits,sf.m_gal)
-                if type != 3:
-                    sf_counter['massbin'+str(type)] = sf_counter['massbin'+str(type)] + 1
-                    times.append(sf.galaxy_t)
+        if sf_data is not None:
+            sf_table, sf_z, sf_t = sf_data
+            # Only the snapshots that were extracted, the others have no census and t_hubble = 0
+            in_bin = (z_bins[i] <= sf_z) & (sf_z < z_bins[i+1]) & (sf_t > 0)
+            for sf_type in range(0, len(mass_limits)):
+                sf_counter['massbin'+str(sf_type)] = sf_mass_counts(sf_table, mass_limits[sf_type], snaps=in_bin)[0]
+            times.extend(sf_t[in_bin])
+        else:
+            for k in range(0, len(sf_galaxies)):
+                sf = sf_galaxies[k]
+                if z_bins[i]<= sf.z_gal < z_bins[i+1]:
+                    type = Mass_Bin_Type(mass_limits,sf.m_gal)
+                    if type != 3:
+                        sf_counter['massbin'+str(type)] = sf_counter['massbin'+str(type)] + 1
+                        times.append(sf.galaxy_t)
         for l in range(0, len(q_reds)):
             quench_red = q_reds[l]
             if z_bins[i]<= quench_red < z_bins[i+1]:
@@ -175,6 +208,8 @@ def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,
             r_quench['massbin'+str(ty)][i] = float(r_quench['massbin'+str(ty)][i])/normalization
             r_reju['massbin'+str(ty)][i] = float(r_reju['massbin'+str(ty)][i])/normalization
         normalization = float(float(a+sf)*delta_t)
+        counts_all['merger'][i], counts_all['quench'][i], counts_all['reju'][i], counts_all['population'][i] = a, b, c, a+sf
+        delta_t_all[i] = delta_t
         r_merger['all'][i] = float(a)/normalization
         r_quench['all'][i] = float(b)/normalization
         r_reju['all'][i] = float(c)/normalization
@@ -199,6 +234,15 @@ def Fractional_Rate(mergers,sf_galaxies,q_masses,q_reds,q_thubble,reju_z,reju_t,
     slope, intercept, r_value, p_value, std_err = stats.linregress(x_dat, np.log10(r_reju['all']))
     ax[2].plot(x_dat,np.log10((10**intercept)*(1+z_cent)**(slope)), 'k-', label=r'$10^{%.2f}\cdot(1+z)^{%.2f}$' % (intercept, slope) )
     print("slope: %f    intercept: %f    r_value: %f    p_value: %f    std_error: %f" % (slope, intercept,r_value, p_value, std_err))
+    if nboot > 0:
+        for i, (r_all, key) in enumerate([(r_merger['all'], 'merger'), (r_quench['all'], 'quench'), (r_reju['all'], 'reju')]):
+            # The mergers are a subset of the population (mergers plus star-forming galaxies), the quenchings
+            # and rejuvenations are not, so their counts are resampled as Poisson events
+            model = 'binomial' if key == 'merger' else 'poisson'
+            boot = bootstrap_counts(counts_all[key], counts_all['population'], nboot=nboot, norm=delta_t_all, model=model)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                yerr = [np.log10(r_all)-np.log10(boot['lower']), np.log10(boot['upper'])-np.log10(r_all)]
+            ax[i].errorbar(x_dat, np.log10(r_all), yerr=yerr, fmt='none', ecolor='k', capsize=2)
     ax[0].set_ylabel(r'$\log(\mathcal{R}_{Mer})$ [Gyr$^{-1}$]', fontsize=16)
     ax[1].set_ylabel(r'$\log(\mathcal{R}_{Que})$ [Gyr$^{-1}$]', fontsize=16)
     ax[2].set_ylabel(r'$\log(\mathcal{R}_{Rej})$ [Gyr$^{-1}$]', fontsize=16)
@@ -293,5 +337,5 @@ def Density_Rate(mergers,q_masses,q_reds,q_thubble,reju_z,reju_t,reju_m,n_bins,m
     fig.subplots_adjust(hspace=0)
     fig.savefig(str(results_folder)+'mqr_density_rate.png', format='png', dpi=200, bbox_inches='tight')
 
-Fractional_Rate(mergers,sf_galaxies,ste_mass2_all,redshifts2_all,thubble2_all,reju_z,reju_t,reju_m,10,max_redshift_mergers)
+Fractional_Rate(mergers,sf_galaxies,ste_mass2_all,redshifts2_all,thubble2_all,reju_z,reju_t,reju_m,10,max_redshift_mergers,sf_data,nboot=NBOOT)
 Density_Rate(mergers,ste_mass2_all,redshifts2_all,thubble2_all,reju_z,reju_t,reju_m,10,max_redshift_mergers)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+On-disk format for the results of gen_pickle.py, used instead of the mandq_results_MODEL.pkl pickle of
+GalaxyData objects. The results are saved in a directory with:
+
+meta.json ======= version, number of galaxies, boxsize and the parameters of the search (mass_limit,
+                    min_merger_ratio, max_redshift_mergers)
+tracks/ ========= one .npy file per track quantity with the flat values, plus offsets.npy and progen_ids.npy
+interp/ ========= the interpolated tracks of the quenching analysis, plus offsets.npy
+events/ ========= one structured .npy array per kind of event (see event_tables.py)
+snapshots/ ====== per-snapshot arrays (redshifts, star-forming counts and census table, cosmology table)
+photometry.pkl == magnitudes and super colours of the galaxies, if they were crossmatched
+
+All the .npy files are memory-mapped when loaded, so an analysis only reads the tracks and events it uses.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import json
+import os
+import shutil
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from galaxy_catalog import GalaxyCatalog, INTERPOLATED_TRACKS
+from event_tables import EVENT_DTYPES
+
+RESULTS_VERSION = 1
+# Parameters of the search kept in the header
+RESULTS_PARAMETERS = ['boxsize_in_kpccm', 'mass_limit', 'min_merger_ratio', 'max_redshift_mergers']
+# Per-snapshot arrays of the results dictionary
+RESULTS_SNAPSHOT_ARRAYS = ['redshifts', 'sf_galaxies_per_snap', 'sf_galaxies_mass']
+
+###########################################################################################
+"""
+FUNCTIONS TO SAVE AND LOAD THE RESULTS
+"""
+
+def save_results_store(d_results, catalog, store_dir, galaxies=None):
+    """Save the results dictionary and catalog of gen_pickle.py in store_dir. The magnitudes and super
+    colours of galaxies (a list of GalaxyData), or else those of the catalog, are kept in photometry.pkl."""
+    tmp_dir = store_dir.rstrip('/')+'.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    for folder in ['tracks', 'interp', 'events', 'snapshots']:
+        os.makedirs(os.path.join(tmp_dir, folder))
+    np.save(os.path.join(tmp_dir, 'tracks', 'offsets.npy'), catalog.offsets)
+    np.save(os.path.join(tmp_dir, 'tracks', 'progen_ids.npy'), catalog.progen_ids)
+    for name in catalog.tracks:
+        np.save(os.path.join(tmp_dir, 'tracks', name+'.npy'), catalog.tracks[name])
+    np.save(os.path.join(tmp_dir, 'interp', 'offsets.npy'), catalog.interp_offsets)
+    for name in INTERPOLATED_TRACKS:
+        np.save(os.path.join(tmp_dir, 'interp', name+'.npy'), catalog.interp[name])
+    for name in catalog.events:
+        np.save(os.path.join(tmp_dir, 'events', name+'.npy'), catalog.events[name])
+    for name in RESULTS_SNAPSHOT_ARRAYS:
+        if name in d_results:
+            np.save(os.path.join(tmp_dir, 'snapshots', name+'.npy'), d_results[name])
+    for table in ['sf_table', 'cosmo_table']:
+        if table in d_results:
+            for name in d_results[table]:
+                np.save(os.path.join(tmp_dir, 'snapshots', table+'_'+name+'.npy'), d_results[table][name])
+    if galaxies is not None:
+        catalog.set_photometry(galaxies)
+    if catalog.photometry is not None:
+        with open(os.path.join(tmp_dir, 'photometry.pkl'), 'wb') as f:
+            pickle.dump(catalog.photometry, f)
+    meta = {}
+    meta['version'] = RESULTS_VERSION
+    meta['ngal'] = len(catalog)
+    meta['tracks'] = list(catalog.tracks.keys())
+    for key in RESULTS_PARAMETERS:
+        if key in d_results:
+            meta[key] = float(d_results[key])
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    old_dir = store_dir.rstrip('/')+'.old'
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+def load_results_store(store_dir, tracks=None, events=None, interpolated=True, photometry=False, mmap=True):
+    """Load the results saved by save_results_store as a dictionary like the one of the results pickle,
+    with the GalaxyCatalog in d['catalog'] and its GalaxyData-like views in d['galaxies'].
+
+    tracks ======== list of track quantities to load, all of them if None
+    events ======== list of kinds of events to load ('mergers', 'quenches', 'rejuvenations'), all if None
+    interpolated == if False the interpolated tracks are not loaded
+    photometry ==== if True the magnitudes and super colours are loaded as well
+    mmap ========== if True the arrays are memory-mapped and only read from disk when used"""
+    with open(os.path.join(store_dir, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] > RESULTS_VERSION:
+        raise ValueError('Results store version '+str(meta['version'])+' is newer than this code.')
+    mmap_mode = 'r' if mmap else None
+    load = lambda *path: np.load(os.path.join(store_dir, *path), mmap_mode=mmap_mode)
+    if tracks is None:
+        tracks = meta['tracks']
+    if events is None:
+        events = list(EVENT_DTYPES.keys())
+    d = {}
+    for key in RESULTS_PARAMETERS:
+        if key in meta:
+            d[key] = meta[key]
+    for filename in sorted(os.listdir(os.path.join(store_dir, 'snapshots'))):
+        name = filename[:-4]
+        for table in ['sf_table', 'cosmo_table']:
+            if name.startswith(table+'_'):
+                d.setdefault(table, {})[name[len(table)+1:]] = load('snapshots', filename)
+                break
+        else:
+            d[name] = load('snapshots', filename)
+    interp_offsets = None
+    interp = None
+    if interpolated:
+        interp_offsets = load('interp', 'offsets.npy')
+        interp = dict([(name, load('interp', name+'.npy')) for name in INTERPOLATED_TRACKS])
+    catalog = GalaxyCatalog(load('tracks', 'progen_ids.npy'), load('tracks', 'offsets.npy'),
+                            dict([(name, load('tracks', name+'.npy')) for name in tracks]),
+                            interp_offsets=interp_offsets, interp=interp,
+                            events=dict([(name, load('events', name+'.npy')) for name in events]))
+    filename = os.path.join(store_dir, 'photometry.pkl')
+    if photometry and os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            catalog.photometry = pickle.load(f)
+    d['catalog'] = catalog
+    d['galaxies'] = catalog.galaxies()
+    return d
+
+def is_results_store(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
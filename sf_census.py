@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Per-snapshot summary table of the star-forming population, used to normalise the quenching, rejuvenation
+and merger rates. For every snapshot it keeps the number of star-forming galaxies (sSFR above the 'end'
+threshold of progen_extractor.py), the total number of galaxies, a few quantiles of the stellar mass of
+star-forming galaxies and their histogram in log10(M*) on fixed bins.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+
+# log10(M*) bin edges used by the analysis scripts that are not on the 0.01 dex grid (quench_rejuvenation.py)
+SF_ANALYSIS_EDGES = np.linspace(9.5, 12.5, 12)
+# Fixed log10(M*) bins of the histogram, 0.01 dex wide plus the analysis edges, with the last bin open to any
+# larger mass
+SF_MASS_BINS = np.concatenate((np.union1d(np.round(np.arange(6.0, 13.0, 0.01), 2), SF_ANALYSIS_EDGES), [np.inf]))
+SF_MASS_QUANTILES = np.array([0.16, 0.5, 0.84])
+
+###########################################################################################
+"""
+FUNCTIONS TO BUILD THE TABLE
+"""
+
+def sf_census(ms, sfr, ssfr_cond):
+    """Summary of the star-forming galaxies in one snapshot, with ssfr_cond the log10 sSFR threshold."""
+    sf = sfr/ms >= 10**ssfr_cond
+    sfmass = ms[sf]
+    row = {}
+    row['sf_count'] = int(np.sum(sf))
+    row['total'] = len(ms)
+    if row['sf_count'] > 0:
+        row['mass_quantiles'] = np.quantile(sfmass, SF_MASS_QUANTILES)
+    else:
+        row['mass_quantiles'] = np.full(len(SF_MASS_QUANTILES), np.nan)
+    row['mass_hist'] = np.histogram(np.log10(sfmass), bins=SF_MASS_BINS)[0]
+    return row
+
+def new_sf_table(nsnap):
+    table = {}
+    table['sf_count'] = np.zeros(nsnap, dtype=np.int64)
+    table['total'] = np.zeros(nsnap, dtype=np.int64)
+    table['mass_quantiles'] = np.full((nsnap, len(SF_MASS_QUANTILES)), np.nan)
+    table['mass_hist'] = np.zeros((nsnap, len(SF_MASS_BINS)-1), dtype=np.int64)
+    table['quantiles'] = SF_MASS_QUANTILES
+    table['mass_bins'] = SF_MASS_BINS
+    return table
+
+def fill_sf_table(table, s, row):
+    for key in ['sf_count', 'total', 'mass_quantiles', 'mass_hist']:
+        table[key][s] = row[key]
+    return table
+
+def sf_table_row(table, s):
+    row = {}
+    for key in ['sf_count', 'total', 'mass_quantiles', 'mass_hist']:
+        row[key] = table[key][s]
+    return row
+
+###########################################################################################
+"""
+FUNCTIONS TO USE THE TABLE IN THE ANALYSIS
+"""
+
+def sf_redshift_counts(table, redshifts, z_bins):
+    """Number of star-forming galaxies summed over the snapshots inside each redshift bin."""
+    counts = np.zeros(len(z_bins)-1)
+    z_indx = np.digitize(redshifts, z_bins) - 1
+    inside = (z_indx >= 0) & (z_indx < len(z_bins)-1)
+    np.add.at(counts, z_indx[inside], table['sf_count'][inside])
+    return counts
+
+def sf_mass_counts(table, mass_bins, snaps=None):
+    """Number of star-forming galaxies in each log10(M*) bin, summed over the snapshots in snaps (all of
+    them if None). The edges must be edges of the table: tables written before SF_ANALYSIS_EDGES was added
+    have to be extracted again for the analysis edges that are not on the 0.01 dex grid."""
+    hist = table['mass_hist']
+    if snaps is not None:
+        hist = hist[snaps]
+    cumulative = np.concatenate(([0], np.cumsum(np.sum(hist, axis=0))))
+    bins = table['mass_bins']
+    mass_bins = np.asarray(mass_bins, dtype=np.float64)
+    edges = np.minimum(np.searchsorted(bins, mass_bins - 1e-9), len(bins)-1)
+    # Edges above the last finite one take all the larger masses of the open bin
+    exact = (abs(bins[edges] - mass_bins) < 1e-9) | (mass_bins >= bins[-2] + 0.01) | (mass_bins <= bins[0])
+    if not np.all(exact):
+        raise ValueError('Mass bin edges '+str(mass_bins[~exact])+' are not in the star-forming census table, '
+                         'extract the progen data again to rebuild it with these edges.')
+    return np.diff(cumulative[edges])
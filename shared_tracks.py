@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Zero-copy sharing of a GalaxyCatalog with the processes of a pool. The flat arrays of the catalog (tracks,
+offsets, interpolated tracks and sSFR thresholds) are copied once into multiprocessing.shared_memory blocks.
+The tasks only carry a small handle with the names of the blocks and a range of galaxies; each worker
+attaches to the blocks the first time it sees a handle and builds a catalog over them without copying.
+
+Needs Python >= 3.8. Without it, shared_memory is None and the finders fall back to sending the arrays of
+each galaxy with its task.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import uuid
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+from galaxy_catalog import GalaxyCatalog, INTERPOLATED_TRACKS
+
+# Number of galaxies processed by each task
+SHARED_CHUNK_SIZE = 1000
+# Blocks attached by this process, for the last handle seen: {'key':..., 'blocks':[...], 'catalog':...}
+_attached = {}
+
+###########################################################################################
+"""
+FUNCTIONS USED BY THE PARENT PROCESS
+"""
+
+def catalog_arrays(catalog, tracks):
+    """Flat arrays of the catalog to share, by path."""
+    arrays = {}
+    arrays['progen_ids'] = catalog.progen_ids
+    arrays['offsets'] = catalog.offsets
+    arrays['interp_offsets'] = catalog.interp_offsets
+    for name in tracks:
+        arrays['tracks/'+name] = catalog.tracks[name]
+    for name in INTERPOLATED_TRACKS:
+        arrays['interp/'+name] = catalog.interp[name]
+    if catalog.lssfr is not None:
+        for key in catalog.lssfr:
+            arrays['lssfr/'+key] = catalog.lssfr[key]
+    return arrays
+
+class SharedCatalog:
+    """Context manager that puts the arrays of a catalog in shared memory and gives back their handle.
+    The blocks are removed when the context is left."""
+    def __init__(self, catalog, tracks):
+        if shared_memory is None:
+            raise ImportError('multiprocessing.shared_memory needs Python 3.8 or newer.')
+        self.catalog = catalog
+        self.tracks = tracks
+        self.blocks = []
+    def __enter__(self):
+        handle = {'key': uuid.uuid4().hex, 'arrays': {}}
+        arrays = catalog_arrays(self.catalog, self.tracks)
+        for path in arrays:
+            array = np.ascontiguousarray(arrays[path])
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            handle['arrays'][path] = (block.name, array.shape, array.dtype.str)
+        return handle
+    def __exit__(self, exc_type, exc_value, traceback):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        return False
+
+def index_ranges(indexes, chunk_size=SHARED_CHUNK_SIZE):
+    """Split a list of catalog positions into the chunks processed by each task."""
+    indexes = np.asarray(indexes)
+    return [indexes[start:start+chunk_size] for start in range(0, len(indexes), chunk_size)]
+
+###########################################################################################
+"""
+FUNCTIONS USED BY THE WORKERS
+"""
+
+def attach_block(name):
+    """Attach to a block without registering it with the resource tracker, since the parent owns it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before Python 3.13 the registration can only be skipped by hand
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def attach_catalog(handle):
+    """GalaxyCatalog over the shared blocks of handle. The blocks are attached once per process."""
+    if _attached.get('key') == handle['key']:
+        return _attached['catalog']
+    # Detach from the blocks of the previous handle once its catalog is no longer referenced here
+    old_blocks = _attached.get('blocks', [])
+    _attached.clear()
+    for block in old_blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass
+    blocks = []
+    arrays = {}
+    for path in handle['arrays']:
+        name, shape, dtype = handle['arrays'][path]
+        block = attach_block(name)
+        blocks.append(block)
+        arrays[path] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    tracks = {}
+    interp = {}
+    lssfr = {}
+    for path in arrays:
+        if path.startswith('tracks/'):
+            tracks[path[7:]] = arrays[path]
+        elif path.startswith('interp/'):
+            interp[path[7:]] = arrays[path]
+        elif path.startswith('lssfr/'):
+            lssfr[path[6:]] = arrays[path]
+    catalog = GalaxyCatalog(arrays['progen_ids'], arrays['offsets'], tracks, interp_offsets=arrays['interp_offsets'], interp=interp)
+    if lssfr:
+        catalog.lssfr = lssfr
+    _attached['key'] = handle['key']
+    _attached['blocks'] = blocks
+    _attached['catalog'] = catalog
+    return catalog
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+On-disk cache for the stages of gen_pickle.py. The outputs of a stage are saved under a key that is the hash
+of the name of the stage, the keys of the stages (or fingerprints of the files) it depends on and its
+parameters, so a rerun only recomputes the stages whose inputs changed, e.g. changing min_merger_ratio
+recomputes the mergers but reuses the quenching analysis and the photometry crossmatch.
+
+Large inputs (the progen store) are keyed on the names, sizes and modification times of their files and on
+their meta.json, so the key is found without reading the data. The code of a stage is keyed on the source of
+its module and of every module of the repository it imports, directly or not.
+
+The outputs of a stage are a dictionary: NumPy arrays are saved as .npy files, and anything else in a
+single pickle. Each entry is a directory cache_dir/stage/key/, written to a temporary directory first.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import sys
+import types
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+CACHE_VERSION = 2
+# Bytes read at once when hashing files
+HASH_BLOCK_SIZE = 2**20
+
+###########################################################################################
+"""
+FUNCTIONS TO COMPUTE THE KEYS
+"""
+
+def file_fingerprint(path):
+    """Hash of the content of a file, or of all the files of a directory, '' if path does not exist."""
+    if not os.path.exists(path):
+        return ''
+    h = hashlib.sha1()
+    if os.path.isdir(path):
+        filenames = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                filenames.append(os.path.join(root, filename))
+    else:
+        filenames = [path]
+    for filename in filenames:
+        h.update(os.path.relpath(filename, path).encode('utf-8'))
+        with open(filename, 'rb') as f:
+            block = f.read(HASH_BLOCK_SIZE)
+            while block:
+                h.update(block)
+                block = f.read(HASH_BLOCK_SIZE)
+    return h.hexdigest()
+
+def stat_fingerprint(path):
+    """Hash of the names, sizes and modification times of a file or of all the files of a directory, and of
+    the content of its meta.json if it has one, '' if path does not exist. Nothing else is read."""
+    if not os.path.exists(path):
+        return ''
+    h = hashlib.sha1()
+    if os.path.isdir(path):
+        filenames = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                filenames.append(os.path.join(root, filename))
+    else:
+        filenames = [path]
+    for filename in filenames:
+        stat = os.stat(filename)
+        h.update(('%s %d %d' % (os.path.relpath(filename, path), stat.st_size, stat.st_mtime_ns)).encode('utf-8'))
+    meta = os.path.join(path, 'meta.json')
+    if os.path.isdir(path) and os.path.exists(meta):
+        h.update(file_fingerprint(meta).encode('utf-8'))
+    return h.hexdigest()
+
+def data_fingerprint(data):
+    """Hash of a dictionary of arrays and scalars held in memory (e.g. the cosmology table)."""
+    h = hashlib.sha1()
+    for key in sorted(data):
+        value = np.ascontiguousarray(data[key])
+        h.update(('%s %s %s' % (key, value.dtype.str, value.shape)).encode('utf-8'))
+        h.update(value.tobytes())
+    return h.hexdigest()
+
+def is_local_module(module):
+    """True for the modules with Python source outside the Python installation, i.e. those of this
+    repository and of the other analysis codes added to sys.path."""
+    filename = getattr(module, '__file__', None)
+    if filename is None or os.path.splitext(filename)[1] not in ['.py', '.pyc']:
+        return False
+    filename = os.path.realpath(filename)
+    prefixes = set([os.path.realpath(prefix) for prefix in [sys.prefix, sys.base_prefix, sys.exec_prefix]])
+    return not any([filename.startswith(prefix+os.sep) for prefix in prefixes]) and 'site-packages' not in filename
+
+def imported_modules(module):
+    """The local modules that module imports, directly or through other local modules, including itself.
+    Functions and classes imported with 'from ... import' count through the module that defines them."""
+    found = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found:
+            continue
+        found[current.__name__] = current
+        for value in list(vars(current).values()):
+            if isinstance(value, types.ModuleType):
+                imported = value
+            else:
+                imported = sys.modules.get(getattr(value, '__module__', None) or '')
+            if imported is not None and imported.__name__ not in found and is_local_module(imported):
+                pending.append(imported)
+    return found
+
+def module_fingerprint(module):
+    """Hash of the source files of a module and of all the local modules it imports, so that the cached
+    outputs of a stage change with any of the code it runs."""
+    modules = imported_modules(module)
+    h = hashlib.sha1()
+    for name in sorted(modules):
+        h.update(name.encode('utf-8'))
+        h.update(file_fingerprint(os.path.splitext(modules[name].__file__)[0]+'.py').encode('utf-8'))
+    return h.hexdigest()
+
+def stage_key(name, inputs, params):
+    """Key of stage name from the keys or fingerprints of its inputs (a list of strings) and its parameters
+    (a dictionary of values that can be written as JSON)."""
+    description = json.dumps({'version': CACHE_VERSION, 'stage': name, 'inputs': list(inputs), 'params': params},
+                             sort_keys=True, default=repr)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+###########################################################################################
+"""
+THE CACHE
+"""
+
+class StageCache(object):
+    def __init__(self, cache_dir='./stage_cache', enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+    def path(self, name, key):
+        return os.path.join(self.cache_dir, name, key)
+    def has(self, name, key):
+        return self.enabled and os.path.exists(os.path.join(self.path(name, key), 'objects.pkl'))
+    def load(self, name, key):
+        path = self.path(name, key)
+        with open(os.path.join(path, 'objects.pkl'), 'rb') as f:
+            outputs = pickle.load(f)
+        for filename in os.listdir(path):
+            if filename.endswith('.npy'):
+                outputs[filename[:-4]] = np.load(os.path.join(path, filename))
+        return outputs
+    def save(self, name, key, outputs):
+        path = self.path(name, key)
+        tmp_dir = path+'.tmp'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        objects = {}
+        for output in outputs:
+            if isinstance(outputs[output], np.ndarray):
+                np.save(os.path.join(tmp_dir, output+'.npy'), outputs[output])
+            else:
+                objects[output] = outputs[output]
+        with open(os.path.join(tmp_dir, 'objects.pkl'), 'wb') as f:
+            pickle.dump(objects, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_dir, path)
+    def run(self, name, inputs, params, compute):
+        """Key and outputs of stage name, loaded from the cache if they are there or else computed by
+        compute() (which returns the dictionary of outputs) and saved."""
+        key = stage_key(name, inputs, params)
+        if self.has(name, key):
+            print('Stage '+name+' loaded from cache ('+key[:10]+').')
+            return key, self.load(name, key)
+        outputs = compute()
+        if self.enabled:
+            self.save(name, key, outputs)
+        return key, outputs
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Binned statistics over sub-volumes of the simulation box, for the cosmic variance errors of plotmedian and
+plotmedian2. The box is split in an nside^3 grid of sub-volumes (nside=2 gives the octants used before) and
+the statistic of every bin in every sub-volume is computed at once, from a single sort or bincount over the
+combined (bin, sub-volume) index. From them come two error estimates:
+
+scatter ====== standard deviation of the statistic over the sub-volumes (the octant errors of plotmedian)
+jackknife ==== delete-one jackknife error, from the statistic of the whole box without each sub-volume
+
+Supported statistics: 'count', 'sum', 'mean', 'std' and 'median', as in scipy.stats.binned_statistic.
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+
+SUBVOLUME_STATISTICS = ['count', 'sum', 'mean', 'std', 'median']
+
+###########################################################################################
+"""
+FUNCTIONS TO ASSIGN THE GALAXIES TO BINS AND SUB-VOLUMES
+"""
+
+def subvolume_index(pos, boxsize, nside=2):
+    """Sub-volume of each position in an nside^3 grid over the box, numbered x + y*nside + z*nside^2."""
+    cell = np.floor(np.asarray(pos)/(float(boxsize)/nside)).astype(np.int64)
+    cell = np.clip(cell, 0, nside-1)
+    return cell[:,0] + cell[:,1]*nside + cell[:,2]*nside**2
+
+def bin_index(x, edges):
+    """Bin of each value as in scipy.stats.binned_statistic (the last bin includes its right edge), -1
+    outside the edges."""
+    x = np.asarray(x)
+    nbins = len(edges)-1
+    indx = np.digitize(x, edges) - 1
+    decimal = int(-np.log10(np.min(np.diff(edges)))) + 6
+    on_edge = (x >= edges[-1]) & (np.around(x, decimal) == np.around(edges[-1], decimal))
+    indx[on_edge] = nbins-1
+    indx[(indx < 0) | (indx >= nbins)] = -1
+    return indx
+
+###########################################################################################
+"""
+FUNCTIONS TO COMPUTE THE STATISTICS
+"""
+
+def grouped_moments(group, y, ngroups):
+    """Count, sum and sum of squares of y in each group."""
+    count = np.bincount(group, minlength=ngroups).astype(np.float64)
+    total = np.bincount(group, weights=y, minlength=ngroups)
+    squares = np.bincount(group, weights=y*y, minlength=ngroups)
+    return count, total, squares
+
+def moments_statistic(count, total, squares, statistic):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if statistic == 'count':
+            return count
+        elif statistic == 'sum':
+            return total
+        elif statistic == 'mean':
+            return np.where(count > 0, total/count, np.nan)
+        mean = total/count
+        return np.where(count > 0, np.sqrt(np.maximum(squares/count - mean**2, 0)), np.nan)
+
+def sorted_medians(values, starts, counts):
+    """Medians of the groups of sorted values that start at starts, NaN for empty groups."""
+    medians = np.full(len(counts), np.nan)
+    filled = counts > 0
+    lo = starts[filled] + (counts[filled]-1)//2
+    hi = starts[filled] + counts[filled]//2
+    medians[filled] = 0.5*(values[lo] + values[hi])
+    return medians
+
+def subvolume_statistics(x, y, edges, pos, boxsize, nside=2, statistic='median', jackknife=True):
+    """Statistic of y in the bins of x with edges, for the whole box and for each of the nside^3 sub-volumes.
+
+    Returns a dictionary with:
+    statistic ========= the statistic in the whole box, per bin
+    subvolumes ======== (nbins x nside^3) statistic in each sub-volume
+    scatter =========== standard deviation over the sub-volumes with a valid statistic
+    jackknife ========= (nbins x nside^3) statistic of the box without each sub-volume (if jackknife)
+    jackknife_error === delete-one jackknife error, sqrt((K-1)/K sum (theta_k - mean theta)^2) over the
+                          K sub-volumes with a valid statistic"""
+    if statistic not in SUBVOLUME_STATISTICS:
+        raise ValueError('Unknown statistic '+str(statistic)+', choose one of '+', '.join(SUBVOLUME_STATISTICS))
+    edges = np.asarray(edges, dtype=np.float64)
+    nbins = len(edges)-1
+    nsub = nside**3
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    b = bin_index(x, edges)
+    inside = b >= 0
+    b, y = b[inside], y[inside]
+    s = subvolume_index(np.asarray(pos)[inside], boxsize, nside)
+    group = b*nsub + s
+    results = {}
+    if statistic != 'median':
+        count, total, squares = grouped_moments(group, y, nbins*nsub)
+        count, total, squares = count.reshape(nbins, nsub), total.reshape(nbins, nsub), squares.reshape(nbins, nsub)
+        results['subvolumes'] = moments_statistic(count, total, squares, statistic)
+        full = [count.sum(axis=1), total.sum(axis=1), squares.sum(axis=1)]
+        results['statistic'] = moments_statistic(full[0], full[1], full[2], statistic)
+        if jackknife:
+            results['jackknife'] = moments_statistic(full[0][:,None]-count, full[1][:,None]-total,
+                                                     full[2][:,None]-squares, statistic)
+    else:
+        # A single sort by (bin, sub-volume, y) gives the medians of all the sub-volumes and, sorting only by
+        # (bin, y), those of the whole box
+        order = np.lexsort((y, group))
+        counts = np.bincount(group, minlength=nbins*nsub)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        results['subvolumes'] = sorted_medians(y[order], starts, counts).reshape(nbins, nsub)
+        order = np.lexsort((y, b))
+        y_sorted, s_sorted = y[order], s[order]
+        bin_counts = np.bincount(b, minlength=nbins)
+        bin_starts = np.concatenate(([0], np.cumsum(bin_counts)[:-1]))
+        results['statistic'] = sorted_medians(y_sorted, bin_starts, bin_counts)
+        if jackknife:
+            results['jackknife'] = jackknife_medians(y_sorted, s_sorted, bin_starts, counts.reshape(nbins, nsub))
+    with np.errstate(invalid='ignore'):
+        sub = np.ma.masked_invalid(results['subvolumes'])
+        results['scatter'] = np.ma.std(sub, axis=1).filled(np.nan)
+        if jackknife:
+            jack = np.ma.masked_invalid(results['jackknife'])
+            k = jack.count(axis=1)
+            deviation = jack - jack.mean(axis=1)[:,None]
+            results['jackknife_error'] = np.ma.sqrt((k-1.0)/np.maximum(k, 1)*np.ma.sum(deviation**2, axis=1)).filled(np.nan)
+    return results
+
+def jackknife_medians(y_sorted, s_sorted, bin_starts, counts):
+    """(nbins x nsub) medians of each bin without each sub-volume, from the values sorted by (bin, y).
+
+    The positions of the values are grouped by sub-volume once, with the key s*(n+1) + position, so the
+    number of values of sub-volume k before any position is a single bisection in that array. The median
+    ranks of every (bin, sub-volume) pair among the values that are kept are then found together, by a
+    bisection over the positions of the bin, so the cost is one sort of the data plus
+    O(nbins*nsub*log(n)^2) and does not grow with n*nsub."""
+    nbins, nsub = counts.shape
+    medians = np.full((nbins, nsub), np.nan)
+    n = len(y_sorted)
+    if n == 0:
+        return medians
+    grouped = np.sort(s_sorted.astype(np.int64)*(n+1) + np.arange(n))
+    bin_totals = counts.sum(axis=1)
+    kept_totals = bin_totals[:,None] - counts
+    b, k = np.nonzero(kept_totals > 0)
+    start = bin_starts[b]
+    end = start + bin_totals[b]
+    base = np.searchsorted(grouped, k*(n+1) + start)
+    def kept_before(q):
+        """Values of bin b that are not in sub-volume k at positions start ... q-1."""
+        return (q - start) - (np.searchsorted(grouped, k*(n+1) + q) - base)
+    values = []
+    for rank in [(kept_totals[b,k]-1)//2, kept_totals[b,k]//2]:
+        # Smallest q with rank+1 values kept before it, the value of that rank is at q-1
+        lo, hi = start.copy(), end.copy()
+        while np.any(hi - lo > 1):
+            mid = (lo + hi)//2
+            enough = kept_before(mid) >= rank+1
+            hi = np.where(enough, mid, hi)
+            lo = np.where(enough, lo, mid)
+        values.append(y_sorted[hi-1])
+    medians[b, k] = 0.5*(values[0] + values[1])
+    return medians
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on 17 October 2026
+
+Generator of synthetic progen data with the layout written by progen_extractor.py (matrix layout, column 0
+is z = 0), so that the finders and the analysis can be run and profiled without the Caesar files.
+
+Each galaxy grows along the star-forming main sequence, with mergers injected as sudden mass jumps, and a
+fraction of the galaxies quench at a random time, some of them with a later rejuvenation episode. The main
+progenitor tracks have different lengths, as in SIMBA, where the progenitor index becomes -1.
+
+Usage:
+    python synthetic_progen.py NGAL OUTPUT [--nsnap 151] [--seed 0] [--pickle]
+
+@author: currorodriguez
+"""
+
+"""Import some necessary packages"""
+import numpy as np
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from progen_tracks import allocate_tracks
+from progen_store import save_progen_store
+from sf_census import sf_census, new_sf_table, fill_sf_table
+from cosmo_table import ssfr_threshold
+
+# Default parameters of the synthetic population
+SYNTHETIC_PARAMETERS = {
+    'nsnap': 151,
+    'z_max': 20.0,
+    't_0': 13.8,                  # Age of the universe at z = 0 in Gyr
+    'boxsize_in_kpccm': 50000.0,
+    'min_length': 10,             # Minimum number of snapshots of a main progenitor track
+    'merger_rate': 0.15,          # Mergers per galaxy per Gyr
+    'merger_ratios': (0.1, 1.0),  # Range of the fractional mass jump of a merger
+    'quench_fraction': 0.4,
+    'rejuvenation_fraction': 0.3, # Fraction of the quenched galaxies that rejuvenate
+    'rejuvenation_time': (0.3, 1.5), # Range of the duration of a rejuvenation in Gyr
+}
+
+###########################################################################################
+"""
+FUNCTIONS TO GENERATE THE POPULATION
+"""
+
+def synthetic_times(nsnap, z_max, t_0):
+    """Redshifts and ages (in Gyr) of the snapshots, from z = 0 back to z_max, for a matter-dominated
+    universe, which is close enough to SIMBA for profiling."""
+    redshifts = np.expm1(np.linspace(0, np.log1p(z_max), nsnap))
+    t_hubble = t_0*(1+redshifts)**-1.5
+    return redshifts, t_hubble
+
+def synthetic_progen(ngal, seed=0, **kwargs):
+    """Progen dictionary in the matrix layout for ngal synthetic galaxies. The parameters of
+    SYNTHETIC_PARAMETERS can be changed with keyword arguments."""
+    par = dict(SYNTHETIC_PARAMETERS)
+    par.update(kwargs)
+    nsnap = par['nsnap']
+    rng = np.random.RandomState(seed)
+    redshifts, t_hubble = synthetic_times(nsnap, par['z_max'], par['t_0'])
+    # Everything is built forward in time (column 0 at z_max) and reversed at the end
+    t = t_hubble[::-1]
+    dt = np.diff(t, prepend=0)
+    lengths = rng.randint(par['min_length'], nsnap+1, size=ngal)
+    valid = np.arange(nsnap)[None,:] >= (nsnap-lengths)[:,None]
+
+    # Star formation: main sequence with scatter, quenching and rejuvenation episodes
+    ms_offset = rng.normal(0.2, 0.25, size=(ngal, nsnap))
+    lssfr = np.log10(1/t)[None,:] - 9 + ms_offset
+    t_quench = np.full(ngal, np.inf)
+    quenched = rng.rand(ngal) < par['quench_fraction']
+    t_start = t[nsnap-lengths]
+    t_quench[quenched] = t_start[quenched] + rng.rand(np.sum(quenched))*(t[-1]-t_start[quenched])
+    passive = t[None,:] >= t_quench[:,None]
+    lssfr[passive] = (np.log10(0.2/t)[None,:] - 9 - rng.uniform(0.3, 1.5, size=(ngal, nsnap)))[passive]
+    rejuvenated = quenched & (rng.rand(ngal) < par['rejuvenation_fraction'])
+    t_rejuv = t_quench + rng.uniform(1.0, 3.0, size=ngal)
+    t_rejuv_end = t_rejuv + rng.uniform(*par['rejuvenation_time'], size=ngal)
+    rejuv = rejuvenated[:,None] & (t[None,:] >= t_rejuv[:,None]) & (t[None,:] < t_rejuv_end[:,None])
+    lssfr[rejuv] = (np.log10(1/t)[None,:] - 9 + ms_offset)[rejuv]
+    ssfr = 10**lssfr
+
+    # Stellar mass: integrated star formation and mergers, given as mass jumps
+    merger_probability = 1 - np.exp(-par['merger_rate']*dt)
+    mergers = rng.rand(ngal, nsnap) < merger_probability[None,:]
+    jumps = np.where(mergers, 1 + rng.uniform(*par['merger_ratios'], size=(ngal, nsnap)), 1.0)
+    m = np.zeros((ngal, nsnap))
+    m_start = 10**rng.uniform(7.0, 8.5, size=ngal)
+    current = np.zeros(ngal)
+    for s in range(0, nsnap):
+        born = (nsnap-lengths) == s
+        current[born] = m_start[born]
+        growing = valid[:,s] & ~born
+        current[growing] = current[growing]*(1 + ssfr[growing,s]*dt[s]*1e9)*jumps[growing,s]
+        m[:,s] = current
+    sfr = ssfr*m
+
+    # Gas, black holes and environment
+    fgas = np.clip(0.5*(t[None,:]/t[-1])**-0.7*10**(0.5*(lssfr-lssfr.mean())), 1e-3, 5.0)
+    fgas[passive & ~rejuv] *= 0.05
+    tracks = allocate_tracks(ngal, nsnap)
+    tracks['m'] = m
+    tracks['sfr'] = sfr
+    tracks['h2_gas'] = 0.4*fgas*m
+    tracks['h1_gas'] = 0.6*fgas*m
+    tracks['bhm'] = m*10**(-3 + rng.normal(0, 0.2, size=(ngal, 1)))
+    tracks['bhar'] = 1e-3*sfr*rng.lognormal(0, 1, size=(ngal, nsnap))
+    tracks['local_den'] = rng.lognormal(0, 1, size=(ngal, 1))*np.ones((1, nsnap))
+    tracks['g_type'] = np.ones((ngal, nsnap))
+    tracks['caesar_id'] = np.cumsum(valid[::-1], axis=0)[::-1] - 1.0
+    pos = rng.uniform(0, par['boxsize_in_kpccm'], size=(ngal, 1, 3))
+    tracks['pos'] = np.mod(pos + rng.normal(0, 100.0, size=(ngal, nsnap, 3)).cumsum(axis=1), par['boxsize_in_kpccm'])
+    for name in tracks:
+        if name != 'valid':
+            tracks[name] = np.where(valid.reshape(valid.shape+(1,)*(tracks[name].ndim-2)), tracks[name], np.nan)
+    tracks['valid'] = valid
+
+    # Back to the order of progen_extractor.py, with column 0 at z = 0
+    d = {}
+    d['tracks'] = dict([(name, np.ascontiguousarray(tracks[name][:,::-1])) for name in tracks])
+    d['redshifts'] = redshifts
+    d['t_hubble'] = t_hubble
+    d['snapshots'] = ['snap_m50n512_%03d' % (nsnap-1-s) for s in range(0, nsnap)]
+    d['galaxy_ids'] = np.arange(ngal)
+    d['progen_index'] = np.where(d['tracks']['valid'], d['tracks']['caesar_id'], -1).astype(np.int32)
+    d['boxsize_in_kpccm'] = par['boxsize_in_kpccm']
+    d['sf_table'] = new_sf_table(nsnap)
+    d['sf_galaxies_per_snap'] = np.zeros(nsnap)
+    d['galaxies_per_snap'] = np.zeros(nsnap)
+    for s in range(0, nsnap):
+        alive = d['tracks']['valid'][:,s]
+        row = sf_census(d['tracks']['m'][alive,s], d['tracks']['sfr'][alive,s], ssfr_threshold('end', t_hubble[s]))
+        fill_sf_table(d['sf_table'], s, row)
+        d['sf_galaxies_per_snap'][s] = row['sf_count']
+        d['galaxies_per_snap'][s] = row['total']
+    return d
+
+def save_synthetic_progen(d, output, store=True):
+    """Save synthetic progen data as a progen store (directory) or as a pickle file."""
+    if store:
+        save_progen_store(d, output)
+    else:
+        with open(output, 'wb') as f:
+            pickle.dump(d, f)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Write synthetic progen data for testing and profiling.')
+    parser.add_argument('NGAL', type=int, help='number of galaxies at z = 0')
+    parser.add_argument('OUTPUT', help='progen store directory (or pickle file with --pickle)')
+    parser.add_argument('--nsnap', type=int, default=SYNTHETIC_PARAMETERS['nsnap'], help='number of snapshots')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random numbers')
+    parser.add_argument('--pickle', action='store_true', help='save a pickle file instead of a progen store')
+    args = parser.parse_args()
+    d = synthetic_progen(args.NGAL, seed=args.seed, nsnap=args.nsnap)
+    save_synthetic_progen(d, args.OUTPUT, store=not args.pickle)
+    print('Synthetic progen data of '+str(args.NGAL)+' galaxies saved in '+args.OUTPUT)
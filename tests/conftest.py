@@ -0,0 +1,22 @@
+"""
+The modules of the repository are flat scripts in its root folder, so the tests import them from there. The
+data come from synthetic_progen.py, so no Caesar files are needed.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from synthetic_progen import synthetic_progen
+from galaxy_catalog import GalaxyCatalog
+from cosmo_table import snapshot_cosmo_table, snapshot_thresholds
+
+def synthetic_catalog(ngal, seed=0):
+    d = synthetic_progen(ngal, seed=seed)
+    catalog = GalaxyCatalog.from_progen(d)
+    catalog.lssfr = snapshot_thresholds(snapshot_cosmo_table(d['redshifts'], d['t_hubble']), catalog.tracks['z'])
+    return d, catalog
+
+@pytest.fixture(scope='module')
+def progen_catalog():
+    return synthetic_catalog(400, seed=3)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from executors import SerialExecutor, ProcessExecutor
+from bootstrap_stats import bootstrap_statistic, bootstrap_counts
+
+def test_bootstrap_same_on_any_executor():
+    rng = np.random.default_rng(4)
+    x, y = rng.uniform(9, 12, 3000), rng.normal(0, 1, 3000)
+    serial = bootstrap_statistic(x, y, np.linspace(9, 12, 7), 'median', nboot=200, seed=1)
+    with ProcessExecutor(nproc=2) as p_workers:
+        pooled = bootstrap_statistic(x, y, np.linspace(9, 12, 7), 'median', nboot=200, seed=1, p_workers=p_workers)
+    assert np.array_equal(serial['realizations'], pooled['realizations'])
+    assert np.all(serial['lower'] <= serial['statistic']) and np.all(serial['statistic'] <= serial['upper'])
+
+def test_bootstrap_counts_more_events_than_objects():
+    k, n = np.array([30, 2, 0]), np.array([10, 50, 0])
+    with pytest.raises(ValueError):
+        bootstrap_counts(k, n, nboot=100)
+    boot = bootstrap_counts(k, n, nboot=2000, model='poisson', norm=np.array([2.0, 2.0, 2.0]))
+    assert np.allclose(boot['statistic'][:2], [1.5, 0.02])
+    assert np.isclose(boot['error'][0], np.sqrt(30)/20, rtol=0.1)
+    assert np.isnan(boot['statistic'][2])
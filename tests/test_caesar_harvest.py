@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+h5py = pytest.importorskip('h5py')
+from caesar_harvest import GALAXY_DATASETS, harvest_snapshot
+
+@pytest.fixture(scope='module')
+def caesar_file(tmp_path_factory):
+    """Caesar-like HDF5 file with the galaxy datasets read by progen_extractor.py (without black holes)."""
+    filename = str(tmp_path_factory.mktemp('caesar') / 'm25n256_151.hdf5')
+    rng = np.random.default_rng(5)
+    ngal = 5000
+    with h5py.File(filename, 'w') as f:
+        attrs = f.create_group('simulation_attributes').attrs
+        for key, value in [('redshift', 0.0), ('hubble_constant', 0.68), ('omega_matter', 0.3),
+                           ('omega_baryon', 0.048), ('boxsize', 25000.0)]:
+            attrs[key] = value
+        for name in GALAXY_DATASETS:
+            if name == 'pos':
+                f[GALAXY_DATASETS[name]] = rng.random((ngal, 3))
+            elif name not in ['bhar', 'bhm']:
+                f[GALAXY_DATASETS[name]] = rng.random(ngal)
+    return filename
+
+@pytest.mark.parametrize('rows', [np.array([4000, 7, 7, 1200, 3]), np.arange(100, 3000, 2)[::-1], np.array([], dtype=int)])
+def test_harvest_rows(caesar_file, rows):
+    sim_info, full = harvest_snapshot(caesar_file)
+    sim_info, part = harvest_snapshot(caesar_file, rows=rows, whole_fields=['m', 'sfr'])
+    for name in GALAXY_DATASETS:
+        expected = full[name] if name in ['m', 'sfr'] else full[name][rows]
+        assert np.array_equal(part[name], expected)
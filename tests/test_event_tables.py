@@ -0,0 +1,11 @@
+import numpy as np
+from event_tables import events_from_rows, MergerRecord, QuenchRecord
+
+def test_records_keep_nan_values():
+    mergers = events_from_rows('mergers', [(0, 5, 0.3, np.nan), (1, 7, 0.5, 2.0)])
+    merger = MergerRecord(mergers, 0)
+    assert merger.indx == 5 and np.isnan(merger.fgas_boost)
+    assert np.isnan(np.log10(merger.fgas_boost))
+    assert MergerRecord(mergers, 1).fgas_boost == 2.0
+    quench = QuenchRecord(events_from_rows('quenches', [(0, 3, None, 4, 0.8)]), 0)
+    assert quench.below11 is None and quench.above9 == 3 and quench.quench_time == 0.8
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import mergerFinder
+from mergerFinder import merger_finder, merger_sweep
+from quenchingFinder import quenching_stage
+from online_mergers import online_mergers
+from executors import SerialExecutor, ProcessExecutor
+from event_tables import sort_events
+from cosmo_table import snapshot_cosmo_table, snapshot_thresholds
+
+MERGER_PARAMETERS = [(0.2, 10**9.5, 2.5), (0.1, 10**8.5, 5.0)]
+
+@pytest.mark.parametrize('merger_ratio, mass_limit, redshift_limit', MERGER_PARAMETERS)
+def test_merger_kernels_match_per_galaxy_finder(progen_catalog, monkeypatch, merger_ratio, mass_limit, redshift_limit):
+    d, catalog = progen_catalog
+    # Small blocks, so that the padded kernel goes over several of them
+    monkeypatch.setattr(mergerFinder, 'KERNEL_BLOCK_SIZE', 150)
+    found = {}
+    merger_finder(catalog, merger_ratio, mass_limit, redshift_limit, SerialExecutor())
+    found['per galaxy'] = catalog.events['mergers']
+    assert len(found['per galaxy']) > 0
+    for vectorized in [True, 'ragged']:
+        merger_finder(catalog, merger_ratio, mass_limit, redshift_limit, None, vectorized=vectorized)
+        found[vectorized] = catalog.events['mergers']
+    with ProcessExecutor(nproc=2) as p_workers:
+        merger_finder(catalog, merger_ratio, mass_limit, redshift_limit, p_workers, shared=True)
+    found['shared'] = catalog.events['mergers']
+    sweep = merger_sweep(catalog, [merger_ratio], [mass_limit], [redshift_limit], SerialExecutor())
+    found['sweep'] = sort_events(sweep['mergers'][(merger_ratio, mass_limit, redshift_limit)])
+    lssfr_end = snapshot_thresholds(snapshot_cosmo_table(d['redshifts'], d['t_hubble']), d['redshifts'])['end']
+    found['online'] = online_mergers(d, merger_ratio, mass_limit, redshift_limit, lssfr_end=lssfr_end)
+    for name in found:
+        assert found[name].tobytes() == found['per galaxy'].tobytes(), name
+
+def test_quenching_kernel_matches_per_galaxy_stage(progen_catalog):
+    d, catalog = progen_catalog
+    found = {}
+    quenching_stage(catalog, 1, 9.5, SerialExecutor())
+    found['per galaxy'] = (dict(catalog.events), catalog.interp_offsets, dict(catalog.interp))
+    assert len(catalog.events['quenches']) > 0 and len(catalog.events['rejuvenations']) > 0
+    quenching_stage(catalog, 1, 9.5, None, vectorized=True)
+    found['vectorized'] = (dict(catalog.events), catalog.interp_offsets, dict(catalog.interp))
+    with ProcessExecutor(nproc=2) as p_workers:
+        quenching_stage(catalog, 1, 9.5, p_workers, shared=True)
+    found['shared'] = (dict(catalog.events), catalog.interp_offsets, dict(catalog.interp))
+    events, offsets, interp = found['per galaxy']
+    for name in found:
+        for kind in ['quenches', 'rejuvenations']:
+            assert found[name][0][kind].tobytes() == events[kind].tobytes(), (name, kind)
+        assert np.array_equal(found[name][1], offsets), name
+        for track in interp:
+            assert np.array_equal(found[name][2][track], interp[track]), (name, track)
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from merger_tree import build_merger_tree, main_branch, progenitors, node_of
+
+def test_tree_links_and_gap():
+    # Snapshots 151, 150 and 148 (149 missing): the links of 150 point to 149 and are cut
+    masses = [np.array([10.0, 5.0]), np.array([6.0, 3.0, 2.0]), np.array([1.0])]
+    links = [np.array([[0, 2], [1, -1]]), np.array([[0], [-1], [0]]), np.zeros((1, 0), dtype=int)]
+    tree = build_merger_tree(links, masses, [151, 150, 148])
+    assert list(progenitors(tree, node_of(tree, 0, 0))) == [node_of(tree, 1, 0), node_of(tree, 1, 2)]
+    assert list(main_branch(tree, node_of(tree, 0, 1))) == [node_of(tree, 0, 1), node_of(tree, 1, 1)]
+    assert len(progenitors(tree, node_of(tree, 1, 0))) == 0
+
+def test_tree_rejects_bad_links():
+    masses = [np.array([10.0]), np.array([6.0])]
+    with pytest.raises(ValueError):
+        build_merger_tree([np.array([[3]]), np.zeros((1, 0), dtype=int)], masses, [151, 150])
@@ -0,0 +1,26 @@
+import numpy as np
+from synthetic_progen import synthetic_progen
+from progen_store import save_progen_store, load_progen_store
+from galaxy_catalog import GalaxyCatalog
+
+def test_progen_store_round_trip(tmp_path):
+    d = synthetic_progen(200, seed=1)
+    save_progen_store(d, str(tmp_path / 'progen'))
+    store = load_progen_store(str(tmp_path / 'progen'))
+    for name in d['tracks']:
+        np.testing.assert_array_equal(store['tracks'][name], d['tracks'][name], err_msg=name)
+    for name in d['sf_table']:
+        np.testing.assert_array_equal(store['sf_table'][name], d['sf_table'][name], err_msg=name)
+    catalog, expected = GalaxyCatalog.from_progen(store), GalaxyCatalog.from_progen(d)
+    assert np.array_equal(catalog.offsets, expected.offsets)
+    for name in expected.tracks:
+        np.testing.assert_array_equal(catalog.tracks[name], expected.tracks[name], err_msg=name)
+
+def test_progen_store_partial_load(tmp_path):
+    d = synthetic_progen(200, seed=1)
+    save_progen_store(d, str(tmp_path / 'progen'))
+    rows = np.array([3, 50, 51, 199])
+    part = load_progen_store(str(tmp_path / 'progen'), fields=['m', 'sfr'], galaxies=rows)
+    assert sorted(part['tracks'].keys()) == ['m', 'sfr', 'valid']
+    assert np.array_equal(part['galaxy_ids'], d['galaxy_ids'][rows])
+    np.testing.assert_array_equal(part['tracks']['m'], d['tracks']['m'][rows])
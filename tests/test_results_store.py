@@ -0,0 +1,65 @@
+import pickle
+import numpy as np
+from executors import SerialExecutor
+from mergerFinder import merger_finder
+from quenchingFinder import quenching_stage
+from results_store import save_results_store, load_results_store
+
+def final_split(galaxies):
+    """Number of final and non-final quenches, classified as in quench_rejuvenation.py."""
+    finalis = 0
+    nofinalis = 0
+    for galaxy in galaxies:
+        if len(galaxy.quenching) > 0:
+            lastquench = galaxy.quenching[-1]
+        for quench in galaxy.quenching:
+            if quench is lastquench:
+                finalis = finalis + 1
+            else:
+                nofinalis = nofinalis + 1
+    return finalis, nofinalis
+
+def test_store_and_pickle_final_quenches(progen_catalog, tmp_path):
+    d, catalog = progen_catalog
+    quenching_stage(catalog, 1, 9.5, SerialExecutor(), vectorized=True)
+    d_results = {'redshifts': d['redshifts'], 'mass_limit': 9.5}
+    save_results_store(d_results, catalog, str(tmp_path / 'store'))
+    galaxies = pickle.loads(pickle.dumps(catalog.to_galaxies()))
+    store = load_results_store(str(tmp_path / 'store'), events=['quenches', 'rejuvenations'])
+    split = final_split(galaxies)
+    assert split[1] > 0
+    assert final_split(store['galaxies']) == split
+    for galaxy, view in zip(galaxies, store['galaxies']):
+        assert view.rejuvenations == galaxy.rejuvenations
+        assert [q.quench_time for q in view.quenching] == [q.quench_time for q in galaxy.quenching]
+
+def test_store_round_trip_matches_pickle(progen_catalog, tmp_path):
+    d, catalog = progen_catalog
+    merger_finder(catalog, 0.2, 10**9.5, 2.5, None, vectorized='ragged')
+    quenching_stage(catalog, 1, 9.5, SerialExecutor(), vectorized=True)
+    d_results = {'redshifts': d['redshifts'], 'sf_table': d['sf_table'], 'sf_galaxies_per_snap': d['sf_galaxies_per_snap'],
+                 'boxsize_in_kpccm': d['boxsize_in_kpccm'], 'mass_limit': 9.5, 'min_merger_ratio': 0.2,
+                 'max_redshift_mergers': 2.5}
+    save_results_store(d_results, catalog, str(tmp_path / 'store'))
+    d_results['galaxies'] = catalog.to_galaxies()
+    pickled = pickle.loads(pickle.dumps(d_results))
+    store = load_results_store(str(tmp_path / 'store'))
+    for key in ['redshifts', 'sf_galaxies_per_snap']:
+        assert np.array_equal(store[key], pickled[key])
+    for key in pickled['sf_table']:
+        assert np.array_equal(store['sf_table'][key], pickled['sf_table'][key])
+    for key in ['boxsize_in_kpccm', 'mass_limit', 'min_merger_ratio', 'max_redshift_mergers']:
+        assert store[key] == pickled[key]
+    assert len(store['galaxies']) == len(pickled['galaxies'])
+    for galaxy, view in zip(pickled['galaxies'], store['galaxies']):
+        assert view.progen_id == galaxy.progen_id
+        for name in ['z', 'h1_gas', 'h2_gas', 'bh_m', 'bhar', 'local_den', 'g_type', 'pos', 'caesar_id']:
+            assert np.array_equal(getattr(view, name), getattr(galaxy, name)), name
+        for name in ['sfr', 'm', 't']:
+            assert np.array_equal(getattr(view, name)[0], getattr(galaxy, name)[0]), name
+            assert np.array_equal(getattr(view, name)[1], getattr(galaxy, name)[1]), name
+        quenches = lambda g: [(q.above9, q.below11, q.indx, q.quench_time) for q in g.quenching]
+        mergers = lambda g: [(m.indx, m.merger_ratio, m.fgas_boost) for m in g.mergers]
+        np.testing.assert_array_equal(np.array(quenches(view), dtype=float), np.array(quenches(galaxy), dtype=float))
+        np.testing.assert_array_equal(np.array(mergers(view), dtype=float), np.array(mergers(galaxy), dtype=float))
+        assert view.rejuvenations == galaxy.rejuvenations
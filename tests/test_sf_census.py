@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from sf_census import sf_census, new_sf_table, fill_sf_table, sf_mass_counts, SF_ANALYSIS_EDGES
+
+def test_mass_counts_match_histogram():
+    rng = np.random.default_rng(2)
+    table = new_sf_table(3)
+    masses = []
+    for s in range(0, 3):
+        ms = 10**rng.uniform(8.0, 12.8, 2000)
+        fill_sf_table(table, s, sf_census(ms, ms*1e-10, -11.0))
+        masses.append(np.log10(ms))
+    for edges in [SF_ANALYSIS_EDGES, [9.5, 10.3, 11.0, 18.0]]:
+        expected = np.histogram(np.concatenate(masses), bins=edges)[0]
+        assert np.array_equal(sf_mass_counts(table, edges), expected)
+
+def test_mass_counts_off_grid_edges():
+    table = new_sf_table(1)
+    table['mass_bins'] = np.concatenate((np.round(np.arange(6.0, 13.0, 0.01), 2), [np.inf]))
+    table['mass_hist'] = np.zeros((1, len(table['mass_bins'])-1), dtype=np.int64)
+    with pytest.raises(ValueError):
+        sf_mass_counts(table, SF_ANALYSIS_EDGES)
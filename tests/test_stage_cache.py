@@ -0,0 +1,23 @@
+import numpy as np
+from stage_cache import StageCache, data_fingerprint
+
+def test_stage_cache_reuses_outputs(tmp_path):
+    cache = StageCache(str(tmp_path / 'cache'))
+    calls = []
+    def compute():
+        calls.append(1)
+        return {'values': np.arange(5), 'count': 5}
+    key, outputs = cache.run('stage', ['input'], {'limit': 9.5}, compute)
+    key2, outputs2 = cache.run('stage', ['input'], {'limit': 9.5}, compute)
+    assert len(calls) == 1 and key2 == key
+    assert np.array_equal(outputs2['values'], np.arange(5)) and outputs2['count'] == 5
+    for inputs, params in [(['input'], {'limit': 10.0}), (['other input'], {'limit': 9.5})]:
+        assert cache.run('stage', inputs, params, compute)[0] != key
+    assert len(calls) == 3
+
+def test_data_fingerprint_follows_values():
+    table = {'z': np.linspace(0, 2, 5), 't': np.linspace(13.8, 3.3, 5)}
+    changed = {'z': table['z'].copy(), 't': table['t'].copy()}
+    assert data_fingerprint(table) == data_fingerprint(changed)
+    changed['z'][2] = 0.9
+    assert data_fingerprint(table) != data_fingerprint(changed)
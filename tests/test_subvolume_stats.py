@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+stats = pytest.importorskip('scipy.stats')
+from subvolume_stats import subvolume_statistics, subvolume_index
+
+@pytest.mark.parametrize('statistic', ['count', 'sum', 'mean', 'std', 'median'])
+@pytest.mark.parametrize('nside', [2, 3])
+def test_subvolumes_match_scipy(statistic, nside):
+    rng = np.random.default_rng(8)
+    n = 3000
+    x, y, pos = rng.uniform(9, 12, n), rng.normal(0, 1, n), rng.uniform(0, 100.0, (n, 3))
+    edges = np.linspace(9.5, 12, 6)
+    results = subvolume_statistics(x, y, edges, pos, 100.0, nside=nside, statistic=statistic)
+    expected = stats.binned_statistic(x, y, statistic=statistic, bins=edges)[0]
+    np.testing.assert_allclose(results['statistic'], expected, equal_nan=True)
+    s = subvolume_index(pos, 100.0, nside)
+    for k in range(0, nside**3):
+        inside = s == k
+        expected = stats.binned_statistic(x[inside], y[inside], statistic=statistic, bins=edges)[0]
+        np.testing.assert_allclose(results['subvolumes'][:,k], expected, equal_nan=True, atol=1e-12)
+        expected = stats.binned_statistic(x[~inside], y[~inside], statistic=statistic, bins=edges)[0]
+        np.testing.assert_allclose(results['jackknife'][:,k], expected, equal_nan=True, atol=1e-12)